@@ -4,4 +4,5 @@ from . import visuals
 from . import io
 from . import nodes
 from .pipeline import Pipeline, load_pipeline
+from .search import grid_search, cross_validate
 from .layers import metrics
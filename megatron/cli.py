@@ -0,0 +1,334 @@
+import sys
+import time
+import queue
+import sqlite3
+import argparse
+import threading
+import collections
+import concurrent.futures
+import pandas as pd
+from . import utils
+from .pipeline import load_pipeline
+from .io.generator import SQLGenerator
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+SQLITE_PREFIX = 'sqlite://'
+
+# key under which the index column is given to the Pipeline, so that it follows any Filter
+INDEX_KEY = '__index__'
+
+# the Pipeline of each worker process, loaded once by _init_worker
+_worker_pipeline = None
+
+
+def _init_worker(model_path):
+    global _worker_pipeline
+    _worker_pipeline = load_pipeline(model_path)
+
+
+def _check_pyarrow():
+    """Raise an error if `pyarrow`, needed for Parquet files, is not installed."""
+    if pyarrow is None:
+        raise ImportError('Failed to import `pyarrow`. Please install `pyarrow` in your '
+                          'current environment to read or write Parquet files.')
+
+
+def _transform(pipeline, batch):
+    # outputs of a batch, with the index of the rows they hold when an index is given
+    if INDEX_KEY not in batch:
+        return pipeline.transform(batch), None
+    index_data = batch[INDEX_KEY]
+    output_data = pipeline.transform(batch, index_field=INDEX_KEY)
+    return output_data, pipeline._output_index(index_data)
+
+
+def _score_batch(batch):
+    return _transform(_worker_pipeline, batch)
+
+
+def read_batches(source, batch_size, cols=None, query=None, pipeline=None):
+    """Read a CSV file, Parquet file or SQLite query in batches of columns, until exhausted.
+
+    Parameters
+    ----------
+    source : str
+        a .csv or .parquet filepath, or 'sqlite://' followed by the filepath of a database.
+    batch_size : int
+        number of observations in each batch.
+    cols : list of str (default: None)
+        the only columns to be read. If None, all columns are read.
+    query : str (default: None)
+        the query whose result is read, for a SQLite source.
+    pipeline : megatron.Pipeline (default: None)
+        Pipeline whose Predicates are pushed down to a SQLite source.
+    """
+    if source.startswith(SQLITE_PREFIX):
+        if query is None:
+            raise ValueError("A query is required to read from a SQLite database")
+        generator = SQLGenerator(sqlite3.connect(source[len(SQLITE_PREFIX):]), query,
+                                 batch_size, include_cols=cols)
+        if pipeline is not None:
+            generator = pipeline._push_predicates(generator)
+        # the generator yields empty batches once the query is exhausted
+        for batch in generator:
+            if len(next(iter(batch.values()), [])) == 0:
+                return
+            yield batch
+    elif source.endswith('.csv'):
+        for chunk in pd.read_csv(source, chunksize=batch_size, usecols=cols):
+            yield {col: chunk[col].to_numpy() for col in chunk.columns}
+    elif source.endswith('.parquet'):
+        _check_pyarrow()
+        parquet_file = pyarrow.parquet.ParquetFile(source)
+        for record_batch in parquet_file.iter_batches(batch_size, columns=cols):
+            yield {name: column.to_numpy(zero_copy_only=False)
+                   for name, column in zip(record_batch.schema.names, record_batch.columns)}
+    else:
+        raise ValueError("Input must be a .csv or .parquet file, or a sqlite:// database")
+
+
+def prefetch(batches, size):
+    """Read batches from an iterator in a background thread, keeping up to size of them ready."""
+    ready = queue.Queue(maxsize=size)
+    done = object()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for batch in batches:
+                while not stop.is_set():
+                    try:
+                        ready.put(batch, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            ready.put(done)
+        except Exception as e:
+            ready.put(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = ready.get()
+            if batch is done:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+    finally:
+        stop.set()
+
+
+def output_names(pipeline):
+    """Column name of each output of a Pipeline.
+
+    Outputs are named after their nodes. Outputs sharing a name, as those of layers of the
+    same type do by default, are followed by their position, such as 'ScalarMultiply.1'.
+    """
+    names = [node.name for node in pipeline.outputs]
+    counts = collections.Counter(names)
+    return [name if counts[name] == 1 else '{}.{}'.format(name, i)
+            for i, name in enumerate(names)]
+
+
+def output_frame(names, output_data, index=None):
+    """Flatten the outputs of a Pipeline to a DataFrame with one column per feature.
+
+    Multi-dimensional outputs give one column per entry, named with their flat position;
+    sparse outputs are densified, and ragged outputs give one list per row.
+
+    Parameters
+    ----------
+    names : list of str
+        name of each output.
+    output_data : list of array
+        the outputs of the Pipeline.
+    index : tuple of str and array (default: None)
+        name and values of an index column to be written first.
+
+    Raises
+    ------
+    ValueError
+        error indicating that two columns have the same name, so that one would be lost.
+    """
+    columns = collections.OrderedDict()
+
+    def add(name, values):
+        if name in columns:
+            raise ValueError("Output column '{}' is written more than once; give the "
+                             "output nodes distinct names".format(name))
+        columns[name] = values
+
+    if index is not None:
+        add(index[0], index[1])
+    for name, data in zip(names, output_data):
+        if utils.sparse.is_sparse(data):
+            data = data.toarray()
+        if utils.ragged.is_ragged(data):
+            add(name, [row.tolist() for row in data])
+        elif data.ndim > 1:
+            flat = data.reshape((data.shape[0], -1))
+            for j in range(flat.shape[1]):
+                add('{}_{}'.format(name, j), flat[:, j])
+        else:
+            add(name, data)
+    return pd.DataFrame(columns)
+
+
+class OutputWriter:
+    """Writes DataFrames one after another to a .csv or .parquet file.
+
+    Parameters
+    ----------
+    filepath : str
+        the file to be written; it is replaced if it exists.
+    """
+    def __init__(self, filepath):
+        if not (filepath.endswith('.csv') or filepath.endswith('.parquet')):
+            raise ValueError("Output must be a .csv or .parquet file")
+        if filepath.endswith('.parquet'):
+            _check_pyarrow()
+        self.filepath = filepath
+        self.parquet_writer = None
+        self.n_written = 0
+
+    def write(self, frame):
+        if self.filepath.endswith('.csv'):
+            frame.to_csv(self.filepath, mode='a' if self.n_written else 'w',
+                         header=(self.n_written == 0), index=False)
+        else:
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pyarrow.parquet.ParquetWriter(self.filepath, table.schema)
+            self.parquet_writer.write_table(table)
+        self.n_written += 1
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+def score(model_path, input_path, output_path, batch_size=1024, workers=1, query=None,
+          index=None, prefetch_size=2):
+    """Apply a saved Pipeline to a dataset in batches, writing its outputs as they are produced.
+
+    Batches are read ahead in a background thread. With more than one worker, each batch is
+    transformed by one of a pool of processes, each holding its own copy of the Pipeline;
+    outputs are still written in the order of the input.
+
+    Parameters
+    ----------
+    model_path : str
+        file of a Pipeline stored with Pipeline.save().
+    input_path : str
+        a .csv or .parquet filepath, or 'sqlite://' followed by the filepath of a database.
+    output_path : str
+        the .csv or .parquet file to which outputs are written.
+    batch_size : int (default: 1024)
+        number of observations in each batch.
+    workers : int (default: 1)
+        number of processes transforming batches.
+    query : str (default: None)
+        the query whose result is scored, for a SQLite input.
+    index : str (default: None)
+        name of an input column to be copied to the output, to identify each observation.
+        Rows dropped by a Filter are dropped from it too.
+    prefetch_size : int (default: 2)
+        number of batches read ahead of the workers.
+
+    Returns
+    -------
+    dict
+        the number of rows and batches scored, seconds taken, and rows per second.
+    """
+    if workers < 1:
+        raise ValueError("Number of workers must be at least 1")
+    start = time.perf_counter()
+    pipeline = load_pipeline(model_path)
+    names = output_names(pipeline)
+    cols = list(pipeline.required_inputs)
+    if index is not None and index not in cols:
+        cols.append(index)
+    batches = prefetch(read_batches(input_path, batch_size, cols, query, pipeline),
+                       prefetch_size)
+    writer = OutputWriter(output_path)
+    stats = {'rows': 0, 'batches': 0}
+
+    def write(output_data, index_data):
+        writer.write(output_frame(names, output_data,
+                                  (index, index_data) if index is not None else None))
+        stats['rows'] += utils.sparse.n_rows(output_data[0]) if output_data else 0
+        stats['batches'] += 1
+
+    def split(batch):
+        # the index column is given to the Pipeline as its index, rather than as an input
+        if index is None:
+            return batch
+        batch[INDEX_KEY] = batch[index]
+        if index not in pipeline.required_inputs:
+            del batch[index]
+        return batch
+
+    try:
+        if workers == 1:
+            for batch in batches:
+                write(*_transform(pipeline, split(batch)))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                    workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+                # keep every worker busy, but write results in order of submission
+                pending = collections.deque()
+                for batch in batches:
+                    pending.append(pool.submit(_score_batch, split(batch)))
+                    if len(pending) >= 2 * workers:
+                        write(*pending.popleft().result())
+                while pending:
+                    write(*pending.popleft().result())
+    finally:
+        batches.close()
+        writer.close()
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.
+    return stats
+
+
+def main(argv=None):
+    """Entry point of the megatron command."""
+    parser = argparse.ArgumentParser(prog='megatron')
+    commands = parser.add_subparsers(dest='command')
+    score_parser = commands.add_parser(
+        'score', help='apply a saved Pipeline to a dataset in batches')
+    score_parser.add_argument('model', help='file of a Pipeline stored with Pipeline.save()')
+    score_parser.add_argument('--input', required=True,
+                              help='.csv or .parquet file, or sqlite://path/to/database')
+    score_parser.add_argument('--output', required=True, help='.csv or .parquet file')
+    score_parser.add_argument('--batch-size', type=int, default=1024)
+    score_parser.add_argument('--workers', type=int, default=1)
+    score_parser.add_argument('--query', help='query to score, for a SQLite input')
+    score_parser.add_argument('--index', help='input column to copy to the output')
+    score_parser.add_argument('--prefetch', type=int, default=2,
+                              help='number of batches to read ahead')
+    args = parser.parse_args(argv)
+    if args.command != 'score':
+        parser.print_help()
+        return 1
+
+    stats = score(args.model, args.input, args.output, args.batch_size, args.workers,
+                  args.query, args.index, args.prefetch)
+    print('Scored {} rows in {} batches in {:.2f}s ({:.1f} rows/s)'.format(
+        stats['rows'], stats['batches'], stats['seconds'], stats['rows_per_second']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
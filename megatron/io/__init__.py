@@ -1,6 +1,10 @@
 from . import generator
 from . import dataset
 from . import storage
+from . import checkpoint
+from . import fitcache
 from .generator import *
 from .dataset import *
 from .storage import *
+from .checkpoint import *
+from .fitcache import *
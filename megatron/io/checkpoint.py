@@ -0,0 +1,53 @@
+import os
+import tempfile
+import dill as pickle
+
+
+CHECKPOINT_FILENAME = 'checkpoint.pkl'
+
+
+def save_checkpoint(checkpoint_dir, state):
+    """Write the state of a fit to a checkpoint directory atomically.
+
+    The state is written to a temporary file which then replaces the previous checkpoint,
+    so a crash during writing never leaves a partial checkpoint behind.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        local directory holding the checkpoint.
+    state : dict
+        the state of the fit, to be pickled.
+    """
+    if not os.path.exists(checkpoint_dir):
+        os.makedirs(checkpoint_dir)
+    fd, temp_path = tempfile.mkstemp(dir=checkpoint_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, os.path.join(checkpoint_dir, CHECKPOINT_FILENAME))
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+def load_checkpoint(checkpoint_dir):
+    """Read the state of a fit from a checkpoint directory.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        local directory holding the checkpoint.
+
+    Returns
+    -------
+    dict or None
+        the state of the fit; None if no checkpoint has been written.
+    """
+    filepath = os.path.join(checkpoint_dir, CHECKPOINT_FILENAME)
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, 'rb') as f:
+        return pickle.load(f)
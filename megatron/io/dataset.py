@@ -1,7 +1,7 @@
 from .generator import *
 
 
-def PandasData(dataframe, exclude_cols=[], nrows=None):
+def PandasData(dataframe, exclude_cols=[], nrows=None, include_cols=None):
     """Load fixed data from Pandas Dataframe into Megatron Input nodes, one for each column.
 
     Parameters
@@ -12,11 +12,13 @@ def PandasData(dataframe, exclude_cols=[], nrows=None):
         any columns that should not be loaded as Input.
     nrows : int (default: None)
         number of rows to load. If None, loads all rows.
+    include_cols : list of str (default: None)
+        the only columns to be loaded, such as a Pipeline's required_inputs.
     """
-    return next(PandasGenerator(dataframe, nrows, exclude_cols))
+    return next(PandasGenerator(dataframe, nrows, exclude_cols, include_cols))
 
 
-def CSVData(filepath, exclude_cols=[], nrows=None):
+def CSVData(filepath, exclude_cols=[], nrows=None, include_cols=None):
     """Load fixed data from CSV filepath into Megatron Input nodes, one for each column.
 
     Parameters
@@ -27,11 +29,13 @@ def CSVData(filepath, exclude_cols=[], nrows=None):
         any columns that should not be loaded as Input.
     nrows : int (default: None)
         number of rows to load. If None, load all rows.
+    include_cols : list of str (default: None)
+        the only columns to be loaded, such as a Pipeline's required_inputs.
     """
-    return next(CSVGenerator(filepath, nrows, exclude_cols))
+    return next(CSVGenerator(filepath, nrows, exclude_cols, include_cols))
 
 
-def SQLData(connection, query):
+def SQLData(connection, query, include_cols=None):
     """Load fixed data from SQL query into Megatron Input nodes, one for each column.
 
     Parameters
@@ -40,5 +44,7 @@ def SQLData(connection, query):
         a database connection to any valid SQL database engine.
     query : str
         a valid SQL query according to the engine being used, that extracts the data for Inputs.
+    include_cols : list of str (default: None)
+        the only columns to be selected, such as a Pipeline's required_inputs.
     """
-    return next(SQLGenerator(connection, query, -1))
+    return next(SQLGenerator(connection, query, -1, include_cols=include_cols))
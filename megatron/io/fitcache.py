@@ -0,0 +1,123 @@
+import os
+import json
+import tempfile
+import numpy as np
+
+
+def _encode_state(state):
+    # split a fitted state into arrays and a JSON description, raising TypeError if it
+    # holds values that cannot be stored without pickling
+    arrays, description = {}, {}
+    for i, (key, value) in enumerate(state.items()):
+        if isinstance(value, np.ndarray):
+            name = 'array{}'.format(i)
+            if value.dtype.kind == 'O':
+                if not all(isinstance(item, str) for item in value.flat):
+                    raise TypeError("Object arrays can only be cached when holding strings")
+                arrays[name] = value.astype(str)
+            else:
+                arrays[name] = value
+            description[key] = {'array': name, 'dtype': value.dtype.str}
+        elif isinstance(value, np.generic):
+            description[key] = {'value': value.item(), 'dtype': value.dtype.str}
+        else:
+            json.dumps(value)
+            description[key] = {'value': value}
+    return arrays, description
+
+
+def _decode_state(arrays, description):
+    state = {}
+    for key, item in description.items():
+        if 'array' in item:
+            state[key] = arrays[item['array']].astype(item['dtype'])
+        elif 'dtype' in item:
+            state[key] = np.dtype(item['dtype']).type(item['value'])
+        else:
+            state[key] = item['value']
+    return state
+
+
+class FitCache:
+    """A local directory of fitted layer states, keyed by fingerprints of the fits.
+
+    Each entry is a .npz file of the arrays of the state, with its other values described in
+    JSON, so that entries are read without unpickling anything. The least recently used
+    entries are evicted when there are more than max_entries.
+
+    Parameters
+    ----------
+    cache_dir : str
+        local directory holding the cache.
+    max_entries : int (default: 256)
+        maximum number of fitted states to keep.
+    """
+    def __init__(self, cache_dir, max_entries=256):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def _filepath(self, key):
+        return os.path.join(self.cache_dir, '{}.npz'.format(key))
+
+    def get(self, key):
+        """Fitted state stored under key, or None if there is none.
+
+        Parameters
+        ----------
+        key : str
+            fingerprint of the fit, from megatron.utils.hash.hash_fit.
+        """
+        filepath = self._filepath(key)
+        if not os.path.exists(filepath):
+            return None
+        with np.load(filepath, allow_pickle=False) as f:
+            arrays = {name: f[name] for name in f.files}
+        description = json.loads(str(arrays.pop('__state__')))
+        # mark the entry as recently used
+        os.utime(filepath)
+        return _decode_state(arrays, description)
+
+    def put(self, key, state):
+        """Store a fitted state under key, evicting the least recently used entries if needed.
+
+        Parameters
+        ----------
+        key : str
+            fingerprint of the fit, from megatron.utils.hash.hash_fit.
+        state : dict
+            fitted state of the layer, from Layer.get_fitted_state.
+
+        Returns
+        -------
+        bool
+            whether the state could be stored; states holding values other than arrays,
+            numbers, strings, lists and dicts of those are not.
+        """
+        try:
+            arrays, description = _encode_state(state)
+        except TypeError:
+            return False
+        arrays['__state__'] = np.array(json.dumps(description))
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temp_path, self._filepath(key))
+        except Exception:
+            os.remove(temp_path)
+            raise
+        self._evict()
+        return True
+
+    def _evict(self):
+        entries = [os.path.join(self.cache_dir, filename)
+                   for filename in os.listdir(self.cache_dir) if filename.endswith('.npz')]
+        entries.sort(key=os.path.getmtime)
+        for filepath in entries[:max(0, len(entries) - self.max_entries)]:
+            os.remove(filepath)
+
+    def __len__(self):
+        return len([filename for filename in os.listdir(self.cache_dir)
+                    if filename.endswith('.npz')])
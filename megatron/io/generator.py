@@ -2,6 +2,17 @@ import math
 import numpy as np
 import pandas as pd
 from ..utils.generic import listify
+from ..utils.dtypes import columns_from_rows
+
+
+def _project(available_cols, include_cols, exclude_cols):
+    # columns to be read: those included, or all of them, less those excluded
+    if include_cols is not None and len(set(include_cols) - set(available_cols)) > 0:
+        raise ValueError("Attempting to include a column not present in the data")
+    if len(set(exclude_cols) - set(available_cols)) > 0:
+        raise ValueError("Attempting to exclude a column not present in the data")
+    cols = available_cols if include_cols is None else include_cols
+    return [col for col in cols if col not in exclude_cols]
 
 
 class PandasGenerator:
@@ -15,8 +26,11 @@ class PandasGenerator:
         number of observations to yield in each iteration.
     exclude_cols : list of str (default: [])
         any columns that should not be loaded as Input.
+    include_cols : list of str (default: None)
+        the only columns to be loaded, such as a Pipeline's required_inputs. If None, all
+        columns are loaded.
     """
-    def __init__(self, dataframe, batch_size=32, exclude_cols=[]):
+    def __init__(self, dataframe, batch_size=32, exclude_cols=[], include_cols=None):
         self.dataframe = dataframe
         self.batch_size = batch_size
         if self.batch_size is None:
@@ -27,8 +41,8 @@ class PandasGenerator:
             raise ValueError("Batch size must be at least 1")
         self.n = 0
         self.exclude_cols = exclude_cols
-        if len(set(self.exclude_cols) - set(self.dataframe.columns)) > 0:
-            raise ValueError("Attempting to exclude a column not present in the data")
+        self.cols = _project(self.dataframe.columns.tolist(), include_cols, exclude_cols)
+        self.col_positions = [self.dataframe.columns.get_loc(col) for col in self.cols]
 
     def __iter__(self):
         return self
@@ -37,15 +51,29 @@ class PandasGenerator:
         if self.n == self.n_batches:
             self.n = 0
 
+        # select the columns before converting, and convert each column on its own
         if self.batch_size:
             start = self.n * self.batch_size
             end = min([self.dataframe.shape[0], start + self.batch_size])
-            out = self.dataframe.iloc[start:end].drop(self.exclude_cols, axis=1)
+            out = self.dataframe.iloc[start:end, self.col_positions]
         else:
-            out = self.dataframe.drop(self.exclude_cols, axis=1)
+            out = self.dataframe.iloc[:, self.col_positions]
         self.n += 1
 
-        return dict(zip(out.columns, out.values.T))
+        return {col: out[col].to_numpy() for col in out.columns}
+
+    def tell(self):
+        """Number of rows yielded since the start of the current pass over the data."""
+        if self.batch_size is None:
+            return 0
+        return min([self.dataframe.shape[0], self.n * self.batch_size])
+
+    def seek(self, position):
+        """Continue from the given number of rows into the data, as returned by tell()."""
+        if self.batch_size is None:
+            self.n = 0
+        else:
+            self.n = position // self.batch_size
 
 
 class CSVGenerator:
@@ -59,25 +87,29 @@ class CSVGenerator:
         number of observations to yield in each iteration.
     exclude_cols : list of str (default: [])
         any columns that should not be loaded as Input.
+    include_cols : list of str (default: None)
+        the only columns to be loaded, such as a Pipeline's required_inputs. Other columns
+        are skipped while parsing. If None, all columns are loaded.
     """
-    def __init__(self, filepath, batch_size=32, exclude_cols=[]):
+    def __init__(self, filepath, batch_size=32, exclude_cols=[], include_cols=None):
         self.filepath = filepath
         self.batch_size = batch_size
-        self.cursor = self._make_generator()
         self.exclude_cols = exclude_cols
-        with open(self.filepath, 'r') as f:
-            data_cols = pd.read_csv(self.filepath, nrows=3).columns.values.tolist()
-        if len(set(self.exclude_cols) - set(data_cols)) > 0:
-            raise ValueError("Attempting to exclude a column not present in the data")
+        data_cols = pd.read_csv(self.filepath, nrows=3).columns.values.tolist()
+        self.cols = _project(data_cols, include_cols, exclude_cols)
+        self.cursor = self._make_generator()
+        self.rows_read = 0
 
-    def _make_generator(self):
+    def _make_generator(self, skip_rows=0):
+        skiprows = range(1, skip_rows + 1) if skip_rows else None
         if self.batch_size is None:
             # must always be a generator, so for the full dataset, just yield it once
             def singular_generator():
-                yield pd.read_csv(self.filepath)
+                yield pd.read_csv(self.filepath, skiprows=skiprows, usecols=self.cols)
             return singular_generator()
         elif self.batch_size > 0:
-            return pd.read_csv(self.filepath, chunksize=self.batch_size)
+            return pd.read_csv(self.filepath, chunksize=self.batch_size, skiprows=skiprows,
+                               usecols=self.cols)
         else:
             raise ValueError("Batch size must be at least 1")
 
@@ -86,11 +118,22 @@ class CSVGenerator:
 
     def __next__(self):
         try:
-            out = next(self.cursor).drop(self.exclude_cols, axis=1)
+            out = next(self.cursor)
         except StopIteration:
-            self.cursor = pd.read_csv(self.filepath, chunksize=self.batch_size)
-            out = next(self.cursor).drop(self.exclude_cols, axis=1)
-        return dict(zip(out.columns, out.values.T))
+            self.cursor = self._make_generator()
+            self.rows_read = 0
+            out = next(self.cursor)
+        self.rows_read += out.shape[0]
+        return {col: out[col].to_numpy() for col in self.cols}
+
+    def tell(self):
+        """Number of rows yielded since the start of the current pass over the file."""
+        return self.rows_read
+
+    def seek(self, position):
+        """Continue from the given number of rows into the file, as returned by tell()."""
+        self.cursor = self._make_generator(position)
+        self.rows_read = position
 
 
 class SQLGenerator:
@@ -106,16 +149,89 @@ class SQLGenerator:
         number of observations to yield in each iteration.
     limit : int
         number of observations to use from the query in total.
+    key_col : str (default: None)
+        a unique, sortable column of the query. When given, rows are read in order of this column
+        and the position of the generator is the last key read, so that seeking back to it is
+        done by the database rather than by re-reading rows.
+    include_cols : list of str (default: None)
+        the only columns to be selected from the query, such as a Pipeline's required_inputs,
+        so that the database does not return the others. If None, all columns are selected.
     """
-    def __init__(self, connection, query, batch_size=32, limit=None):
+    def __init__(self, connection, query, batch_size=32, limit=None, key_col=None,
+                 include_cols=None):
         self.connection = connection
         self.query = query
         self.batch_size = batch_size
+        self.key_col = key_col
 
         if limit:
-            self.query += ' LIMIT {}'.format(nrows)
-        self.cursor = self.connection.execute(self.query)
+            self.query += ' LIMIT {}'.format(limit)
+        if include_cols is not None:
+            cols = list(include_cols)
+            if self.key_col and self.key_col not in cols:
+                cols.append(self.key_col)
+            self.query = 'SELECT {} FROM ({}) AS projected'.format(
+                ', '.join('"{}"'.format(col) for col in cols), self.query)
+        self.source_query = self.query
+        self.predicates = []
+        self._build_queries()
+        self.cursor = self.connection.execute(self.query, self.params)
         self.names = [col[0] for col in self.cursor.description]
+        self.position = None if self.key_col else 0
+
+    def _build_queries(self):
+        # wrap the source query with the pushed predicates and the key ordering
+        clauses = ['"{}" {} ?'.format(col, op) for col, op, value in self.predicates]
+        self.params = tuple(value for col, op, value in self.predicates)
+        self.query = self.source_query
+        if clauses:
+            self.query = 'SELECT * FROM ({}) AS filtered WHERE {}'.format(
+                self.query, ' AND '.join(clauses))
+        if self.key_col:
+            source = '({}) AS source'.format(self.query)
+            self.query = 'SELECT * FROM {} ORDER BY {}'.format(source, self.key_col)
+            self.keyset_query = 'SELECT * FROM {} WHERE {} > ? ORDER BY {}'.format(
+                source, self.key_col, self.key_col)
+
+    def push_predicates(self, predicates):
+        """Apply comparisons to the query in the database, so rows failing them are never read.
+
+        The query is restarted from the beginning of its result.
+
+        Parameters
+        ----------
+        predicates : list of 3-tuple of str, str, any
+            column, comparison operator (one of '<', '<=', '>', '>=', '=', '!='), and literal value
+            that every row read must satisfy.
+        """
+        for col, op, value in predicates:
+            if isinstance(value, np.generic):
+                value = value.item()
+            if (col, op, value) not in self.predicates:
+                self.predicates.append((col, op, value))
+        self._build_queries()
+        self.seek(None if self.key_col else 0)
+
+    def with_predicates(self, predicates):
+        """Copy of the generator with comparisons applied in the database, as in push_predicates.
+
+        The copy starts from the beginning of its result, and this generator is left as it is.
+
+        Parameters
+        ----------
+        predicates : list of 3-tuple of str, str, any
+            column, comparison operator, and literal value that every row read must satisfy.
+
+        Returns
+        -------
+        megatron.io.generator.SQLGenerator
+            the copy, sharing this generator's connection.
+        """
+        copy = object.__new__(type(self))
+        copy.__dict__.update(self.__dict__)
+        copy.predicates = list(self.predicates)
+        copy.push_predicates(predicates)
+        return copy
 
     def __iter__(self):
         return self
@@ -124,8 +240,34 @@ class SQLGenerator:
         try:
             out = self.cursor.fetchmany(self.batch_size)
         except StopIteration:
-            self.cursor = self.connection.execute(self.query)
+            self.cursor = self.connection.execute(self.query, self.params)
             out = self.cursor.fetchmany(self.batch_size)
-        coldata = np.array(out).T
+        coldata = columns_from_rows(out)
+        if self.key_col and len(out) > 0:
+            self.position = out[-1][self.names.index(self.key_col)]
+        elif not self.key_col:
+            self.position += len(out)
 
         return dict(zip(self.names, coldata))
+
+    def tell(self):
+        """Last key read when key_col is given; otherwise number of rows read."""
+        return self.position
+
+    def seek(self, position):
+        """Continue from the given position in the query result, as returned by tell()."""
+        if self.key_col and position is not None:
+            self.cursor = self.connection.execute(self.keyset_query, self.params + (position,))
+        elif self.key_col:
+            self.cursor = self.connection.execute(self.query, self.params)
+        else:
+            # without a key, the rows before the position have to be read and discarded
+            self.cursor = self.connection.execute(self.query, self.params)
+            step = self.batch_size if self.batch_size > 0 else position
+            to_skip = position
+            while to_skip > 0:
+                skipped = len(self.cursor.fetchmany(min(step, to_skip)))
+                if skipped == 0:
+                    break
+                to_skip -= skipped
+        self.position = position
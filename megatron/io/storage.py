@@ -1,4 +1,5 @@
 import re
+import time
 import sqlite3
 import pickle
 import numpy as np
@@ -17,16 +18,29 @@ class DataStore:
         version tag for pipeline's cache table in the database.
     db_conn : Connection
         database connection to query.
+
+    Attributes
+    ----------
+    telemetry : megatron.utils.telemetry.Telemetry or None
+        where the calls, rows and latency of write, read and lookup are recorded;
+        set by the Pipeline owning the storage.
     """
     def __init__(self, table_name, version, db_conn, overwrite):
         self.db = db_conn
+        self.telemetry = None
         if version:
             self.table_name = '{}_{}'.format(table_name, version)
         else:
             self.table_name = table_name
-        if overwite:
+        if overwrite:
             self.db.execute("DROP TABLE IF EXISTS {}".format(self.table_name))
 
+    def _table_exists(self):
+        # parameters rather than double quotes, which SQLite only takes as strings for lack of
+        # a matching column
+        query = "SELECT name FROM sqlite_master WHERE type='table' AND name=?;"
+        return self.db.execute(query, (self.table_name,)).fetchone() is not None
+
     def _check_schema(self, output_data):
         """If existing SQL colnames and data colnames are off, throw error that table is in use.
 
@@ -49,6 +63,8 @@ class DataStore:
         """Write set of observations to database.
 
         For features that are multi-dimensional, use pickle to compress to string.
+        Features that are scipy.sparse matrices are stored as the column indices and values
+        of each row's non-zero entries, and RaggedArrays as the raw bytes of each row's values.
 
         Parameters
         ----------
@@ -57,14 +73,26 @@ class DataStore:
         data_index : np.array
             index of observations.
         """
+        start = time.perf_counter()
         self.dtypes = []
         self.original_shapes = []
+        self.array_dtypes = []
         output_df = pd.DataFrame()
 
         # identify and pickle any multi-dimensional features
         for i, out_data in enumerate(output_data):
             self.original_shapes.append(out_data.shape[1:])
-            if len(out_data.shape) > 1:
+            self.array_dtypes.append(out_data.dtype.str)
+            if utils.sparse.is_sparse(out_data):
+                self.dtypes.append('BLOB')
+                output_df['output{}'.format(i)] = [pickle.dumps(row)
+                                                   for row in utils.sparse.split_rows(out_data)]
+            elif utils.ragged.is_ragged(out_data):
+                if out_data.dtype.kind == 'O':
+                    raise ValueError("Ragged data must have values of a fixed-size type to be stored")
+                self.dtypes.append('RAGGED')
+                output_df['output{}'.format(i)] = [row.tobytes() for row in out_data]
+            elif len(out_data.shape) > 1:
                 self.dtypes.append('TEXT')
                 flat_data = out_data.reshape((out_data.shape[0], -1))
                 flat_data = np.apply_along_axis(lambda x: pickle.dumps(x), axis=1, arr=flat_data)
@@ -74,9 +102,7 @@ class DataStore:
                 output_df['output{}'.format(i)] = out_data
 
         # create table if it doesn't yet exist; if it does, check the schema matches the new data
-        exists_query = 'SELECT name FROM sqlite_master WHERE type="table" AND name="{}";'
-        exists_query = exists_query.format(self.table_name)
-        if self.db.execute(exists_query).fetchone():
+        if self._table_exists():
             self._check_schema(output_df)
         else:
             cols = ', '.join(['"output{}" {}'.format(i, dtype)
@@ -94,6 +120,27 @@ class DataStore:
         output_df.to_sql(self.table_name, self.db, if_exists='append', index=False)
         self.db.execute("CREATE UNIQUE INDEX IF NOT EXISTS ind ON {} (ind)".format(self.table_name))
         self.db.commit()
+        self._record('DataStore.write', start, len(data_index))
+
+    def _record(self, method, start, rows):
+        # record a call in telemetry, if it is kept
+        if self.telemetry is not None:
+            self.telemetry.record_method(method, time.perf_counter() - start, rows)
+
+    def _decode(self, i, values):
+        # rebuild the stored values of one output into an array, or sparse matrix
+        if self.dtypes[i] == 'TEXT':
+            values = np.array([pickle.loads(v) for v in values])
+            values = values.reshape([-1] + list(self.original_shapes[i]))
+        elif self.dtypes[i] == 'BLOB':
+            values = utils.sparse.join_rows([pickle.loads(v) for v in values],
+                                            self.original_shapes[i][0])
+        elif self.dtypes[i] == 'RAGGED':
+            dtype = np.dtype(self.array_dtypes[i])
+            values = utils.ragged.RaggedArray.from_lengths(
+                np.frombuffer(b''.join(values), dtype=dtype).copy(),
+                [len(v) // dtype.itemsize for v in values])
+        return values
 
     def read(self, cols=None, rows=None):
         """Retrieve all processed features from cache, or lookup a single observation.
@@ -108,6 +155,7 @@ class DataStore:
             index value to lookup output for, in dictionary form. If None, get all rows.
             should be the same data type as the index.
         """
+        start = time.perf_counter()
         if cols:
             cols = ['output{}'.format(c) for c in utils.generic.listify(cols)]
             cols = ', '.join(cols)
@@ -121,7 +169,45 @@ class DataStore:
 
         out = list(pd.read_sql_query(query, self.db, index_col='ind').values.T)
         for i in range(len(out)):
-            if self.dtypes[i] == 'TEXT':
-                out[i] = np.array([pickle.loads(v) for v in out[i]])
-                out[i] = out[i].reshape([-1] + list(self.original_shapes[i]))
+            out[i] = self._decode(i, out[i])
+        self._record('DataStore.read', start, utils.telemetry.n_rows(out[0]) if out else 0)
         return out
+
+    def lookup(self, data_index):
+        """Retrieve the features of the given observations that have already been written.
+
+        Parameters
+        ----------
+        data_index : np.ndarray
+            index of the observations to look up.
+
+        Returns
+        -------
+        2-tuple of np.ndarray of bool, list of ndarray
+            whether each observation was found, and the features of those found, in the order
+            of data_index and with the data types they were written with.
+        """
+        start = time.perf_counter()
+        keys = [str(i) for i in np.asarray(data_index).tolist()]
+        if not hasattr(self, 'dtypes') or not self._table_exists():
+            return np.zeros(len(keys), dtype=bool), None
+
+        # query in chunks to stay within the database's limit on parameters
+        frames = []
+        for offset in range(0, len(keys), 900):
+            chunk = keys[offset:offset + 900]
+            query = 'SELECT * FROM {} WHERE ind IN ({})'.format(
+                self.table_name, ','.join('?' * len(chunk)))
+            frames.append(pd.read_sql_query(query, self.db, params=chunk))
+        stored = pd.concat(frames).set_index('ind')
+        found = pd.Index(keys).isin(stored.index)
+        stored = stored.reindex([key for key, is_found in zip(keys, found) if is_found])
+
+        out = []
+        for i in range(len(self.dtypes)):
+            values = self._decode(i, stored['output{}'.format(i)].values)
+            if getattr(self, 'array_dtypes', None):
+                values = values.astype(self.array_dtypes[i])
+            out.append(values)
+        self._record('DataStore.lookup', start, len(keys))
+        return found, out
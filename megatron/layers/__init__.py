@@ -5,6 +5,7 @@ from . import image
 from . import metrics
 from . import missing
 from . import numeric
+from . import sequence
 from . import shaping
 from . import text
 from .adapters import *
@@ -13,5 +14,6 @@ from .image import *
 from .metrics import *
 from .missing import *
 from .numeric import *
+from .sequence import *
 from .shaping import *
 from .text import *
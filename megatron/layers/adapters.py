@@ -1,30 +1,211 @@
+import functools
+import numpy as np
 from .. import utils
 from .core import Layer
+from ..nodes.core import InputNode
 from ..nodes.auxiliary import KerasNode
 
+try:
+    from tensorflow import keras
+except ImportError:
+    pass
+
+
+# fitted estimators whose predict is a linear function of the input, by class name
+LINEAR_REGRESSORS = {'LinearRegression', 'Ridge', 'RidgeCV', 'Lasso', 'LassoCV', 'ElasticNet',
+                     'ElasticNetCV', 'SGDRegressor', 'BayesianRidge', 'HuberRegressor'}
+LINEAR_CLASSIFIERS = {'LogisticRegression', 'LogisticRegressionCV', 'RidgeClassifier',
+                      'RidgeClassifierCV', 'SGDClassifier', 'LinearSVC', 'Perceptron'}
+
+
+def _float_dtype(X):
+    # sklearn keeps float32 data as it is, and converts anything else to float64
+    return X.dtype if X.dtype in (np.float32, np.float64) else np.dtype(np.float64)
+
+
+def _standardize(X, mean, scale):
+    out = X.astype(_float_dtype(X))
+    if mean is not None:
+        out -= mean
+    if scale is not None:
+        out /= scale
+    return out
+
+
+def _min_max(X, scale, offset, clip_range):
+    out = X.astype(_float_dtype(X))
+    out *= scale
+    out += offset
+    if clip_range is not None:
+        np.clip(out, clip_range[0], clip_range[1], out=out)
+    return out
+
+
+def _affine(X, weights, bias, divisor):
+    out = X @ weights
+    if bias is not None:
+        out += bias
+    if divisor is not None:
+        out /= divisor
+    return out
+
+
+def _classify(X, weights, bias, classes):
+    scores = X @ weights + bias
+    if scores.ndim == 1 or scores.shape[1] == 1:
+        indices = (scores.reshape(len(X)) > 0).astype(int)
+    else:
+        indices = scores.argmax(axis=1)
+    return classes[indices]
+
+
+def compile_sklearn(estimator):
+    """Plain Numpy equivalent of a fitted estimator's transform, or predict if it has none.
+
+    Supports StandardScaler, MinMaxScaler, PCA, TruncatedSVD, and the linear models of
+    LINEAR_REGRESSORS and LINEAR_CLASSIFIERS. The result is a functools.partial of a
+    module-level function, so that it can be pickled along with the layer holding it.
+
+    Parameters
+    ----------
+    estimator : sklearn estimator
+        the fitted estimator.
+
+    Returns
+    -------
+    callable or None
+        function of a 2D Numpy array; None if the estimator is not supported or not fitted.
+    """
+    name = estimator.__class__.__name__
+    try:
+        if name == 'StandardScaler':
+            return functools.partial(_standardize, mean=estimator.mean_, scale=estimator.scale_)
+        elif name == 'MinMaxScaler':
+            clip_range = estimator.feature_range if getattr(estimator, 'clip', False) else None
+            return functools.partial(_min_max, scale=estimator.scale_, offset=estimator.min_,
+                                     clip_range=clip_range)
+        elif name == 'PCA':
+            divisor = None
+            if estimator.whiten:
+                divisor = np.sqrt(estimator.explained_variance_)
+                divisor = np.maximum(divisor, np.finfo(divisor.dtype).eps)
+            return functools.partial(_affine, weights=estimator.components_.T,
+                                     bias=-(estimator.mean_ @ estimator.components_.T),
+                                     divisor=divisor)
+        elif name == 'TruncatedSVD':
+            return functools.partial(_affine, weights=estimator.components_.T,
+                                     bias=None, divisor=None)
+        elif name in LINEAR_REGRESSORS:
+            return functools.partial(_affine, weights=estimator.coef_.T,
+                                     bias=estimator.intercept_, divisor=None)
+        elif name in LINEAR_CLASSIFIERS:
+            return functools.partial(_classify, weights=estimator.coef_.T,
+                                     bias=estimator.intercept_, classes=estimator.classes_)
+    except AttributeError:
+        # not fitted, or fitted in a way without the expected attributes
+        return None
+    return None
+
 
 class Sklearn(Layer):
-    def __init__(self, sklearn_transformation):
-        super().__init__()
+    """Layer applying a scikit-learn transformer, or the predictions of a scikit-learn model.
+
+    Parameters
+    ----------
+    sklearn_transformation : sklearn estimator
+        the estimator to be fit; its transform is used if it has one, and predict otherwise.
+    compile : bool (default: False)
+        whether to replace the fitted estimator with plain Numpy operations on its learned
+        attributes, skipping sklearn's input validation on every batch; see compile_sklearn.
+        The compiled function is checked against the estimator on the first batch transformed
+        after fitting, and the estimator is used instead if they disagree.
+
+    Attributes
+    ----------
+    compiled : callable or None
+        the compiled function in use, once checked; None if the estimator is used.
+    """
+    # estimators such as scalers and PCA are fit well on a sample of rows
+    tolerates_sampling = True
+    # relative and absolute tolerances of the check of compiled functions
+    compile_rtol = 1e-7
+    compile_atol = 1e-10
+    # layers pickled before compiling existed have neither of these
+    compiled = None
+    compile_checked = False
+
+    def __init__(self, sklearn_transformation, compile=False):
+        super().__init__(compile=compile)
         self.transformation = sklearn_transformation
         self.name = self.transformation.__class__.__name__
+        self._reset_compiled()
+
+    def _reset_compiled(self):
+        # learned attributes have changed, so any compiled function must be checked again
+        self.compiled = None
+        self.compile_checked = False
 
     def partial_fit(self, *inputs):
         if hasattr(self.transformation, 'partial_fit'):
             self.transformation.partial_fit(*inputs)
+            self._reset_compiled()
         else:
             msg = "Layer {} does not support partial_fit"
             raise NotImplementedError(msg.format(self.transformation.__class__.__name__))
 
     def fit(self, *inputs):
         self.transformation.fit(*inputs)
+        self._reset_compiled()
 
-    def transform(self, *inputs):
-        if hasattr(self.transformation, 'transform'):
-            return self.transformation.transform(*inputs)
+    def supports_partial_fit(self):
+        return hasattr(self.transformation, 'partial_fit')
+
+    def get_fitted_state(self):
+        # by convention, sklearn stores what it learned in attributes ending in an underscore
+        return {key: value for key, value in vars(self.transformation).items()
+                if key.endswith('_') and not key.startswith('_')}
+
+    def set_fitted_state(self, state):
+        for key, value in state.items():
+            setattr(self.transformation, key, value)
+        self._reset_compiled()
+
+    def _check_compiled(self, X, expected):
+        # keep the compiled function only if it reproduces the estimator's output on X
+        self.compile_checked = True
+        compiled = compile_sklearn(self.transformation)
+        if compiled is None or not isinstance(expected, np.ndarray):
+            return
+        try:
+            actual = compiled(X)
+        except (ValueError, TypeError):
+            return
+        if actual.shape != expected.shape or actual.dtype != expected.dtype:
+            return
+        if expected.dtype.kind in 'fc':
+            same = np.allclose(actual, expected, rtol=self.compile_rtol,
+                               atol=self.compile_atol, equal_nan=True)
         else:
+            same = np.array_equal(actual, expected)
+        if same:
+            self.compiled = compiled
+
+    def transform(self, *inputs):
+        predicts = not hasattr(self.transformation, 'transform')
+        # the compiled function only takes the data, as a 2D dense array
+        compilable = (self.kwargs.get('compile', False) and isinstance(inputs[0], np.ndarray)
+                      and inputs[0].ndim == 2 and (predicts or len(inputs) == 1))
+        if compilable and self.compiled is not None:
+            return self.compiled(inputs[0])
+
+        if predicts:
             # don't use the labels for this
-            return self.transformation.predict(inputs[0])
+            output = self.transformation.predict(inputs[0])
+        else:
+            output = self.transformation.transform(*inputs)
+        if compilable and not self.compile_checked and len(inputs[0]) > 0:
+            self._check_compiled(inputs[0], output)
+        return output
 
 
 class Keras(Layer):
@@ -78,15 +259,30 @@ class Keras(Layer):
         X, Y = self._split_inputs(list(inputs))
         self.model.fit(X, Y, epochs=epochs, **kwargs)
 
-    def fit_generator(self, generator, steps_per_epoch, epochs=1, **kwargs):
+    def supports_partial_fit(self):
+        # partial_fit is a single training step, so refits train on every row rather than
+        # on the new rows alone
+        return False
+
+    def fit_generator(self, generator, steps_per_epoch, epochs=1, on_epoch_end=None, **kwargs):
         def _split_generator(generator):
             for inputs in generator:
                 X, Y = self._split_inputs(inputs)
                 yield X, Y
+        if on_epoch_end:
+            callback = keras.callbacks.LambdaCallback(on_epoch_end=on_epoch_end)
+            kwargs['callbacks'] = list(kwargs.get('callbacks', [])) + [callback]
         self.model.fit_generator(_split_generator(generator),
                                  steps_per_epoch=steps_per_epoch, epochs=epochs,
                                  **kwargs)
 
+    def output_spec(self, *input_specs):
+        specs = []
+        for out in self.model.outputs:
+            dtype = np.dtype(getattr(out.dtype, 'name', out.dtype))
+            specs.append(utils.shapes.Spec(tuple(out.shape[1:]), dtype))
+        return specs
+
     def transform(self, *inputs):
         # don't use the labels for this
         if self.n_inputs == 1:
@@ -94,3 +290,112 @@ class Keras(Layer):
         else:
             preds = self.model.predict(list(inputs[:self.n_inputs]))
         return preds
+
+
+class PipelineLayer(Layer):
+    """Wrap a Pipeline as a single layer, so that it can be shared by other pipelines.
+
+    The layer takes one inbound node per input of the pipeline, in the same order, and has one
+    output per output of the pipeline. Unless trainable, the pipeline is used as already fit,
+    and fitting the layer leaves it untouched.
+
+    Parameters
+    ----------
+    pipeline : megatron.Pipeline
+        the pipeline to be wrapped.
+    trainable : bool (default: False)
+        whether fitting the layer fits the pipeline.
+    read_through : bool (default: False)
+        whether to reuse the outputs already written to the pipeline's storage. The layer then
+        takes an additional, last inbound node holding the index of each observation. Only
+        observations not found in storage are transformed, and their outputs written to it.
+
+    Attributes
+    ----------
+    pipeline : megatron.Pipeline
+        the wrapped pipeline. Its storage connection is not saved with the layer, and must be
+        set again after loading to read through it.
+    """
+    def __init__(self, pipeline, trainable=False, read_through=False):
+        super().__init__(n_outputs=len(pipeline.outputs))
+        if read_through and not pipeline.storage:
+            raise ValueError("Pipeline must have storage to read through it")
+        self.pipeline = pipeline
+        self.trainable = trainable
+        self.read_through = read_through
+        self.name = 'Pipeline: {}'.format(pipeline.name)
+        self._forget()
+
+    def _forget(self):
+        # drop the outputs kept for the other output nodes of the same run
+        self._last_inputs, self._last_loads, self._last_outputs = None, None, None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_last_inputs'], state['_last_loads'], state['_last_outputs'] = None, None, None
+        # layers pickled before inputs were compared by identity held a fingerprint of them
+        state.pop('_last_key', None)
+        if self.pipeline.storage:
+            pipeline = object.__new__(type(self.pipeline))
+            pipeline.__dict__.update(self.pipeline.__dict__)
+            pipeline.storage = None
+            state['pipeline'] = pipeline
+        return state
+
+    def _input_data(self, inputs):
+        return {node.name: data for node, data in zip(self.pipeline.inputs, inputs)}
+
+    def partial_fit(self, *inputs):
+        if self.trainable:
+            self.pipeline.partial_fit(self._input_data(inputs))
+            self._forget()
+
+    def fit(self, *inputs):
+        if self.trainable:
+            self.pipeline.fit(self._input_data(inputs))
+            self._forget()
+
+    def supports_partial_fit(self):
+        return not self.trainable
+
+    def output_spec(self, *input_specs):
+        specs = [self.pipeline.specs.get(node) for node in self.pipeline.outputs]
+        if any(spec is None for spec in specs):
+            return None
+        return specs
+
+    def _transform(self, inputs):
+        if not self.read_through:
+            return self.pipeline.transform(self._input_data(inputs))
+        index = np.asarray(inputs[-1])
+        found, stored = self.pipeline.storage.lookup(index)
+        if found.all():
+            return stored
+        input_data = self._input_data([data[~found] for data in inputs[:-1]])
+        input_data['__index__'] = index[~found]
+        computed = self.pipeline.transform(input_data, index_field='__index__')
+        if not found.any():
+            return computed
+        outputs = []
+        for stored_data, computed_data in zip(stored, computed):
+            out = np.empty((len(index),) + computed_data.shape[1:], dtype=computed_data.dtype)
+            out[found] = stored_data
+            out[~found] = computed_data
+            outputs.append(out)
+        return outputs
+
+    def _is_last(self, inputs):
+        # whether the inputs are the very arrays of the last call, with no data loaded since,
+        # which could have refilled them in place; the last arrays are held, so that their ids
+        # are not reused
+        last = getattr(self, '_last_inputs', None)
+        return (last is not None and self._last_loads == InputNode.n_loads
+                and len(last) == len(inputs) and all(a is b for a, b in zip(last, inputs)))
+
+    def transform(self, *inputs):
+        # every output node of the layer calls transform; run the pipeline once for all of them
+        if not self._is_last(inputs):
+            self._last_outputs = self._transform(inputs)
+            self._last_inputs, self._last_loads = inputs, InputNode.n_loads
+        outputs = self._last_outputs
+        return outputs[0] if self.n_outputs == 1 else outputs
@@ -1,8 +1,15 @@
 import inspect
+import dill as pickle
 from ..nodes import InputNode, TransformationNode
 from .. import utils
 
 
+# results of eager calls, so that re-running the same call on the same data is instant
+eager_cache = utils.cache.LRUCache(2 ** 28)
+# calls on less input data than this are just re-run, as hashing them costs about as much
+EAGER_CACHE_MIN_BYTES = 2 ** 20
+
+
 class Input(InputNode):
     """Wrapper for Input nodes to make them appear as a Layer, for consistency."""
     pass
@@ -24,16 +31,42 @@ class Layer:
         number of distinct data, and thus nodes, output by the layer's transform.
     kwargs
         hyperparameters of the transformation function.
+    dtype_policy : megatron.utils.dtypes.DTypePolicy
+        data types to be used when allocating outputs; set by the nodes of the Pipeline
+        holding the layer whenever they run it.
+    tolerates_sampling : bool
+        whether the layer learns good enough metadata from a sample of the rows, rather than
+        needing exact statistics over all of them. Can be set on an instance to override.
+    preferred_batch_size : int or None
+        number of rows the layer transforms most efficiently at once when streaming data with
+        Pipeline.transform_generator; None to take batches of any size. Can be set on an
+        instance to override.
+    accepts_selections : bool
+        whether transform can be given the rows selected by a Filter as a lazy
+        megatron.utils.selection.SelectedArray, rather than gathered into an array.
+    mask_input : int or None
+        position of an input that is a row mask; when it is 1D, transform is given the
+        megatron.utils.selection.Selection of its true rows instead, found once per mask.
     """
+    tolerates_sampling = False
+    preferred_batch_size = None
+    accepts_selections = False
+    mask_input = None
+    # layers pickled before data type policies have no policy of their own
+    dtype_policy = utils.dtypes.DTypePolicy()
+
     def __init__(self, n_outputs=1, **kwargs):
         self.n_outputs = n_outputs
         self.kwargs = kwargs
         self.name = self.__class__.__name__
+        self.dtype_policy = utils.dtypes.DTypePolicy()
 
     def _call(self, nodes):
         """Creates a TransformationNode associated with this Layer and the given InputNode(s).
 
-        When running eagerly, will perform a fit and transform.
+        When running eagerly, will perform a fit and transform, unless an identical call
+        was made on the same data before, in which case its results are reused from eager_cache.
+        Calls on less than EAGER_CACHE_MIN_BYTES of input data are not cached.
 
         Parameters
         ----------
@@ -47,21 +80,40 @@ class Layer:
                         for i in range(self.n_outputs)]
             for node in nodes:
                 node.outbound_nodes += out_nodes
-            if all(node.output is not None for node in nodes):
-                for out_node in out_nodes:
-                    out_node.fit()
-                    out_node.transform()
             out = out_nodes
         else:
             out_node = TransformationNode(self, nodes)
             for node in nodes:
                 node.outbound_nodes.append(out_node)
-            if all(node.output is not None for node in nodes):
-                out_node.fit()
-                out_node.transform()
+            out_nodes = [out_node]
             out = out_node
+        if all(node.output is not None for node in nodes):
+            self._run_eager(nodes, out_nodes)
         return out
 
+    def _run_eager(self, nodes, out_nodes):
+        # fit and transform, reusing the fitted state and outputs of an identical earlier call
+        key = None
+        if sum(utils.memory.nbytes(node.output) for node in nodes) >= EAGER_CACHE_MIN_BYTES:
+            key = utils.hash.hash_call(self, nodes)
+        cached = eager_cache.get(key) if key else None
+        if cached is not None:
+            state, outputs = pickle.loads(cached)
+            self.__dict__.update(state)
+            for out_node, output in zip(out_nodes, outputs):
+                out_node.output = output
+                out_node.is_eager = any(node.is_eager for node in nodes)
+            return
+        out_nodes[0].fit()
+        for out_node in out_nodes:
+            out_node.transform()
+        if key:
+            try:
+                cached = pickle.dumps((self.__dict__, [node.output for node in out_nodes]))
+            except Exception:
+                return
+            eager_cache.put(key, cached, len(cached))
+
     def __call__(self, nodes):
         return self._call(nodes)
 
@@ -85,6 +137,25 @@ class Layer:
         """
         pass
 
+    def supports_partial_fit(self):
+        """Whether partial_fit updates the layer with new data, rather than refitting it."""
+        # a layer learning nothing needs no refitting; one that learns must define partial_fit
+        return type(self).partial_fit is not Layer.partial_fit or type(self).fit is Layer.fit
+
+    def get_fitted_state(self):
+        """What the layer learned when fit, as a dict; None if there is nothing to restore."""
+        return None
+
+    def set_fitted_state(self, state):
+        """Restore what the layer learned when fit, as returned by get_fitted_state().
+
+        Parameters
+        ----------
+        state : dict
+            the learned state to be restored.
+        """
+        pass
+
     def transform(self, *inputs):
         """Apply transformation to given input data.
 
@@ -95,6 +166,86 @@ class Layer:
         """
         raise NotImplementedError
 
+    def transform_into(self, out, *inputs):
+        """Apply transformation to given input data, writing the result into a given array.
+
+        A Pipeline uses this to run a layer straight into its slice of a preallocated output,
+        such as that of a Concatenate. Layers able to compute their result in out itself can
+        override this, so as never to hold their result separately.
+
+        Parameters
+        ----------
+        out : np.ndarray
+            array of the shape of the result, into which it is written.
+        inputs : np.ndarray(s)
+            input data to be transformed; could be one array or a list of arrays.
+
+        Returns
+        -------
+        np.ndarray
+            out, holding the result.
+        """
+        out[...] = utils.selection.materialize(self.transform(*inputs))
+        return out
+
+    def input_slots(self, *input_specs):
+        """Where each input is laid out in the output, for layers placing them side by side.
+
+        Parameters
+        ----------
+        input_specs : megatron.utils.shapes.Spec(s)
+            the shape, not including the observation dimension, and data type of each input.
+
+        Returns
+        -------
+        list of tuple or None
+            for each input, the index of its data in the output, not including the observation
+            dimension; None if the layer does not lay out its inputs, or they are not known.
+        """
+        return None
+
+    def row_selection(self, *inputs):
+        """Rows of the first input kept by transform, for layers that drop rows, such as Filter.
+
+        Parameters
+        ----------
+        inputs : np.ndarray(s)
+            input data to be transformed; could be one array or a list of arrays.
+
+        Returns
+        -------
+        megatron.utils.selection.Selection or None
+            the rows kept; None if transform gives one row for each row of its inputs.
+        """
+        return None
+
+    def drops_rows(self):
+        """Whether transform may drop rows of its inputs, which row_selection then gives."""
+        return type(self).row_selection is not Layer.row_selection
+
+    def output_spec(self, *input_specs):
+        """Infer the shape and data type of the output from those of the inputs.
+
+        Overwriting this is optional; it allows the Pipeline to estimate memory usage
+        and to reject incompatible inputs before any data is loaded.
+
+        Parameters
+        ----------
+        input_specs : megatron.utils.shapes.Spec(s)
+            the shape, not including the observation dimension, and data type of each input.
+
+        Returns
+        -------
+        megatron.utils.shapes.Spec, list of Spec, or None
+            the spec of each output; None if it cannot be inferred.
+
+        Raises
+        ------
+        megatron.utils.errors.WiringError
+            error indicating that the inputs can never be transformed together.
+        """
+        return None
+
 
 class StatelessLayer(Layer):
     """A layer holding a stateless transformation."""
@@ -151,6 +302,34 @@ class StatefulLayer(Layer):
         self.metadata = {}
         self.partial_fit(*inputs)
 
+    def merge(self, other_metadata):
+        """Combine metadata fit to another shard of data into this layer's metadata.
+
+        Overwriting this is optional. Layers that define it can be fit to shards of data in
+        parallel, with the results combined afterwards; other layers are fit sequentially.
+
+        Parameters
+        ----------
+        other_metadata : dict
+            metadata of another instance of this layer, fit to a different shard of data.
+        """
+        msg = "Layer {} does not support merge() or it has not been defined yet"
+        raise NotImplementedError(msg.format(self.__class__.__name__))
+
+    def supports_partial_fit(self):
+        """Whether the layer defines partial_fit(), and so can be updated with new data."""
+        return type(self).partial_fit is not StatefulLayer.partial_fit
+
+    def get_fitted_state(self):
+        return self.metadata
+
+    def set_fitted_state(self, state):
+        self.metadata = dict(state)
+
+    def is_mergeable(self):
+        """Whether the layer defines merge(), and so can be fit to shards of data in parallel."""
+        return type(self).merge is not StatefulLayer.merge
+
 
 class Lambda(StatelessLayer):
     """A layer holding a stateless transformation.
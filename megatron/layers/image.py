@@ -29,6 +29,7 @@ class RGBtoGrey(StatelessLayer):
             out = np.matmul(X, np.array([0.21, 0.72, 0.07]))
         else:
             raise ValueError("Invalid averaging method for rgb_to_grey.")
+        out = out.astype(self.dtype_policy.float_dtype, copy=False)
 
         if self.kwargs['keep_dim']:
             out = np.expand_dims(out, -1)
@@ -47,7 +48,7 @@ class RGBtoBinary(StatelessLayer):
         super().__init__(keep_dim=keep_dim)
 
     def transform(self, X):
-        out = (X.max(axis=2) > 0).astype(int)
+        out = (X.max(axis=2) > 0).astype(self.dtype_policy.indicator_dtype)
         if self.kwargs['keep_dim']:
             out = out[:, :, np.newaxis]
         return out
@@ -1,23 +1,52 @@
 import numpy as np
 from .core import StatelessLayer, StatefulLayer
+from .. import utils
 
 
 class Add(StatelessLayer):
-    """Add up arrays element-wise."""
+    """Add up arrays element-wise. The sum of scipy.sparse matrices is sparse."""
     def __init__(self):
         super().__init__()
 
     def transform(self, *arrays):
         if len(set([a.shape for a in arrays])) > 1:
             raise ValueError("Arrays must all be same shape to be added")
+        if utils.sparse.any_sparse(arrays):
+            if all(utils.sparse.is_sparse(a) for a in arrays):
+                return sum(arrays[1:], arrays[0]).tocsr()
+            # adding a dense array makes the sum dense anyway
+            return np.asarray(sum(arrays[1:], arrays[0]))
         return np.sum(arrays, axis=0)
 
+    def transform_into(self, out, *arrays):
+        # summing in out is only the same when out has the data type of the sum
+        if (utils.sparse.any_sparse(arrays) or len(set([a.shape for a in arrays])) > 1
+                or out.dtype != np.result_type(*arrays)):
+            return super().transform_into(out, *arrays)
+        np.copyto(out, arrays[0])
+        for a in arrays[1:]:
+            np.add(out, a, out=out)
+        return out
+
+    def output_spec(self, *specs):
+        shape = utils.shapes.same_shape(self.name, *specs)
+        return utils.shapes.Spec(shape, utils.shapes.result_dtype(*specs))
+
 
 class Subtract(StatelessLayer):
     """Subtract one array from another."""
     def transform(self, X1, X2):
         return X1 - X2
 
+    def transform_into(self, out, X1, X2):
+        if utils.sparse.any_sparse([X1, X2]):
+            return super().transform_into(out, X1, X2)
+        return np.subtract(X1, X2, out=out)
+
+    def output_spec(self, X1, X2):
+        shape = utils.shapes.broadcast_shape(self.name, X1, X2)
+        return utils.shapes.Spec(shape, utils.shapes.result_dtype(X1, X2))
+
 
 class ScalarMultiply(StatelessLayer):
     """Multiply array by a given scalar.
@@ -31,14 +60,34 @@ class ScalarMultiply(StatelessLayer):
         super().__init__(factor=factor)
 
     def transform(self, X):
+        # keeps scipy.sparse matrices sparse
         return self.kwargs['factor'] * X
 
+    def transform_into(self, out, X):
+        if utils.sparse.is_sparse(X):
+            return super().transform_into(out, X)
+        return np.multiply(self.kwargs['factor'], X, out=out)
+
+    def output_spec(self, X):
+        if X.dtype is None:
+            return utils.shapes.Spec(X.shape, None)
+        return utils.shapes.Spec(X.shape, np.result_type(X.dtype, self.kwargs['factor']))
+
 
 class ElementWiseMultiply(StatelessLayer):
     """Multiply two same-sized arrays element-by-element."""
     def transform(self, X, Y):
         return X * Y
 
+    def transform_into(self, out, X, Y):
+        if utils.sparse.any_sparse([X, Y]):
+            return super().transform_into(out, X, Y)
+        return np.multiply(X, Y, out=out)
+
+    def output_spec(self, X, Y):
+        shape = utils.shapes.broadcast_shape(self.name, X, Y)
+        return utils.shapes.Spec(shape, utils.shapes.result_dtype(X, Y))
+
 
 class Divide(StatelessLayer):
     """Divide given array by another given array element-wise.
@@ -52,13 +101,22 @@ class Divide(StatelessLayer):
         super().__init__(impute=impute)
 
     def transform(self, X1, X2):
-        impute_array = np.ones_like(X1) * self.kwargs['impute']
-        return np.divide(X1.astype(np.float16), X2, out=impute_array.astype(np.float16), where=X2!=0)
+        if np.asarray(X1).dtype.kind not in 'biufc':
+            raise TypeError("Arrays must be numeric to be divided")
+        float_dtype = self.dtype_policy.float_dtype
+        impute_array = np.full(np.shape(X1), self.kwargs['impute'], dtype=float_dtype)
+        return np.divide(X1.astype(float_dtype), X2, out=impute_array, where=X2!=0)
+
+    def output_spec(self, X1, X2):
+        utils.shapes.broadcast_shape(self.name, X1, X2)
+        return utils.shapes.Spec(X1.shape, self.dtype_policy.float_dtype)
 
 
 class StaticDot(StatelessLayer):
     """Multiply array by a given matrix, as matrix mulitplication.
 
+    Either may be a scipy.sparse matrix; the product of two sparse matrices is sparse.
+
     Parameters
     ----------
     W : np.array
@@ -68,12 +126,40 @@ class StaticDot(StatelessLayer):
         super().__init__(W=W)
 
     def transform(self, X):
+        if utils.sparse.any_sparse([X, self.kwargs['W']]):
+            return X @ self.kwargs['W']
         return np.dot(X, self.kwargs['W'])
 
+    def output_spec(self, X):
+        W = self.kwargs['W']
+        if not utils.sparse.is_sparse(W):
+            W = np.asarray(W)
+        W_shape = tuple(W.shape)
+        if len(X.shape) == 0 or len(W_shape) == 0:
+            return None
+        inner = W_shape[0] if len(W_shape) == 1 else W_shape[-2]
+        if X.shape[-1] is not None and X.shape[-1] != inner:
+            raise utils.errors.WiringError(self.name, "shape {} cannot be multiplied by {}".format(
+                X.shape, W_shape))
+        if len(W_shape) > 1:
+            shape = tuple(X.shape[:-1]) + W_shape[:-2] + W_shape[-1:]
+        else:
+            shape = tuple(X.shape[:-1])
+        dtype = np.result_type(X.dtype, W.dtype) if X.dtype is not None else None
+        return utils.shapes.Spec(shape, dtype)
+
 
 class Dot(StatelessLayer):
-    """Multiply multiple arrays together as matrix multiplication."""
+    """Multiply multiple arrays together as matrix multiplication.
+
+    Any of the arrays may be a scipy.sparse matrix, in which case they are multiplied in order.
+    """
     def transform(self, *arrays):
+        if utils.sparse.any_sparse(arrays):
+            out = arrays[0]
+            for a in arrays[1:]:
+                out = out @ a
+            return out
         return np.linalg.multi_dot(arrays)
 
 
@@ -88,3 +174,10 @@ class Normalize(StatelessLayer):
             raise ValueError("Sum of at least one observation is infinity, cannot normalize")
         out[S<0.0001, :] = np.ones(out.shape[1])
         return out / out.sum(axis=1, keepdims=True)
+
+    def output_spec(self, X):
+        if len(X.shape) != 1:
+            raise utils.errors.WiringError(self.name, "data must be 2-dimensional")
+        if X.dtype is None:
+            return utils.shapes.Spec(X.shape, None)
+        return utils.shapes.Spec(X.shape, np.true_divide(np.ones(1, X.dtype), 1).dtype)
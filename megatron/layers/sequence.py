@@ -0,0 +1,188 @@
+import numpy as np
+from .core import StatelessLayer, StatefulLayer
+from .. import utils
+
+
+# reductions of SequenceReduce, as the ufunc reducing each row and the result for empty rows
+REDUCE_OPS = {'sum': (np.add, 0), 'prod': (np.multiply, 1),
+              'max': (np.maximum, np.nan), 'min': (np.minimum, np.nan)}
+
+
+def _as_ragged(X):
+    # accept object arrays of sequences as well as RaggedArrays
+    if utils.ragged.is_ragged(X):
+        return X
+    return utils.ragged.RaggedArray.from_rows(X)
+
+
+class Tokenize(StatelessLayer):
+    """Split each string of an array into tokens, giving a RaggedArray of the tokens of each.
+
+    Tokens are the same as those of str.split(sep), but all strings are split at once.
+
+    Parameters
+    ----------
+    sep : str (default: ' ')
+        the separator between tokens.
+    """
+    def __init__(self, sep=' '):
+        super().__init__(sep=sep)
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=str)
+        if X.ndim != 1:
+            raise ValueError("Data must be 1-dimensional")
+        sep = self.kwargs['sep']
+        if len(X) == 0:
+            return utils.ragged.RaggedArray(np.empty(0, dtype=str), [0])
+        lengths = np.char.count(X, sep) + 1
+        values = np.array(sep.join(X.tolist()).split(sep))
+        return utils.ragged.RaggedArray.from_lengths(values, lengths)
+
+    def output_spec(self, X):
+        return utils.shapes.Spec((None,), None)
+
+
+class ToRagged(StatelessLayer):
+    """Convert an object array of sequences, such as lists of tokens, to a RaggedArray.
+
+    Parameters
+    ----------
+    dtype : np.dtype (default: None)
+        data type of the values. If None, it is inferred from the values.
+    """
+    def __init__(self, dtype=None):
+        super().__init__(dtype=dtype)
+
+    def transform(self, X):
+        return utils.ragged.RaggedArray.from_rows(X, self.kwargs['dtype'])
+
+    def output_spec(self, X):
+        dtype = self.kwargs['dtype']
+        return utils.shapes.Spec((None,), np.dtype(dtype) if dtype is not None else None)
+
+
+class Lengths(StatelessLayer):
+    """Number of values in each row of a RaggedArray."""
+    def transform(self, X):
+        return _as_ragged(X).lengths()
+
+    def output_spec(self, X):
+        return utils.shapes.Spec((), np.dtype(np.int64))
+
+
+class Truncate(StatelessLayer):
+    """Keep at most a given number of values in each row of a RaggedArray.
+
+    Parameters
+    ----------
+    max_len : int
+        maximum number of values in a row.
+    from_end : bool (default: False)
+        whether to keep the last values of longer rows rather than the first.
+    """
+    def __init__(self, max_len, from_end=False):
+        super().__init__(max_len=max_len, from_end=from_end)
+
+    def transform(self, X):
+        return _as_ragged(X).truncate(self.kwargs['max_len'], self.kwargs['from_end'])
+
+    def output_spec(self, X):
+        return utils.shapes.Spec((None,), X.dtype)
+
+
+class PadSequences(StatelessLayer):
+    """Truncate and pad the rows of a RaggedArray to a dense array with a fixed number of columns.
+
+    Parameters
+    ----------
+    max_len : int
+        number of columns of the output.
+    pad_value : any (default: 0)
+        value of the entries beyond the end of a row.
+    truncating : str (default: 'post')
+        'post' to keep the first max_len values of longer rows, 'pre' to keep the last.
+    padding : str (default: 'post')
+        'post' to pad after the values of shorter rows, 'pre' to pad before them.
+    """
+    def __init__(self, max_len, pad_value=0, truncating='post', padding='post'):
+        if truncating not in ('pre', 'post') or padding not in ('pre', 'post'):
+            raise ValueError("Truncating and padding must be either 'pre' or 'post'")
+        super().__init__(max_len=max_len, pad_value=pad_value,
+                         truncating=truncating, padding=padding)
+
+    def transform(self, X):
+        return _as_ragged(X).to_dense(**self.kwargs)
+
+    def output_spec(self, X):
+        return utils.shapes.Spec((self.kwargs['max_len'],), X.dtype)
+
+
+class SequenceReduce(StatelessLayer):
+    """Reduce each row of a RaggedArray to a single value.
+
+    Parameters
+    ----------
+    op : str (default: 'sum')
+        the reduction, one of 'sum', 'prod', 'max', 'min', 'mean'. Empty rows reduce to the
+        identity of sums and products, and to NaN otherwise.
+    """
+    def __init__(self, op='sum'):
+        if op not in REDUCE_OPS and op != 'mean':
+            raise ValueError("Operation must be one of {}".format(list(REDUCE_OPS) + ['mean']))
+        super().__init__(op=op)
+
+    def transform(self, X):
+        X = _as_ragged(X)
+        if self.kwargs['op'] == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return X.reduce(np.add, 0.) / X.lengths()
+        ufunc, empty_value = REDUCE_OPS[self.kwargs['op']]
+        return X.reduce(ufunc, empty_value)
+
+
+class TokenLookup(StatefulLayer):
+    """Map tokens to integer ids, learning the vocabulary of tokens in fit.
+
+    Ids start from 1 in sorted order of the tokens; 0 is left for unknown tokens, and for
+    padding. Rows of a RaggedArray are mapped all at once, keeping their lengths.
+
+    Parameters
+    ----------
+    strict : bool (default: False)
+        whether to raise an error when a token not seen in fit is transformed.
+    """
+    def __init__(self, strict=False):
+        super().__init__(strict=strict)
+
+    def partial_fit(self, X):
+        tokens = X.values if utils.ragged.is_ragged(X) else np.asarray(X).ravel()
+        if self.metadata:
+            self.metadata['vocabulary'] = np.union1d(self.metadata['vocabulary'], tokens)
+        else:
+            self.metadata['vocabulary'] = np.unique(tokens)
+
+    def merge(self, other_metadata):
+        if not self.metadata:
+            self.metadata = dict(other_metadata)
+        elif other_metadata:
+            self.metadata['vocabulary'] = np.union1d(self.metadata['vocabulary'],
+                                                     other_metadata['vocabulary'])
+
+    def _lookup(self, tokens):
+        vocabulary = self.metadata['vocabulary']
+        ids = np.searchsorted(vocabulary, tokens)
+        found = ids < len(vocabulary)
+        found[found] = vocabulary[ids[found]] == tokens[found]
+        if self.kwargs['strict'] and not found.all():
+            raise ValueError("New token encountered in transform that was not present in fit")
+        return np.where(found, ids + 1, 0)
+
+    def transform(self, X):
+        if utils.ragged.is_ragged(X):
+            return X.map_values(self._lookup)
+        X = np.asarray(X)
+        return self._lookup(X.ravel()).reshape(X.shape)
+
+    def output_spec(self, X):
+        return utils.shapes.Spec(X.shape, np.dtype(np.int64))
@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 from .core import StatelessLayer, StatefulLayer
+from .. import utils
 
 
 class Cast(StatelessLayer):
@@ -19,6 +20,15 @@ class Cast(StatelessLayer):
     def transform(self, X):
         return X.astype(self.kwargs['new_type'])
 
+    def transform_into(self, out, X):
+        if not isinstance(X, np.ndarray) or out.dtype != np.dtype(self.kwargs['new_type']):
+            return super().transform_into(out, X)
+        np.copyto(out, X, casting='unsafe')
+        return out
+
+    def output_spec(self, X):
+        return utils.shapes.Spec(X.shape, np.dtype(self.kwargs['new_type']))
+
 
 class AddDim(StatelessLayer):
     """Add a dimension to an array.
@@ -36,11 +46,31 @@ class AddDim(StatelessLayer):
             raise ValueError("Axis out of range for new dimension")
         return np.expand_dims(X, axis=self.kwargs['axis'])
 
+    def output_spec(self, X):
+        # axis counts the observation dimension, which is not part of the spec
+        full_shape = [None] + list(X.shape)
+        axis = self.kwargs['axis']
+        if axis > len(full_shape):
+            raise utils.errors.WiringError(self.name, "axis out of range for new dimension")
+        position = axis if axis >= 0 else len(full_shape) + axis + 1
+        if position <= 0:
+            return None
+        full_shape.insert(position, 1)
+        return utils.shapes.Spec(tuple(full_shape[1:]), X.dtype)
+
 
 class OneHotRange(StatefulLayer):
-    """One-hot encode a numeric array where the values are a sequence."""
-    def __init__(self, strict=False):
-        super().__init__(strict=strict)
+    """One-hot encode a numeric array where the values are a sequence.
+
+    Parameters
+    ----------
+    strict : bool (default: False)
+        whether to raise an error when a value not seen in fit is transformed.
+    sparse : bool (default: False)
+        whether to output a scipy.sparse CSR matrix, for 1D data, rather than a dense array.
+    """
+    def __init__(self, strict=False, sparse=False):
+        super().__init__(strict=strict, sparse=sparse)
 
     def partial_fit(self, X):
         try:
@@ -57,17 +87,47 @@ class OneHotRange(StatefulLayer):
             self.metadata['min_val'] = X.min()
             self.metadata['max_val'] = X.max()
 
+    def merge(self, other_metadata):
+        if not self.metadata:
+            self.metadata = dict(other_metadata)
+        elif other_metadata:
+            self.metadata['min_val'] = min([self.metadata['min_val'], other_metadata['min_val']])
+            self.metadata['max_val'] = max([self.metadata['max_val'], other_metadata['max_val']])
+
     def transform(self, X):
-        out = (np.arange(self.metadata['min_val'], self.metadata['max_val']+1) == X[..., None]) * 1
+        if self.kwargs.get('sparse'):
+            n_values = int(self.metadata['max_val'] - self.metadata['min_val']) + 1
+            indices = np.where(X == X.astype(int), X - self.metadata['min_val'], -1).astype(int)
+            out = utils.sparse.one_hot(indices, n_values, self.dtype_policy.indicator_dtype)
+            if self.kwargs['strict'] and out.nnz < len(X):
+                raise ValueError("New value encountered in transform that was not present in fit")
+            return out
+        out = np.arange(self.metadata['min_val'], self.metadata['max_val']+1) == X[..., None]
+        out = out.astype(self.dtype_policy.indicator_dtype)
         if self.kwargs['strict'] and (out.sum(axis=-1) == 0).any():
             raise ValueError("New value encountered in transform that was not present in fit")
         return out
 
+    def output_spec(self, X):
+        if self.metadata:
+            n_values = int(self.metadata['max_val'] - self.metadata['min_val']) + 1
+        else:
+            n_values = None
+        return utils.shapes.Spec(tuple(X.shape) + (n_values,), self.dtype_policy.indicator_dtype)
+
 
 class OneHotLabels(StatefulLayer):
-    """One-hot encode an array of categorical values, or non-consecutive numeric values."""
-    def __init__(self, strict=False):
-        super().__init__(strict=strict)
+    """One-hot encode an array of categorical values, or non-consecutive numeric values.
+
+    Parameters
+    ----------
+    strict : bool (default: False)
+        whether to raise an error when a value not seen in fit is transformed.
+    sparse : bool (default: False)
+        whether to output a scipy.sparse CSR matrix, for 1D data, rather than a dense array.
+    """
+    def __init__(self, strict=False, sparse=False):
+        super().__init__(strict=strict, sparse=sparse)
 
     def partial_fit(self, X):
         if self.metadata:
@@ -76,12 +136,34 @@ class OneHotLabels(StatefulLayer):
         else:
             self.metadata['categories'] = np.unique(X)
 
+    def merge(self, other_metadata):
+        if not self.metadata:
+            self.metadata = dict(other_metadata)
+        elif other_metadata:
+            self.metadata['categories'] = np.union1d(self.metadata['categories'],
+                                                     other_metadata['categories'])
+
     def transform(self, X):
-        out = (self.metadata['categories'] == X[..., None]) * 1
+        if self.kwargs.get('sparse'):
+            categories = self.metadata['categories']
+            indices = np.searchsorted(categories, X)
+            found = indices < len(categories)
+            found[found] = categories[indices[found]] == X[found]
+            indices = np.where(found, indices, -1)
+            out = utils.sparse.one_hot(indices, len(categories), self.dtype_policy.indicator_dtype)
+            if self.kwargs['strict'] and not found.all():
+                raise ValueError("New value encountered in transform that was not present in fit")
+            return out
+        out = self.metadata['categories'] == X[..., None]
+        out = out.astype(self.dtype_policy.indicator_dtype)
         if self.kwargs['strict'] and (out.sum(axis=-1) == 0).any():
             raise ValueError("New value encountered in transform that was not present in fit")
         return out
 
+    def output_spec(self, X):
+        n_values = len(self.metadata['categories']) if self.metadata else None
+        return utils.shapes.Spec(tuple(X.shape) + (n_values,), self.dtype_policy.indicator_dtype)
+
 
 class Reshape(StatelessLayer):
     """Reshape an array to a given new shape.
@@ -135,6 +217,9 @@ class TimeSeries(StatefulLayer):
     reverse : bool (default: False)
         if True, oldest data is first; if False, newest data is first.
     """
+    # fitting only records the shape of observations
+    tolerates_sampling = True
+
     def __init__(self, window_size, time_axis=1, reverse=False):
         if window_size <= 1:
             raise ValueError("Window size must be greater than 1")
@@ -161,25 +246,128 @@ class TimeSeries(StatefulLayer):
             out = out[tuple(slices)]
         return out
 
+    def output_spec(self, X):
+        time_axis = self.kwargs['time_axis']
+        if time_axis == 0 or time_axis < -(len(X.shape) + 1):
+            return None
+        shape = list(X.shape)
+        position = time_axis - 1 if time_axis > 0 else len(shape) + time_axis + 1
+        shape.insert(position, self.kwargs['window_size'])
+        # the window is padded with the float history kept in metadata
+        dtype = np.result_type(X.dtype, np.float64) if X.dtype is not None else None
+        return utils.shapes.Spec(tuple(shape), dtype)
+
+
+def _same_memory(a, view):
+    # whether a is the very view given, such as a producer's output written in place
+    if not isinstance(a, np.ndarray) or a.shape != view.shape or a.ctypes.data != view.ctypes.data:
+        return False
+    return all(s1 == s2 for s1, s2, dim in zip(a.strides, view.strides, a.shape) if dim > 1)
+
 
 class Concatenate(StatelessLayer):
     """Combine arrays along a given axis. Does not create a new axis, unless all 1D inputs.
 
+    If any array is a scipy.sparse matrix, the result is a sparse CSR matrix. When the
+    shape and data type of the output are known, a Pipeline allocates it once, and the
+    layers feeding only this one write straight into their slices of it (see input_slots).
+
     Parameters
     ----------
     axis : int (default: -1)
         axis along which to concatenate arrays. -1 means the last axis.
     """
+    accepts_selections = True
+
     def __init__(self, axis=-1):
         super().__init__(axis=axis)
 
-    def transform(self, *arrays):
-        arrays = list(arrays)
+    def _prepare(self, arrays):
+        # keep selections of dense arrays lazy, and make 1D arrays into single columns
+        arrays = [a if utils.selection.is_selected(a) and isinstance(a.base, np.ndarray)
+                  else utils.selection.materialize(a) for a in arrays]
+        if utils.sparse.any_sparse(arrays):
+            return [utils.selection.materialize(a) for a in arrays]
         for i, a in enumerate(arrays):
             if len(a.shape) == 1:
-                arrays[i] = np.expand_dims(a, -1)
+                arrays[i] = (utils.selection.SelectedArray(a.base[:, None], a.selection)
+                             if utils.selection.is_selected(a) else np.expand_dims(a, -1))
+        return arrays
+
+    def _can_gather(self, arrays):
+        ndim, axis = arrays[0].ndim, self.kwargs['axis']
+        return (-ndim <= axis < ndim and axis % ndim != 0
+                and all(a.ndim == ndim for a in arrays))
+
+    def _gather(self, arrays, out=None):
+        # write each array into its slice of the output, gathering selected rows directly;
+        # arrays that their producers already wrote there are left as they are
+        axis = self.kwargs['axis'] % arrays[0].ndim
+        sizes = [a.shape[axis] for a in arrays]
+        if out is None:
+            shape = list(arrays[0].shape)
+            shape[axis] = sum(sizes)
+            out = np.empty(shape, dtype=np.result_type(*[a.dtype for a in arrays]))
+        start = 0
+        for a, size in zip(arrays, sizes):
+            view = out[(slice(None),) * axis + (slice(start, start + size),)]
+            if utils.selection.is_selected(a):
+                view[...] = a.selection.take(a.base).reshape(view.shape)
+            elif not _same_memory(a, view):
+                view[...] = a
+            start += size
+        return out
+
+    def transform(self, *arrays):
+        arrays = self._prepare(arrays)
+        if utils.sparse.any_sparse(arrays):
+            return utils.sparse.concatenate(arrays, axis=self.kwargs['axis'])
+        # rows selected by a Filter are gathered straight into the output, not copied first
+        if any(utils.selection.is_selected(a) for a in arrays) and self._can_gather(arrays):
+            return self._gather(arrays)
+        arrays = [utils.selection.materialize(a) for a in arrays]
         return np.concatenate(arrays, axis=self.kwargs['axis'])
 
+    def transform_into(self, out, *arrays):
+        arrays = self._prepare(arrays)
+        if utils.sparse.any_sparse(arrays) or not self._can_gather(arrays):
+            return self.transform(*arrays)
+        return self._gather(arrays, out)
+
+    def input_slots(self, *specs):
+        spec = self.output_spec(*specs)
+        if spec is None or None in spec.shape:
+            return None
+        axis = self.kwargs['axis'] % (len(spec.shape) + 1)
+        slots = []
+        start = 0
+        for in_spec in specs:
+            # 1D inputs are a single column, indexed by an int so as to keep their shape
+            size = in_spec.shape[axis - 1] if len(in_spec.shape) > 0 else 1
+            position = slice(start, start + size) if len(in_spec.shape) > 0 else start
+            slots.append((slice(None),) * (axis - 1) + (position,))
+            start += size
+        return slots
+
+    def output_spec(self, *specs):
+        shapes = [tuple(spec.shape) if len(spec.shape) > 0 else (1,) for spec in specs]
+        if len(set(len(shape) for shape in shapes)) > 1:
+            raise utils.errors.WiringError(self.name, "shapes {} have different dimensions".format(
+                [spec.shape for spec in specs]))
+        # axis counts the observation dimension, which is not part of the spec
+        ndim = len(shapes[0]) + 1
+        axis = self.kwargs['axis'] if self.kwargs['axis'] >= 0 else ndim + self.kwargs['axis']
+        if axis <= 0 or axis >= ndim:
+            return None
+        other_dims = [[dim for i, dim in enumerate(shape) if i != axis - 1] for shape in shapes]
+        other_shape = utils.shapes.same_shape(self.name, *[utils.shapes.Spec(tuple(dims), None)
+                                                            for dims in other_dims])
+        concat_dims = [shape[axis-1] for shape in shapes]
+        concat_dim = None if None in concat_dims else sum(concat_dims)
+        shape = list(other_shape)
+        shape.insert(axis - 1, concat_dim)
+        return utils.shapes.Spec(tuple(shape), utils.shapes.result_dtype(*specs))
+
 
 class Slice(StatelessLayer):
     """Apply Numpy array slicing. Each slice corresponds to a dimension.
@@ -190,6 +378,9 @@ class Slice(StatelessLayer):
     - To slice from M to N exclusive: provide a 2-tuple of the integers M and N, e.g. (3, 6).
     - To slice from M to N with skip P: provide a 3-tuple of the integers M, N, and P.
 
+    Slicing a scipy.sparse matrix keeps it sparse, unless an integer removes one of its
+    dimensions, in which case the resulting 1D array is dense.
+
     Parameters
     ----------
     *slices : int(s) or tuple(s)
@@ -213,12 +404,96 @@ class Slice(StatelessLayer):
                 new_slices.append(slice(s[0], None))
             else:
                 new_slices.append(slice(*s))
-        return X[tuple(new_slices)]
+        out = X[tuple(new_slices)]
+        if utils.sparse.is_sparse(out) and any(isinstance(s, int) for s in new_slices):
+            # sparse matrices are always 2D, so densify to drop the indexed dimension
+            out = out.toarray().ravel()
+        return out
+
+
+# comparison operators of Predicate, with their Numpy functions and SQL operators
+PREDICATE_OPS = {'<': (np.less, '<'), '<=': (np.less_equal, '<='),
+                 '>': (np.greater, '>'), '>=': (np.greater_equal, '>='),
+                 '==': (np.equal, '='), '!=': (np.not_equal, '!=')}
+
+
+class Predicate(StatelessLayer):
+    """Compare an array to a literal value, giving a mask to be applied with Filter.
+
+    Unlike a Lambda, the comparison is declared rather than hidden in a function,
+    so that when it is applied directly to an input column, a Pipeline can have a SQL
+    source apply it in the database instead.
+
+    Parameters
+    ----------
+    op : str
+        comparison operator, one of '<', '<=', '>', '>=', '==', '!='.
+    value : any
+        literal value to compare to.
+    """
+    def __init__(self, op, value):
+        if op not in PREDICATE_OPS:
+            raise ValueError("Operator must be one of {}".format(list(PREDICATE_OPS)))
+        super().__init__(op=op, value=value)
+
+    def transform(self, X):
+        return PREDICATE_OPS[self.kwargs['op']][0](X, self.kwargs['value'])
+
+    def sql_predicate(self, column):
+        """The comparison as a column, SQL operator, and literal value."""
+        return (column, PREDICATE_OPS[self.kwargs['op']][1], self.kwargs['value'])
+
+    def output_spec(self, X):
+        return utils.shapes.Spec(X.shape, np.dtype(bool))
 
 
 class Filter(StatelessLayer):
-    """Apply given mask to given array along the first axis to filter out observations."""
+    """Apply given mask to given array along the first axis to filter out observations.
+
+    Rather than copying the kept rows of a Numpy array, the output is a SelectedArray of
+    the positions of those rows, shared by every array filtered with the same mask node. The
+    rows are gathered when first needed by a layer without accepts_selections, or by the
+    Pipeline's outputs. Filters of filtered arrays combine their selections without
+    gathering anything, and storage is written with the index of the kept rows.
+
+    When the mask is a Predicate on an input column, and every output of a Pipeline is
+    filtered by it, the Pipeline pushes the Predicate down to SQL sources (see
+    SQLGenerator.with_predicates); the mask is then still applied to the rows read.
+    """
+    accepts_selections = True
+    mask_input = 1
+
+    def _selection(self, mask):
+        # the Selection of a 1D mask, unless the node of the mask has given it already
+        if utils.isinstance_str(mask, 'Selection'):
+            return mask
+        mask = utils.selection.materialize(mask)
+        if len(mask.shape) != 1:
+            return None
+        return utils.selection.Selection.from_mask(mask)
+
     def transform(self, X, mask):
-        if mask.sum() == 0:
+        selection = self._selection(mask)
+        if selection is None:
+            X = utils.selection.materialize(X)
+            mask = utils.selection.materialize(mask)
+            if mask.sum() == 0:
+                raise ValueError("Mask must retain at least one observation")
+            return X[mask.astype(bool)]
+        if len(selection) == 0:
             raise ValueError("Mask must retain at least one observation")
-        return X[mask.astype(bool)]
+        if utils.selection.is_selected(X):
+            return utils.selection.SelectedArray(
+                X.base, utils.selection.compose(X.selection, selection))
+        if not isinstance(X, np.ndarray):
+            # sparse and ragged rows are kept in their own types
+            return selection.take(X)
+        return utils.selection.SelectedArray(X, selection)
+
+    def row_selection(self, X, mask):
+        return self._selection(mask)
+
+    def output_spec(self, X, mask):
+        if len(mask.shape) > 0:
+            return None
+        return utils.shapes.Spec(X.shape, X.dtype)
@@ -1,5 +1,6 @@
 import numpy as np
 from .core import StatelessLayer
+from .. import utils
 from ..layertools.wrappers import _vectorized_func
 
 try:
@@ -9,19 +10,45 @@ except ImportError:
     pass
 
 
+def _with_tokens(text_func, token_func):
+    # apply token_func to RaggedArrays of tokens, and text_func to arrays of text
+    def func(X):
+        if utils.ragged.is_ragged(X):
+            return token_func(X)
+        return text_func(X)
+    func.cache = getattr(text_func, 'cache', None)
+    return func
+
+
 class RemoveStopwords(StatelessLayer):
     """Remove common, low-information words from all elements of text array.
 
+    Given a RaggedArray of tokens, such as the output of Tokenize, stopword tokens are instead
+    removed from every row at once.
+
     Parameters
     ----------
     language : str (default: english)
         the language in which the text is written.
+    dedupe : bool (default: False)
+        whether to process each distinct text only once, scattering the results back to
+        every element; much faster for repetitive text.
+    cache_size : int (default: 0)
+        when deduplicating, number of results of distinct texts to remember across batches.
     """
-    def __init__(self, language='english'):
+    def __init__(self, language='english', dedupe=False, cache_size=0):
         super().__init__(language=language)
-        self.transform = np.vectorize(self._transform)
+        if dedupe:
+            text_func = _vectorized_func(self._transform, dedupe, cache_size, elementwise=True)
+        else:
+            text_func = np.vectorize(self._transform)
+        self.transform = _with_tokens(text_func, self._transform_tokens)
         nltk.download('stopwords', quiet=True)
 
+    def _transform_tokens(self, X):
+        stops = list(stopwords.words(self.kwargs['language']))
+        return X.mask_values(~np.isin(X.values, stops))
+
     def _transform(self, X):
         stops = set(stopwords.words(self.kwargs['language']))
         return ' '.join(word for word in X.split(' ') if word not in stops)
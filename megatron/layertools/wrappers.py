@@ -1,6 +1,7 @@
 import random
 import numpy as np
 import copy
+from ..utils.cache import LRUCache
 
 
 class _mapped_call:
@@ -29,22 +30,59 @@ def map(layer):
 
 
 class _vectorized_func:
-    def __init__(self, func):
+    def __init__(self, func, dedupe=False, cache_size=0, elementwise=False):
         self.func = func
-
-    def __call__(self, X):
+        self.dedupe = dedupe
+        # apply func to every element, as np.vectorize does, rather than to every row
+        self.elementwise = elementwise
+        # each cached result counts as one unit of the cache's size
+        self.cache = LRUCache(cache_size) if cache_size else None
+
+    def _apply(self, value):
+        if self.cache is None:
+            return self.func(value)
+        key = (value.dtype.str, value.tobytes()) if isinstance(value, np.ndarray) else value
+        result = self.cache.get(key, self)
+        if result is self:
+            result = self.func(value)
+            self.cache.put(key, result, 1)
+        return result
+
+    def _apply_all(self, X):
+        if self.elementwise:
+            return np.vectorize(self.func)(X)
         return np.array([self.func(row) for row in X])
 
-
-def vectorize(layer):
+    def __call__(self, X):
+        if not self.dedupe:
+            return self._apply_all(X)
+        X = np.asarray(X)
+        flat = X.reshape(-1) if self.elementwise else X
+        try:
+            values, inverse = np.unique(flat, return_inverse=True,
+                                        axis=0 if flat.ndim > 1 else None)
+        except TypeError:
+            # values that cannot be sorted are not deduplicated
+            return self._apply_all(X)
+        results = np.array([self._apply(value) for value in values])
+        results = results[inverse.reshape(-1)]
+        return results.reshape(X.shape) if self.elementwise else results
+
+
+def vectorize(layer, dedupe=False, cache_size=0):
     """Cause a layer's transformation to be mapped to each row in the input data.
 
     Parameters
     ----------
     layer : megatron.Layer
         Layer object to be wrapped.
+    dedupe : bool (default: False)
+        whether to apply the transformation only once to each distinct row, scattering the
+        results back to every row; much faster for repetitive, low-cardinality data.
+    cache_size : int (default: 0)
+        when deduplicating, number of results of distinct rows to remember across batches.
     """
-    layer.transform = _vectorized_func(layer.transform)
+    layer.transform = _vectorized_func(layer.transform, dedupe, cache_size)
     return layer
 
 
@@ -66,8 +66,9 @@ class ExploreNode(Node):
 
 class KerasNode(TransformationNode):
     """A particular TransformationNode that holds a Keras Layer."""
-    def partial_fit(self):
-        inputs = [node.output for node in self.inbound_nodes]
+    def partial_fit(self, inputs=None):
+        if inputs is None:
+            inputs = [node.output for node in self.inbound_nodes]
         self.layer.fit(*inputs)
         self._clear_inbounds()
 
@@ -76,7 +77,7 @@ class KerasNode(TransformationNode):
         self.layer.fit(*inputs, epochs=epochs)
         self._clear_inbounds()
 
-    def fit_generator(self, generator, steps_per_epoch, epochs=1):
+    def fit_generator(self, generator, steps_per_epoch, epochs=1, **kwargs):
         """Execute Keras model's fit_generator method.
 
         Parameters
@@ -87,5 +88,8 @@ class KerasNode(TransformationNode):
             number of batches that are considered one full epoch.
         epochs : int
             number of epochs to run for.
+        **kwargs
+            any further arguments to the Keras layer's fit_generator, such as initial_epoch.
         """
-        self.layer.fit_generator(generator, steps_per_epoch=steps_per_epoch, epochs=epochs)
+        self.layer.fit_generator(generator, steps_per_epoch=steps_per_epoch, epochs=epochs,
+                                 **kwargs)
@@ -1,6 +1,11 @@
+import contextlib
 from .. import utils
 
 
+# context of the calls of Nodes without a data type policy, which is reusable
+_NO_POLICY = contextlib.nullcontext()
+
+
 class Node:
     """Base class of pipeline nodes.
 
@@ -16,11 +21,26 @@ class Node:
     outbound_nodes : list of megatron.Node
         nodes to whom this node is connected as an input.
     output : np.ndarray
-        holds the data output by the node's having been run on its inputs.
+        holds the data output by the node's having been run on its inputs. Rows selected
+        by a Filter are gathered into an array when first read.
+    lazy_output : np.ndarray or megatron.utils.selection.SelectedArray
+        the output as held, without gathering selected rows.
+    selection : megatron.utils.selection.Selection or None
+        rows of the Pipeline's input data held in the output, when a Filter upstream has
+        dropped rows; None if it holds every row.
+    mask_selection : megatron.utils.selection.Selection
+        rows where the output, as a 1D mask, is true; found once for each output, and shared
+        by every Filter masking with it.
     outbounds_run : int
         number of outbound nodes that have been executed.
         this is a helper for efficiently removing unneeded data.
     """
+    selection = None
+    tracks_selection = False
+    _output = None
+    _selected = False
+    _mask_selection = None
+
     def __init__(self, inbound_nodes):
         self.inbound_nodes = inbound_nodes
         self.outbound_nodes = []
@@ -29,6 +49,37 @@ class Node:
         self.is_output = False
         self.is_eager = False
 
+    @property
+    def output(self):
+        if self._selected:
+            self._output = self._output.materialize()
+            self._selected = False
+        return self._output
+
+    @output.setter
+    def output(self, data):
+        # whether the rows are still to be gathered is found once, rather than on every read
+        self._output = data
+        self._selected = utils.selection.is_selected(data)
+        self._mask_selection = None
+
+    @property
+    def lazy_output(self):
+        return self._output
+
+    @property
+    def mask_selection(self):
+        if self._mask_selection is None:
+            self._mask_selection = utils.selection.Selection.from_mask(self.output)
+        return self._mask_selection
+
+    def __setstate__(self, state):
+        # nodes pickled before outputs could be lazy held them in a plain attribute
+        if 'output' in state:
+            state['_output'] = state.pop('output')
+        state.setdefault('_selected', utils.selection.is_selected(state.get('_output')))
+        self.__dict__.update(state)
+
     def traverse(self, *path):
         """Return a Node from elsewhere in the graph by navigating to it from this Node.
 
@@ -68,6 +119,8 @@ class InputNode(Node):
         a name to associate with the data; the keys of the Pipeline feed dict will be these names.
     shape : tuple of int
         the shape, not including the observation dimension (1st), of the Numpy arrays to be input.
+    dtype : type or str (default: None)
+        the data type of the Numpy arrays to be input, if known. Used for memory estimates.
 
     Attributes
     ----------
@@ -75,10 +128,18 @@ class InputNode(Node):
         a name to associate with the data; the keys of the Pipeline feed dict will be these names.
     shape : tuple of int
         the shape, not including the observation dimension (1st), of the Numpy arrays to be input.
+    dtype : type or str
+        the data type of the Numpy arrays to be input, if known. Used for memory estimates.
+    n_loads : int
+        number of times data has been loaded into any InputNode, as a class attribute; data
+        held by the same arrays is only known to be unchanged while it stays the same.
     """
-    def __init__(self, name, shape=()):
+    n_loads = 0
+
+    def __init__(self, name, shape=(), dtype=None):
         self.name = name
         self.shape = shape
+        self.dtype = dtype
         super().__init__([])
 
     def load(self, observations):
@@ -96,6 +157,8 @@ class InputNode(Node):
         """
         self.validate_input(observations)
         self.output = observations
+        # not locked, since a race still changes the count
+        InputNode.n_loads += 1
 
     def validate_input(self, observations):
         """Ensure shape of data passed in aligns with shape of the node.
@@ -155,7 +218,16 @@ class TransformationNode(Node):
     is_fitted : bool
         indicates whether the Transformation inside the Node
         has, if necessary, been fit to data.
+    dtype_policy : megatron.utils.dtypes.DTypePolicy or None
+        data types given to the Layer whenever the Node runs it, set by the Pipeline holding
+        the Node; None to leave the Layer's own.
+    tracks_selection : bool
+        whether the rows kept by Filters are followed into this Node's selection, which the
+        Pipeline holding the Node sets only when a layer dropping rows is upstream of it.
     """
+    dtype_policy = None
+    tracks_selection = True
+
     def __init__(self, layer, inbound_nodes, layer_out_index=0):
         super().__init__(inbound_nodes)
         self.layer = layer
@@ -168,34 +240,114 @@ class TransformationNode(Node):
             if (not in_node.is_output) and in_node.outbounds_run == len(in_node.outbound_nodes):
                 in_node.output = None
 
-    def partial_fit(self):
-        """Apply partial fit method from Layer to inbound Nodes' data."""
-        inputs = [node.output for node in self.inbound_nodes]
-        self.layer.partial_fit(*inputs)
+    def _policy(self):
+        # give the Layer this Node's data type policy for one call only, since the Layer may
+        # be shared with Pipelines of other policies; without one, there is nothing to set up
+        if self.dtype_policy is None:
+            return _NO_POLICY
+        return self._set_policy()
+
+    @contextlib.contextmanager
+    def _set_policy(self):
+        previous = self.layer.dtype_policy
+        self.layer.dtype_policy = self.dtype_policy
+        try:
+            yield
+        finally:
+            self.layer.dtype_policy = previous
+
+    def output_spec(self, *in_specs):
+        """Spec of this Node's data, from the specs of its inbound Nodes' data; None if unknown."""
+        with self._policy():
+            out_specs = self.layer.output_spec(*in_specs)
+        if out_specs is None:
+            return None
+        return utils.generic.listify(out_specs)[self.layer_out_index]
+
+    def _inputs(self, inputs):
+        # inbound data, with selected rows gathered unless the layer accepts them lazily
+        if inputs is None:
+            if self.layer.accepts_selections:
+                inputs = [node.lazy_output for node in self.inbound_nodes]
+            else:
+                inputs = [node.output for node in self.inbound_nodes]
+            i = self.layer.mask_input
+            if i is not None and getattr(inputs[i], 'ndim', None) == 1:
+                # a row mask is given as the Selection its node found, shared with other Filters
+                inputs[i] = self.inbound_nodes[i].mask_selection
+            return inputs
+        if self.layer.accepts_selections:
+            return inputs
+        return [utils.selection.materialize(data) for data in inputs]
+
+    def _track_selection(self, inputs, in_selections):
+        # rows of the Pipeline's input data held in the output, following Filters upstream,
+        # given the rows held in each input
+        selection = self.layer.row_selection(*inputs)
+        if selection is not None:
+            return utils.selection.compose(in_selections[0], selection)
+        for in_selection in in_selections:
+            if in_selection is not None:
+                return in_selection
+        return None
+
+    def partial_fit(self, inputs=None):
+        """Apply partial fit method from Layer to inbound Nodes' data.
 
-    def fit(self):
-        """Apply fit method from Layer to inbound Nodes' data."""
-        inputs = [node.output for node in self.inbound_nodes]
+        Parameters
+        ----------
+        inputs : list of np.ndarray (default: None)
+            data to fit to in place of the inbound Nodes' data, such as newly arrived rows.
+        """
+        with self._policy():
+            self.layer.partial_fit(*self._inputs(inputs))
+
+    def fit(self, inputs=None):
+        """Apply fit method from Layer to inbound Nodes' data.
+
+        Parameters
+        ----------
+        inputs : list of np.ndarray (default: None)
+            data to fit to in place of the inbound Nodes' data, such as a sample of it.
+        """
+        inputs = self._inputs(inputs)
         try:
-            self.layer.fit(*inputs)
+            with self._policy():
+                self.layer.fit(*inputs)
         except Exception:
             print("Error thrown by layer named {}".format(self.layer.name))
             raise
 
-    def transform(self, prune=True):
+    def transform(self, prune=True, inputs=None, out=None):
         """Apply and store result of transform method from Layer on inbound Nodes' data.
 
         Parameters
         ----------
         prune : bool (default: True)
             whether to erase data from intermediate nodes after they are fully used.
+        inputs : list of np.ndarray (default: None)
+            data to transform in place of the inbound Nodes' data, such as a sample of it.
+        out : np.ndarray (default: None)
+            preallocated array into which the Layer writes its output, with transform_into.
         """
-        inputs = [node.output for node in self.inbound_nodes]
+        given_inputs = inputs is not None
+        inputs = self._inputs(inputs)
         try:
-            self.output = utils.generic.listify(self.layer.transform(*inputs))[self.layer_out_index]
+            with self._policy():
+                if out is not None:
+                    self.output = self.layer.transform_into(out, *inputs)
+                else:
+                    output = self.layer.transform(*inputs)
+                    self.output = utils.generic.listify(output)[self.layer_out_index]
         except Exception:
             print("Error thrown by layer named {}".format(self.layer.name))
             raise
+        # rows are only tracked for the inbound Nodes' own data
+        if given_inputs or not self.tracks_selection:
+            self.selection = None
+        else:
+            self.selection = self._track_selection(
+                inputs, [in_node.selection for in_node in self.inbound_nodes])
 
         if any(in_node.is_eager for in_node in self.inbound_nodes):
             self.is_eager = True
@@ -1,9 +1,15 @@
 import numpy as np
 import pandas as pd
 from .core import InputNode
+from ..utils.dtypes import columns_from_rows
+from ..utils.sampling import sample_rows, Reservoir
 
 
-def from_dataframe(df, exclude_cols=[], eager=False, nrows=None):
+# number of rows read at a time when sampling from a file or database
+SAMPLE_CHUNK_ROWS = 2 ** 16
+
+
+def from_dataframe(df, exclude_cols=[], eager=False, nrows=None, sample=False, seed=None):
     """Load Input nodes from columns of a Pandas dataframe.
 
     Parameters
@@ -16,16 +22,25 @@ def from_dataframe(df, exclude_cols=[], eager=False, nrows=None):
         whether to load data as well, making for eager execution.
     nrows : int
         number of rows to load when eager is True. Default is for all rows to load.
+    sample : bool (default: False)
+        whether the rows loaded when eager are a random sample rather than the first nrows,
+        for a quick preview of a large dataset. The full fit is left to Pipeline.fit.
+    seed : int (default: None)
+        seed for the random choice of the sample.
     """
     exclude_cols = set(exclude_cols)
     cols = [col for col in df.columns if not col in exclude_cols]
     nodes = [InputNode(col) for col in cols]
     if eager:
-        nodes = [node(df[col].values[:nrows]) for node, col in zip(nodes, cols)]
+        if sample and nrows:
+            rows = sample_rows(len(df), nrows, seed=seed)
+        else:
+            rows = slice(nrows)
+        nodes = [node(df[col].values[rows]) for node, col in zip(nodes, cols)]
     return {node.name: node for node in nodes}
 
 
-def from_csv(filepath, exclude_cols=[], eager=False, nrows=None):
+def from_csv(filepath, exclude_cols=[], eager=False, nrows=None, sample=False, seed=None):
     """Load Input nodes from columns of a CSV file.
 
     Parameters
@@ -38,19 +53,30 @@ def from_csv(filepath, exclude_cols=[], eager=False, nrows=None):
         whether to load data as well, making for eager execution.
     nrows : int
         number of rows to load when eager is True. Default is for all rows to load.
+    sample : bool (default: False)
+        whether the rows loaded when eager are a random sample rather than the first nrows,
+        for a quick preview of a large dataset. The full fit is left to Pipeline.fit.
+    seed : int (default: None)
+        seed for the random choice of the sample.
     """
     exclude_cols = set(exclude_cols)
-    if eager:
-        data = pd.read_csv(f, nrows=nrows)
+    if eager and sample and nrows:
+        cols = [col for col in pd.read_csv(filepath, nrows=2).columns if not col in exclude_cols]
+        reservoir = Reservoir(nrows, seed)
+        for chunk in pd.read_csv(filepath, usecols=cols, chunksize=SAMPLE_CHUNK_ROWS):
+            reservoir.add([chunk[col].to_numpy() for col in cols])
+        nodes = [InputNode(col)(data) for col, data in zip(cols, reservoir.sample())]
+    elif eager:
+        data = pd.read_csv(filepath, nrows=nrows)
         cols = data.columns
         nodes = [InputNode(col)(data[col].values) for col in cols if not col in exclude_cols]
     else:
-        cols = pd.read_csv(f, nrows=2).columns
+        cols = pd.read_csv(filepath, nrows=2).columns
         nodes = [InputNode(col) for col in cols if not col in exclude_cols]
     return {node.name: node for node in nodes}
 
 
-def from_sql(connection, query, eager=False, nrows=None):
+def from_sql(connection, query, eager=False, nrows=None, sample=False, seed=None):
     """Load Input nodes from columns of a Pandas dataframe.
 
     Parameters
@@ -63,16 +89,29 @@ def from_sql(connection, query, eager=False, nrows=None):
         whether to load data as well, making for eager execution.
     nrows : int
         number of rows to load when eager is True. Default is for all rows to load.
+    sample : bool (default: False)
+        whether the rows loaded when eager are a random sample rather than the first nrows,
+        for a quick preview of a large dataset. The full fit is left to Pipeline.fit.
+    seed : int (default: None)
+        seed for the random choice of the sample.
     """
     col_query = query + ' LIMIT 2'
     cursor = connection.execute(col_query)
     cols = [col[0] for col in cursor.description]
     nodes = [InputNode(col) for col in cols]
 
-    if eager:
+    if eager and sample and nrows:
+        reservoir = Reservoir(nrows, seed)
+        cursor.execute(query)
+        rows = cursor.fetchmany(SAMPLE_CHUNK_ROWS)
+        while rows:
+            reservoir.add(columns_from_rows(rows))
+            rows = cursor.fetchmany(SAMPLE_CHUNK_ROWS)
+        nodes = [node(datacol) for node, datacol in zip(nodes, reservoir.sample())]
+    elif eager:
         if nrows:
             query += ' LIMIT {}'.format(nrows)
-        data = np.array(cursor.execute(query).fetchall()).T
+        data = columns_from_rows(cursor.execute(query).fetchall())
         nodes = [node(datacol) for node, datacol in zip(nodes, data)]
 
     return {node.name: node for node in nodes}
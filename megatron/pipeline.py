@@ -1,10 +1,15 @@
 import os
+import time
+import queue
 import inspect
 import sqlite3
+import threading
+import tempfile
 import numpy as np
 import pandas as pd
 import dill as pickle
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from . import utils
 from . import io
 from .nodes.core import InputNode, TransformationNode
@@ -12,6 +17,63 @@ from .nodes.auxiliary import MetricNode, ExploreNode, KerasNode
 from .layertools import wrappers
 
 
+def _fit_shard(pickled_layer, inputs):
+    # fit a copy of a layer to one shard of data in a worker process, returning its metadata
+    layer = pickle.loads(pickled_layer)
+    layer.fit(*inputs)
+    return layer.metadata
+
+
+# members of a DataStore describing the data written, to be saved with its Pipeline
+_STORAGE_MEMBERS = ['output_names', 'dtypes', 'original_shapes', 'array_dtypes']
+
+
+def _put(q, item, stop):
+    # put an item on a bounded queue, giving up once the stream is stopped
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q, stop):
+    # take an item from a queue, giving up once the stream is stopped
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return None
+
+
+def _split_stages(nodes, costs, n_stages):
+    # contiguous stages of nodes, each ending where the running cost is nearest its equal share
+    prefix = np.cumsum([0.] + list(costs))
+    bounds = [0]
+    for k in range(1, n_stages):
+        target = prefix[-1] * k / n_stages
+        ends = range(bounds[-1] + 1, len(nodes) - (n_stages - k) + 1)
+        bounds.append(min(ends, key=lambda end: abs(prefix[end] - target)))
+    bounds.append(len(nodes))
+    return [nodes[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def _tree_merge(layer, metadatas):
+    # combine metadata fit to separate shards pairwise, halving their number at each level
+    while len(metadatas) > 1:
+        merged = []
+        for left, right in zip(metadatas[::2], metadatas[1::2]):
+            layer.metadata = left
+            layer.merge(right)
+            merged.append(layer.metadata)
+        if len(metadatas) % 2 == 1:
+            merged.append(metadatas[-1])
+        metadatas = merged
+    layer.metadata = metadatas[0]
+
+
 class Pipeline:
     """Holds the core computation graph that maps out Layers and manipulates data.
 
@@ -27,6 +89,14 @@ class Pipeline:
         version tag for Pipeline's cache table in the database.
     storage_db : Connection (defeault: 'sqlite')
         database connection to be used for input and output data storage.
+    dtype_policy : megatron.utils.dtypes.DTypePolicy or dict (default: None)
+        data types that layers use when allocating outputs, e.g. float32 computation and uint8
+        indicators. A dict is passed as keyword arguments to DTypePolicy.
+        If None, layers keep their own policy.
+    telemetry : bool or megatron.utils.telemetry.Telemetry (default: True)
+        whether to keep counters and latency histograms of nodes and methods while
+        transforming, or the Telemetry to keep them in. By default, nodes are timed on one
+        call out of every 64 (see Telemetry's node_interval).
 
     Attributes
     ----------
@@ -47,9 +117,34 @@ class Pipeline:
         version tag for Pipeline's cache table in the database.
     storage: Connection (defeault: None)
         storage database for input and output data.
+    dtype_policy : megatron.utils.dtypes.DTypePolicy or None
+        data types that layers use when allocating outputs.
+    specs : dict of megatron.Node to megatron.utils.shapes.Spec
+        shape and data type of each node in path, inferred from the InputNodes; None if unknown.
+        Inferred again after every fit, since some layers only know their shapes once fit.
+    stage_stats : list of dict or None
+        for each stage of the last pipelined transform_generator, its nodes, the batches it has
+        run, its busy time and utilization, and the current and maximum depth of its input queue.
+    watermark : any
+        largest value of the watermark field among the rows fit by refit_incremental;
+        None if it has not been run.
+    spill_report : dict or None
+        nodes spilled, bytes written, and seconds spent spilling during the last transform
+        run with a spill budget.
+    telemetry : megatron.utils.telemetry.Telemetry or None
+        calls, rows, time and bytes output of each node, and calls, rows and latency of
+        transform, transform_generator and the storage's write, read and lookup, with any
+        slow calls captured; None when disabled.
+    required_inputs : list of str
+        names of the inputs that the outputs, metrics, or explorers depend on. Only these are
+        loaded, so they can be passed as include_cols to a data source to skip reading the rest.
+    slots : dict of megatron.Node to 2-tuple of megatron.Node and tuple
+        nodes that transform writes straight into their slice of a Concatenate's output, which
+        is allocated once; each with that node and the index of its slice.
     """
     def __init__(self, inputs, outputs, metrics=[], explorers=[],
-                 name=None, version=None, storage=None, overwrite=False):
+                 name=None, version=None, storage=None, overwrite=False, dtype_policy=None,
+                 telemetry=True):
         self.eager = False
         self.inputs = utils.flatten(utils.listify(inputs))
         self.outputs = utils.flatten(utils.listify(outputs))
@@ -67,6 +162,20 @@ class Pipeline:
             if hasattr(node, 'metadata'):
                 node.metadata = {}
 
+        # give every layer the pipeline-wide data type policy whenever its node runs it
+        self.dtype_policy = dtype_policy
+        if self.dtype_policy is not None:
+            self.dtype_policy = utils.dtypes.make_policy(self.dtype_policy)
+        for node in self.nodes:
+            if isinstance(node, TransformationNode):
+                node.dtype_policy = self.dtype_policy
+
+        # follow the rows kept by Filters only downstream of a layer that drops rows
+        for node in self.path + self.metric_path + self.explore_path:
+            if isinstance(node, TransformationNode):
+                node.tracks_selection = node.layer.drops_rows() or any(
+                    in_node.tracks_selection for in_node in node.inbound_nodes)
+
         # identify output nodes
         for node in self.outputs:
             node.is_output = True
@@ -85,6 +194,13 @@ class Pipeline:
         extra_inputs = set(self.nodes).intersection(self.inputs) - set(self.nodes)
         if len(extra_inputs) > 0:
             utils.errors.ExtraInputsWarning(extra_inputs)
+        self.required_inputs = [node.name for node in self.inputs if node in self.nodes]
+
+        # infer shapes and data types, rejecting incompatible wiring before any data is loaded
+        self._infer_specs()
+        self.spill_report = None
+        self.watermark = None
+        self.stage_stats = None
 
         # setup output data storage
         self.name = name
@@ -96,31 +212,59 @@ class Pipeline:
         else:
             self.storage = None
 
+        # keep runtime telemetry, shared with the storage
+        if telemetry is True:
+            telemetry = utils.telemetry.Telemetry(labels={'pipeline': self.name or ''})
+        self.telemetry = telemetry if telemetry else None
+        if self.storage:
+            self.storage.telemetry = self.telemetry
+
+    def _node_seconds(self):
+        # where the durations of the nodes of a call are kept, when telemetry times the call's
+        # nodes; None otherwise
+        if self.telemetry is not None and self.telemetry.sample_nodes():
+            return {}
+        return None
+
+    def _run_node(self, node, node_seconds=None, **kwargs):
+        # transform a node, recording its duration and output in telemetry if timed
+        if node_seconds is None:
+            node.transform(**kwargs)
+            return
+        start = time.perf_counter()
+        node.transform(**kwargs)
+        seconds = time.perf_counter() - start
+        self.telemetry.record_node(node.name, seconds, node.lazy_output)
+        node_seconds[node.name] = node_seconds.get(node.name, 0.) + seconds
+
     def _reset_run(self, nodes=None):
         nodes = nodes if nodes else self.nodes
         for node in nodes:
             node.outbounds_run = 0
 
     def _load_inputs(self, input_data, nodes=None):
-        # load data into its corresponding InputNodes
+        # load data into its corresponding InputNodes, skipping any that nothing depends on
         if nodes is None:
-            nodes = self.inputs
+            nodes = [node for node in self.inputs if node in self.nodes]
         for node in nodes:
             node.load(input_data[node.name])
 
-    def _fit_generator_node(self, node, input_generator, steps_per_epoch, epochs):
+    def _fit_generator_node(self, node, input_generator, steps_per_epoch, epochs,
+                            start=0, on_batch_end=None):
         # fit a single node that is not a Keras model to a generator
+        if start > steps_per_epoch * epochs: return
         path_nodes = utils.pipeline.topsort(node)[:-1]
         input_nodes = [node for node in path_nodes if isinstance(node, InputNode)]
         transform_nodes = [node for node in path_nodes if isinstance(node, TransformationNode)]
-        for i, batch in enumerate(input_generator):
+        for i, batch in enumerate(input_generator, start):
             self._load_inputs(batch, input_nodes)
             for parent_node in transform_nodes:
                 parent_node.transform(prune=False)
             node.partial_fit()
+            if on_batch_end: on_batch_end(i + 1)
             if i == (steps_per_epoch * epochs): break
 
-    def _fit_generator_keras(self, node, input_generator, steps_per_epoch, epochs):
+    def _fit_generator_keras(self, node, input_generator, steps_per_epoch, epochs, **kwargs):
         # fit a single node that is a Keras model to a generator
         def _generator(node, input_generator):
             path_nodes = utils.pipeline.topsort(node)[:-1]
@@ -135,7 +279,38 @@ class Pipeline:
                     yield [node.output for node in out_nodes]
 
         node.fit_generator(_generator(node, input_generator),
-                           steps_per_epoch=steps_per_epoch, epochs=epochs)
+                           steps_per_epoch=steps_per_epoch, epochs=epochs, **kwargs)
+
+    def _save_fit_checkpoint(self, checkpoint_dir, input_generator, node_index, batch):
+        # persist fitted layers, progress through the path, and position in the data source
+        state = {'node_names': [node.name for node in self.path],
+                 'node_index': node_index, 'batch': batch,
+                 'source': input_generator.tell() if hasattr(input_generator, 'tell') else None,
+                 'layers': {}, 'keras_weights': {}}
+        for i, node in enumerate(self.path):
+            if isinstance(node, KerasNode):
+                state['keras_weights'][i] = node.layer.model.get_weights()
+            elif isinstance(node, TransformationNode):
+                state['layers'][i] = node.layer.__dict__
+        io.checkpoint.save_checkpoint(checkpoint_dir, state)
+
+    def _restore_fit_checkpoint(self, state, input_generator):
+        if state['node_names'] != [node.name for node in self.path]:
+            raise ValueError("Checkpoint was written by a Pipeline with a different path")
+        for i, layer_state in state['layers'].items():
+            self.path[i].layer.__dict__.update(layer_state)
+        for i, weights in state['keras_weights'].items():
+            self.path[i].layer.model.set_weights(weights)
+        if state['source'] is not None and hasattr(input_generator, 'seek'):
+            input_generator.seek(state['source'])
+        else:
+            utils.errors.UnseekableSourceWarning()
+
+    def _infer_specs(self):
+        # shapes and data types of the path, and the slots planned from them; inferred again
+        # after fitting, which settles those learned from data, such as one-hot widths
+        self.specs = utils.shapes.infer_specs(self.path)
+        self.slots = utils.shapes.plan_slots(self.path, self.specs)
 
     def partial_fit(self, input_data):
         """Fit to input data in an incremental way if possible.
@@ -151,30 +326,325 @@ class Pipeline:
             node.partial_fit()
             node.transform()
         self._reset_run()
+        self._infer_specs()
+
+    def _fit_generator_sampled(self, node, input_generator, steps_per_epoch, sample, seed):
+        # fit a single node that tolerates sampling to a reservoir sample of one epoch
+        path_nodes = utils.pipeline.topsort(node)[:-1]
+        input_nodes = [node for node in path_nodes if isinstance(node, InputNode)]
+        transform_nodes = [node for node in path_nodes if isinstance(node, TransformationNode)]
+        reservoir = utils.sampling.Reservoir(sample, seed)
+        for i, batch in enumerate(input_generator, 1):
+            self._load_inputs(batch, input_nodes)
+            for parent_node in transform_nodes:
+                parent_node.transform(prune=False)
+            reservoir.add([in_node.output for in_node in node.inbound_nodes])
+            if i == steps_per_epoch: break
+        node.fit(reservoir.sample())
+
+    def _sampling_modes(self, transform_full):
+        # whether each node must produce its full output: inputs always do, as do the
+        # ancestors of layers that need exact statistics; the rest can run on the sample
+        full = {}
+        for node in reversed(self.path):
+            if isinstance(node, InputNode) or transform_full:
+                full[node] = True
+                continue
+            out_nodes = [out_node for out_node in node.outbound_nodes if out_node in full]
+            full[node] = any(full[out_node] or self._needs_exact_fit(out_node)
+                             for out_node in out_nodes)
+        return full
+
+    def _sampled_inputs(self, node, rows, n_rows, full):
+        # sampled rows of a node's inputs; nodes not producing full outputs hold only the sample
+        inputs = []
+        for in_node in node.inbound_nodes:
+            if not full[in_node]:
+                inputs.append(in_node.output)
+            elif utils.sparse.n_rows(in_node.output) == n_rows:
+                inputs.append(in_node.output[rows])
+            else:
+                raise ValueError("Cannot sample the output of {}, whose rows differ "
+                                 "from the input rows".format(in_node.name))
+        return inputs
+
+    @staticmethod
+    def _transform_sample(node, inputs):
+        # transform a node on sampled rows, without carrying any state learned from them, such
+        # as the last rows kept by TimeSeries, over to transforms of the full data
+        if not utils.isinstance_str(node.layer, 'StatefulLayer'):
+            node.transform(inputs=inputs)
+            return
+        state = dict(node.layer.get_fitted_state())
+        node.transform(inputs=inputs)
+        node.layer.set_fitted_state(state)
+
+    @staticmethod
+    def _needs_exact_fit(node):
+        return (isinstance(node, TransformationNode)
+                and not utils.isinstance_str(node.layer, 'StatelessLayer')
+                and not node.layer.tolerates_sampling)
+
+    def _pushable_predicates(self):
+        # predicates on input columns that filter every output, so the source can apply them
+        filters = defaultdict(set)
+        for node in self.path:
+            if not (isinstance(node, TransformationNode)
+                    and utils.isinstance_str(node.layer, 'Filter')): continue
+            mask = node.inbound_nodes[-1]
+            if (isinstance(mask, TransformationNode)
+                    and utils.isinstance_str(mask.layer, 'Predicate')
+                    and isinstance(mask.inbound_nodes[0], InputNode)):
+                filters[mask].add(node)
+
+        predicates = []
+        for mask, filter_nodes in filters.items():
+            # nodes run on the rows before they are filtered must neither fit nor be outputs
+            unfiltered = set(node for node in self.path if isinstance(node, InputNode))
+            for node in self.path:
+                if any(in_node in unfiltered and in_node not in filter_nodes
+                       for in_node in node.inbound_nodes):
+                    unfiltered.add(node)
+            unfiltered -= filter_nodes
+            if any(node in unfiltered for node in self.outputs):
+                continue
+            if any(isinstance(node, TransformationNode)
+                   and not utils.isinstance_str(node.layer, 'StatelessLayer')
+                   for node in unfiltered):
+                continue
+            predicates.append(mask.layer.sql_predicate(mask.inbound_nodes[0].name))
+        return predicates
+
+    def _push_predicates(self, source):
+        # a copy of a source that supports it, dropping the rows that every output filters out;
+        # the caller's source keeps its own query and position
+        if hasattr(source, 'with_predicates'):
+            predicates = self._pushable_predicates()
+            if predicates:
+                return source.with_predicates(predicates)
+        return source
+
+    def _read_from(self, source, watermark):
+        # rows of an ordered SQL source beyond the watermark, as one array per column
+        source.seek(watermark)
+        batches = []
+        batch = next(source)
+        while batch:
+            batches.append(batch)
+            batch = next(source)
+        if not batches:
+            return {}
+        return {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+
+    def refit_incremental(self, source, watermark_field=None):
+        """Update the fit with the rows that arrived since the last refit.
 
-    def fit(self, input_data, epochs=1):
+        Rows whose watermark field is greater than the watermark are new. Layers supporting
+        partial_fit are updated with the new rows only; other stateful layers are refit to all
+        rows. The first refit, without a watermark, fits every layer to all rows.
+
+        Parameters
+        ----------
+        source : dict of Numpy array or megatron.io.SQLGenerator
+            all rows of input data, or a SQLGenerator with a key_col, which is then used as
+            the watermark field and lets the database select the new rows.
+        watermark_field : str (default: None)
+            name of the increasing field of input data marking the order in which rows arrived.
+            Required when source is a dict.
+
+        Returns
+        -------
+        int
+            number of new rows fit.
+        """
+        if isinstance(source, dict):
+            if watermark_field is None:
+                raise ValueError("watermark_field is required when refitting to a dict of data")
+            full_data = source
+            if self.watermark is None:
+                new_data = source
+            else:
+                new_rows = source[watermark_field] > self.watermark
+                new_data = {name: data[new_rows] for name, data in source.items()}
+        else:
+            if not getattr(source, 'key_col', None):
+                raise ValueError("source must be a dict of data or a SQLGenerator with key_col")
+            watermark_field = source.key_col
+            source = self._push_predicates(source)
+            new_data = self._read_from(source, self.watermark)
+            full_data = None
+
+        n_new = len(new_data[watermark_field]) if new_data else 0
+        if n_new == 0:
+            return 0
+        # keep the watermark a plain Python value, so that databases can bind it
+        new_watermark = new_data[watermark_field].max()
+        if isinstance(new_watermark, np.generic):
+            new_watermark = new_watermark.item()
+        if self.watermark is None:
+            self.fit(new_data)
+            self.watermark = new_watermark
+            return n_new
+
+        # run new rows and, for layers that must be refit, all rows through the path together
+        refit = any(isinstance(node, TransformationNode) and not node.layer.supports_partial_fit()
+                    for node in self.path)
+        if refit and full_data is None:
+            full_data = self._read_from(source, None)
+        input_nodes = [node for node in self.inputs if node in self.nodes]
+        new_outputs = {node: new_data[node.name] for node in input_nodes}
+        full_outputs = {node: full_data[node.name] for node in input_nodes} if refit else {}
+        for node in input_nodes:
+            node.validate_input(new_data[node.name])
+        for node in self.path:
+            if not isinstance(node, TransformationNode): continue
+            new_inputs = [new_outputs[in_node] for in_node in node.inbound_nodes]
+            full_inputs = None
+            if refit:
+                full_inputs = [full_outputs[in_node] for in_node in node.inbound_nodes]
+            if node.layer.supports_partial_fit():
+                node.partial_fit(new_inputs)
+            else:
+                node.fit(full_inputs)
+            node.transform(prune=False, inputs=new_inputs)
+            new_outputs[node] = node.output
+            if refit:
+                node.transform(prune=False, inputs=full_inputs)
+                full_outputs[node] = node.output
+        for node in self.nodes:
+            node.output = None
+        self._reset_run()
+        self._infer_specs()
+        self.watermark = max(self.watermark, new_watermark)
+        return n_new
+
+    def _fit_sharded(self, node, pool, n_shards, inputs=None):
+        # fit a mergeable node to shards of its inputs in parallel and combine the results
+        if inputs is None:
+            inputs = [in_node.output for in_node in node.inbound_nodes]
+        n_shards = min([n_shards, utils.sparse.n_rows(inputs[0])])
+        # split by slicing rows, which is also supported by sparse data
+        bounds = [(rows[0], rows[-1] + 1)
+                  for rows in np.array_split(np.arange(utils.sparse.n_rows(inputs[0])), n_shards)]
+        shards = zip(*[[data[start:end] for start, end in bounds] for data in inputs])
+        pickled_layer = pickle.dumps(node.layer)
+        metadatas = list(pool.map(_fit_shard, [pickled_layer] * n_shards, shards))
+        _tree_merge(node.layer, metadatas)
+
+    def _fit_cached(self, node, fit_cache, inputs, fit):
+        # restore the fitted state of an identical earlier fit, or fit and remember the state
+        if inputs is None:
+            inputs = [in_node.output for in_node in node.inbound_nodes]
+        key = utils.hash.hash_fit(node.layer, inputs)
+        state = fit_cache.get(key)
+        if state is not None:
+            node.layer.set_fitted_state(state)
+            return
+        fit()
+        state = node.layer.get_fitted_state()
+        if state is not None:
+            fit_cache.put(key, state)
+
+    def fit(self, input_data, epochs=1, n_jobs=1, sample=None, stratify=None,
+            transform_full=False, seed=None, fit_cache=None):
         """Fit to input data and overwrite the metadata.
 
+        Stateful layers that define merge() can be fit in parallel: their inputs are split into
+        one shard per job, each shard is fit in its own process, and the resulting metadata is
+        merged. Other layers are fit sequentially.
+
+        When sampling, layers that tolerate sampling are fit to a random sample of the rows,
+        while layers that need exact statistics are still fit to every row. Nodes whose output
+        is only used by sampled layers are transformed on the sample alone, unless
+        transform_full is set.
+
         Parameters
         ----------
         input_data : 2-tuple of dict of Numpy array, Numpy array
             the input data to be passed to InputNodes to begin execution, and the index.
         epochs : int (default: 1)
             number of passes to perform over the data.
+        n_jobs : int (default: 1)
+            number of processes to fit mergeable layers with.
+        sample : int (default: None)
+            number of rows to fit layers that tolerate sampling to. If None, all rows are used.
+        stratify : str (default: None)
+            name of an input whose values define strata, each of which is represented in the
+            sample in proportion to its size.
+        transform_full : bool (default: False)
+            whether to transform every node on the full data even when sampling.
+        seed : int (default: None)
+            seed for the random choice of the sample.
+        fit_cache : megatron.io.FitCache or str (default: None)
+            cache of fitted states, or the directory of one. Layers whose configuration and
+            training data match an earlier fit have its state restored instead of being fit.
+
+        Raises
+        ------
+        ValueError
+            error indicating that a layer tolerating sampling receives data whose rows
+            no longer line up with the input rows, such as the output of a Filter.
         """
-        self._load_inputs(input_data)
-        for node in self.path:
-            if not isinstance(node, TransformationNode): continue
-            if isinstance(node, KerasNode):
-                node.fit(epochs=epochs)
-            else:
-                node.fit()
-            node.transform()
-        self._reset_run()
+        if isinstance(fit_cache, str):
+            fit_cache = io.fitcache.FitCache(fit_cache)
+        pool = ProcessPoolExecutor(n_jobs) if n_jobs > 1 else None
+        try:
+            self._load_inputs(input_data)
+            if sample is not None:
+                n_rows = len(input_data[self.required_inputs[0]])
+                strata = input_data[stratify] if stratify else None
+                rows = utils.sampling.sample_rows(n_rows, sample, strata, seed)
+                full = self._sampling_modes(transform_full)
+            for node in self.path:
+                if not isinstance(node, TransformationNode): continue
+                inputs, fit_inputs = None, None
+                if sample is not None and not full[node]:
+                    inputs = self._sampled_inputs(node, rows, n_rows, full)
+                if sample is not None and node.layer.tolerates_sampling:
+                    fit_inputs = inputs if inputs is not None else self._sampled_inputs(
+                        node, rows, n_rows, full)
+                if isinstance(node, KerasNode):
+                    node.fit(epochs=epochs)
+                    node.transform(inputs=inputs)
+                    continue
+                if (pool and utils.isinstance_str(node.layer, 'StatefulLayer')
+                        and node.layer.is_mergeable()):
+                    fit = lambda: self._fit_sharded(node, pool, n_jobs, fit_inputs)
+                else:
+                    fit = lambda: node.fit(fit_inputs)
+                stateless = utils.isinstance_str(node.layer, 'StatelessLayer')
+                if fit_cache is not None and not stateless:
+                    self._fit_cached(node, fit_cache, fit_inputs, fit)
+                else:
+                    fit()
+                if inputs is not None:
+                    self._transform_sample(node, inputs)
+                else:
+                    node.transform()
+            self._reset_run()
+            self._infer_specs()
+        finally:
+            if pool:
+                pool.shutdown()
 
-    def fit_generator(self, input_generator, steps_per_epoch, epochs=1):
+    def fit_generator(self, input_generator, steps_per_epoch, epochs=1,
+                      checkpoint_dir=None, checkpoint_every=100, resume_from=None,
+                      sample=None, seed=None):
         """Fit to generator of input data batches. Execute partial_fit to each batch.
 
+        When checkpointing, the fitted layers, the progress of the fit through the path, and the
+        position of the generator (if it supports tell() and seek()) are written atomically to
+        checkpoint_dir. Keras nodes are checkpointed at the end of every epoch, and resume from
+        the last completed epoch.
+
+        When sampling, layers that tolerate sampling are instead fit once, to a uniform
+        reservoir sample of the rows of one epoch; other layers are still fit to every batch.
+
+        When every output is filtered by a Predicate on an input column, and input_generator
+        supports with_predicates (such as a SQLGenerator), the Predicate is applied by the
+        source, so the rows it excludes are never read. A filtered copy of the generator is
+        read from the beginning of its result, leaving input_generator itself untouched.
+
         Parameters
         ----------
         input_generator : generator of 2-tuple of dict of Numpy array and Numpy array
@@ -183,19 +653,136 @@ class Pipeline:
             number of batches that are considered one full epoch.
         epochs : int (default: 1)
             number of passes to perform over the data.
+        checkpoint_dir : str (default: None)
+            local directory to write checkpoints to. If None, no checkpoints are written,
+            unless resuming, in which case checkpoints continue to be written to resume_from.
+        checkpoint_every : int (default: 100)
+            number of batches between checkpoints.
+        resume_from : str (default: None)
+            checkpoint directory of an interrupted fit, to continue from its last checkpoint.
+            A generator without tell() and seek() cannot be put back where the fit stopped,
+            so a warning is given and it is read from wherever it is.
+        sample : int (default: None)
+            number of rows to fit layers that tolerate sampling to. If None, all rows are used.
+        seed : int (default: None)
+            seed for the random choice of the sample.
         """
         if sum(isinstance(node, KerasNode) for node in self.path) > 1:
             raise ValueError("Multiple Keras nodes cannot be present when fitting to generator")
-        for node in self.path:
+
+        state = io.checkpoint.load_checkpoint(resume_from) if resume_from else None
+        if resume_from and checkpoint_dir is None:
+            checkpoint_dir = resume_from
+        input_generator = self._push_predicates(input_generator)
+        if state:
+            self._restore_fit_checkpoint(state, input_generator)
+
+        def checkpoint(node_index, batch):
+            if checkpoint_dir:
+                self._save_fit_checkpoint(checkpoint_dir, input_generator, node_index, batch)
+
+        for i, node in enumerate(self.path):
             if not isinstance(node, TransformationNode): continue
+            if state and i < state['node_index']: continue
+            start = state['batch'] if state and i == state['node_index'] else 0
             if isinstance(node, KerasNode):
-                self._fit_generator_keras(node, input_generator, steps_per_epoch, epochs)
+                def on_epoch_end(epoch, logs):
+                    checkpoint(i, (epoch + 1) * steps_per_epoch)
+                self._fit_generator_keras(node, input_generator, steps_per_epoch, epochs,
+                                          initial_epoch=start // steps_per_epoch,
+                                          on_epoch_end=on_epoch_end if checkpoint_dir else None)
+            elif sample is not None and node.layer.tolerates_sampling:
+                self._fit_generator_sampled(node, input_generator, steps_per_epoch, sample, seed)
             else:
-                self._fit_generator_node(node, input_generator, steps_per_epoch, epochs)
+                def on_batch_end(batch):
+                    if batch % checkpoint_every == 0:
+                        checkpoint(i, batch)
+                self._fit_generator_node(node, input_generator, steps_per_epoch, epochs,
+                                         start, on_batch_end)
+            checkpoint(i + 1, 0)
+        self._infer_specs()
+
+    def _peak_row_bytes(self):
+        # peak bytes held per observation when executing the path; None if any size is unknown
+        if any(utils.shapes.row_bytes(self.specs.get(node)) is None for node in self.path):
+            return None
+        return max(held for node, spec, node_bytes, held in
+                   utils.shapes.plan(self.path, self.specs, 1))
+
+    def _transform_out_of_core(self, input_data, index, prune, out_dir, memory_budget,
+                               node_seconds):
+        # stream row chunks through the graph, writing outputs into preallocated memmap files
+        input_data = {name: utils.memory.as_memmap(data) for name, data in input_data.items()}
+        nrows = input_data[list(input_data)[0]].shape[0]
+        if out_dir is None:
+            out_dir = tempfile.mkdtemp(prefix='megatron_')
+
+        # with known output specs, preallocate outputs and size chunks before loading any data
+        output_data = None
+        chunk_size = min(nrows, utils.memory.PROBE_ROWS)
+        chunk_sized = False
+        out_specs = [self.specs.get(node) for node in self.outputs]
+        if all(utils.shapes.row_bytes(spec) is not None for spec in out_specs):
+            output_data = [utils.memory.open_output_memmap(out_dir, 'output{}'.format(i), nrows,
+                                                           spec.shape, spec.dtype)
+                           for i, spec in enumerate(out_specs)]
+            peak_row_bytes = self._peak_row_bytes()
+            if peak_row_bytes is not None:
+                chunk_size = utils.memory.chunk_rows(peak_row_bytes, memory_budget)
+                chunk_sized = True
+        start = 0
+        # with no rows and unknown specs, an empty chunk is run to find the output shapes
+        while start < nrows or output_data is None:
+            end = min(nrows, start + chunk_size)
+            # copy the chunk into memory so that layers are free to modify their inputs
+            self._load_inputs({name: np.array(data[start:end])
+                               for name, data in input_data.items()})
+            peak_bytes = 0
+            for node in self.path:
+                if not isinstance(node, TransformationNode): continue
+                self._run_node(node, node_seconds, prune=prune)
+                peak_bytes = max(peak_bytes, utils.memory.live_bytes(self.path))
+            self._reset_run()
 
-    def transform(self, input_data, index_field=None, prune=True):
+            chunk_output = [node.output for node in self.outputs]
+            if any(out.shape[0] != end - start for out in chunk_output):
+                raise ValueError("Out-of-core transform requires one output row per input row")
+            if output_data is None:
+                output_data = [utils.memory.open_output_memmap(out_dir, 'output{}'.format(i),
+                                                               nrows, out.shape[1:], out.dtype)
+                               for i, out in enumerate(chunk_output)]
+            if not chunk_sized and end > start:
+                # size the remaining chunks from the footprint of the first one
+                chunk_size = utils.memory.chunk_rows(peak_bytes / (end - start), memory_budget)
+                chunk_sized = True
+            for node, out, chunk_out in zip(self.outputs, output_data, chunk_output):
+                if (out.shape[1:], out.dtype) != (chunk_out.shape[1:], chunk_out.dtype):
+                    msg = "Output of '{}' is {} {}, but was inferred as {} {}"
+                    raise ValueError(msg.format(node.name, chunk_out.shape[1:], chunk_out.dtype,
+                                                out.shape[1:], out.dtype))
+                out[start:end] = chunk_out
+            if self.storage and end > start:
+                self.storage.write(chunk_output, index[start:end])
+            start = end
+
+        for out in output_data:
+            out.flush()
+        return output_data
+
+    def transform(self, input_data, index_field=None, prune=True, out_dir=None,
+                  memory_budget=utils.memory.DEFAULT_MEMORY_BUDGET, spill_budget=None,
+                  spill_dir=None):
         """Execute the graph with some input data, get the output nodes' data.
 
+        When any input is a memory-mapped array or a path to a .npy file, the data is processed
+        out-of-core: rows are streamed through the graph in chunks sized to fit the memory budget,
+        and each output is written into a memory-mapped .npy file in out_dir. Stateful layers see
+        the chunks in order, so streaming layers such as TimeSeries keep their continuity.
+
+        With a spill budget, whenever the node outputs held in memory exceed it, those needed
+        furthest in the future are spilled to memory-mapped files, which their consumers then
+        read in place. What was spilled is recorded in spill_report.
+
         Parameters
         ----------
         input_data : dict of Numpy array
@@ -205,61 +792,455 @@ class Pipeline:
         keep_data : bool
             whether to keep data in non-output nodes after execution.
             activating this flag can be useful for debugging.
+        out_dir : str (default: None)
+            directory for the output files of an out-of-core transform.
+            if None, a new temporary directory is created.
+        memory_budget : int (default: 1GB)
+            maximum number of bytes of intermediate data to hold at once during an
+            out-of-core transform.
+        spill_budget : int (default: None)
+            maximum number of bytes of node outputs to hold in memory during an in-memory
+            transform. If None, nothing is spilled.
+        spill_dir : str (default: None)
+            directory for spill files, which are deleted once the transform is over; outputs
+            are always returned in memory. If None, a temporary directory is created for them.
         """
+        start = time.perf_counter()
+        node_seconds = self._node_seconds()
         if index_field:
-            index = input_data.pop(index_field)
+            index = utils.memory.as_memmap(input_data.pop(index_field))
             if len(index.shape) > 1:
                 raise ValueError("Index field cannot be multi-dimensional array; must be 1D")
+            nrows = index.shape[0]
         else:
-            nrows = input_data[list(input_data)[0]].shape[0]
+            first_input = utils.memory.as_memmap(input_data[list(input_data)[0]])
+            nrows = first_input.shape[0]
             index = pd.RangeIndex(stop=nrows)
 
+        if any(utils.memory.is_out_of_core(data) for data in input_data.values()):
+            output_data = self._transform_out_of_core(input_data, index, prune, out_dir,
+                                                      memory_budget, node_seconds)
+            self._record_transform(start, nrows, input_data, node_seconds)
+            return output_data
+
         self._load_inputs(input_data)
+        spiller = utils.memory.Spiller(spill_budget, spill_dir) if spill_budget else None
 
         # run transformation nodes to end of path
-        for node in self.path:
-            if not isinstance(node, TransformationNode): continue
-            node.transform(prune=prune)
+        buffers = {}
+        try:
+            for i, node in enumerate(self.path):
+                if not isinstance(node, TransformationNode): continue
+                self._run_node(node, node_seconds, prune=prune,
+                               out=self._preallocated(node, buffers))
+                if spiller:
+                    spiller.enforce(self.path, i)
+        finally:
+            if spiller:
+                spiller.close()
+                self.spill_report = spiller.report()
         if prune:
             self._reset_run()
 
         output_data = [node.output for node in self.outputs]
         if self.storage:
-            self.storage.write(output_data, index)
+            self.storage.write(output_data, self._output_index(index))
+        self._record_transform(start, nrows, input_data, node_seconds)
         return output_data
 
-    def transform_generator(self, input_generator, steps, index=None):
+    def _preallocated(self, node, buffers):
+        # the array a node writes its output into, when it is planned in slots
+        if node in buffers:
+            # a Concatenate, some of whose inputs have been written into its output; inputs
+            # not as inferred would be cast into it, so it is then concatenated as usual
+            out = buffers.pop(node)
+            return out if self._as_inferred(node.inbound_nodes) else None
+        if node not in self.slots:
+            return None
+        consumer, index = self.slots[node]
+        inputs = [in_node.lazy_output for in_node in node.inbound_nodes]
+        if not inputs or not all(isinstance(data, np.ndarray) or utils.selection.is_selected(data)
+                                 for data in inputs):
+            return None
+        if not self._as_inferred(node.inbound_nodes):
+            return None
+        if consumer not in buffers:
+            spec = self.specs[consumer]
+            buffers[consumer] = np.empty((len(inputs[0]),) + tuple(spec.shape), dtype=spec.dtype)
+        return buffers[consumer][(slice(None),) + index]
+
+    def _as_inferred(self, nodes):
+        # whether the data held by the nodes has the shapes and data types in specs, which
+        # are only declared on InputNodes and may not match the data fed
+        return all(utils.shapes.matches(self.specs.get(node), node.lazy_output) for node in nodes)
+
+    def _output_index(self, index, selections=None):
+        # index of the rows held in the outputs, following any Filter upstream of them; from
+        # the selections held by the output nodes, unless given for each node
+        for node in self.outputs:
+            selection = node.selection if selections is None else selections.get(node)
+            if selection is not None:
+                return index[selection.rows]
+        return index
+
+    def _record_transform(self, start, nrows, input_data, node_seconds):
+        # record a call of transform in telemetry
+        if self.telemetry is not None:
+            self.telemetry.record_method('transform', time.perf_counter() - start, nrows,
+                                         input_data, node_seconds)
+
+    def _run_stage(self, node, buffers, consumers, flush, node_seconds=None):
+        # transform as many buffered rows as the node's preferred batch size allows
+        in_buffers = buffers[node]
+        available = min(buffer.n_rows for buffer in in_buffers)
+        batch_size = node.layer.preferred_batch_size or available
+        while available > 0 and (available >= batch_size or flush):
+            n_rows = min(batch_size, available)
+            self._run_node(node, node_seconds, prune=False,
+                           inputs=[buffer.take(n_rows) for buffer in in_buffers])
+            if utils.sparse.n_rows(node.output) != n_rows:
+                raise ValueError("Re-batching requires one output row per input row, "
+                                 "but {} changes the number of rows".format(node.name))
+            for buffer in consumers[node]:
+                buffer.put(node.output)
+            available -= n_rows
+
+    def _transform_rebatched(self, input_generator, steps, index):
+        # stream batches through the graph, letting each node run at its preferred batch size,
+        # and re-assemble the outputs into the batches produced by the generator
+        transform_nodes = [node for node in self.path if isinstance(node, TransformationNode)]
+        buffers = {node: [utils.batching.RowBuffer() for in_node in node.inbound_nodes]
+                   for node in transform_nodes}
+        output_buffers = [utils.batching.RowBuffer() for node in self.outputs]
+        consumers = defaultdict(list)
+        for node in transform_nodes:
+            for in_node, buffer in zip(node.inbound_nodes, buffers[node]):
+                consumers[in_node].append(buffer)
+        for node, buffer in zip(self.outputs, output_buffers):
+            consumers[node].append(buffer)
+
+        def ready_batches(batches):
+            while batches and all(buffer.n_rows >= batches[0][0] for buffer in output_buffers):
+                n_rows, batch_index = batches.popleft()
+                output_data = [buffer.take(n_rows) for buffer in output_buffers]
+                if self.storage:
+                    self.storage.write(output_data, batch_index)
+                yield output_data
+
+        batches = deque()
+        for i, batch in enumerate(input_generator):
+            if i == steps: break
+            if index:
+                batch_index = batch.pop(index)
+            else:
+                batch_index = pd.RangeIndex(stop=len(batch[self.required_inputs[0]]))
+            self._load_inputs(batch)
+            for node in self.inputs:
+                for buffer in consumers[node]:
+                    buffer.put(node.output)
+            batches.append((len(batch_index), batch_index))
+            node_seconds = self._node_seconds()
+            for node in transform_nodes:
+                self._run_stage(node, buffers, consumers, False, node_seconds)
+            yield from ready_batches(batches)
+        node_seconds = self._node_seconds()
+        for node in transform_nodes:
+            self._run_stage(node, buffers, consumers, True, node_seconds)
+        yield from ready_batches(batches)
+        self._reset_run()
+
+    def _node_costs(self, nodes):
+        # mean seconds per call of each node, as recorded by telemetry; equal costs until every
+        # node has been timed
+        stats = self.telemetry.snapshot()['nodes'] if self.telemetry is not None else {}
+        if not all(stats.get(node.name, {}).get('calls') for node in nodes):
+            return [1.] * len(nodes)
+        return [stats[node.name]['seconds'] / stats[node.name]['calls'] for node in nodes]
+
+    def _transform_pipelined(self, input_generator, steps, index, n_stages, queue_size):
+        # run contiguous stages of the path in their own threads, connected by bounded queues,
+        # so that each stage works on a different batch at the same time
+        transform_nodes = [node for node in self.path if isinstance(node, TransformationNode)]
+        n_stages = max(1, min(n_stages, len(transform_nodes)))
+        stages = _split_stages(transform_nodes, self._node_costs(transform_nodes), n_stages)
+        # data that must be passed on after each stage: what later stages read, and the outputs
+        passed_on = []
+        for i in range(n_stages):
+            later_nodes = [node for stage in stages[i + 1:] for node in stage]
+            passed_on.append(set(in_node for node in later_nodes
+                                 for in_node in node.inbound_nodes).union(self.outputs))
+        queues = [queue.Queue(queue_size) for i in range(n_stages + 1)]
+        stop = threading.Event()
+        start_time = time.perf_counter()
+        self.stage_stats = [{'nodes': [node.name for node in stage], 'batches': 0,
+                             'busy_seconds': 0., 'utilization': 0.,
+                             'queue_depth': 0, 'max_queue_depth': 0} for stage in stages]
+
+        def read():
+            try:
+                for i, batch in enumerate(input_generator):
+                    if i == steps: break
+                    batch = dict(batch)
+                    if index:
+                        batch_index = batch.pop(index)
+                    else:
+                        batch_index = pd.RangeIndex(stop=len(batch[self.required_inputs[0]]))
+                    input_nodes = [node for node in self.inputs if node in self.nodes]
+                    for node in input_nodes:
+                        node.validate_input(batch[node.name])
+                    data = {node: batch[node.name] for node in input_nodes}
+                    # every stage times its nodes on the same batches
+                    timed = self._node_seconds() is not None
+                    _put(queues[0], (batch_index, data, {}, timed), stop)
+                _put(queues[0], None, stop)
+            except Exception as e:
+                _put(queues[0], e, stop)
+
+        def run_stage(i):
+            stats = self.stage_stats[i]
+            while not stop.is_set():
+                stats['queue_depth'] = queues[i].qsize()
+                stats['max_queue_depth'] = max(stats['max_queue_depth'], stats['queue_depth'])
+                item = _get(queues[i], stop)
+                if item is None or isinstance(item, Exception):
+                    _put(queues[i + 1], item, stop)
+                    return
+                batch_start = time.perf_counter()
+                batch_index, data, selections, timed = item
+                try:
+                    for node in stages[i]:
+                        inputs = [data[in_node] for in_node in node.inbound_nodes]
+                        if not node.layer.accepts_selections:
+                            inputs = [utils.selection.materialize(a) for a in inputs]
+                        node_start = time.perf_counter()
+                        with node._policy():
+                            output = node.layer.transform(*inputs)
+                        data[node] = utils.generic.listify(output)[node.layer_out_index]
+                        # rows kept by Filters are tracked for each batch, not in the nodes
+                        if node.tracks_selection:
+                            selection = node._track_selection(
+                                inputs,
+                                [selections.get(in_node) for in_node in node.inbound_nodes])
+                            if selection is not None:
+                                selections[node] = selection
+                        if timed:
+                            self.telemetry.record_node(node.name,
+                                                       time.perf_counter() - node_start,
+                                                       data[node])
+                except Exception as e:
+                    print("Error thrown by layer named {}".format(node.layer.name))
+                    _put(queues[i + 1], e, stop)
+                    return
+                data = {node: output for node, output in data.items() if node in passed_on[i]}
+                selections = {node: selection for node, selection in selections.items()
+                              if node in passed_on[i]}
+                stats['batches'] += 1
+                stats['busy_seconds'] += time.perf_counter() - batch_start
+                stats['utilization'] = stats['busy_seconds'] / (time.perf_counter() - start_time)
+                _put(queues[i + 1], (batch_index, data, selections, timed), stop)
+
+        threads = [threading.Thread(target=read, daemon=True)]
+        threads += [threading.Thread(target=run_stage, args=(i,), daemon=True)
+                    for i in range(n_stages)]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = _get(queues[-1], stop)
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                batch_index, data, selections, timed = item
+                output_data = [utils.selection.materialize(data[node]) for node in self.outputs]
+                if self.storage:
+                    self.storage.write(output_data, self._output_index(batch_index, selections))
+                yield output_data
+        finally:
+            stop.set()
+
+    def transform_generator(self, input_generator, steps, index=None, n_stages=1,
+                            queue_size=2):
         """Execute the graph with some input data from a generator, create generator.
 
+        With more than one stage, the path is split into that many contiguous stages, each run
+        by its own thread and connected to the next by a queue of at most queue_size batches,
+        so that a slow stage no longer holds up the others. Stages are balanced so that each
+        takes about the same time: once telemetry has timed every node, the path is split by
+        the mean time per call of its nodes, and until then by their number. Pipelined stages
+        ignore preferred_batch_size, running every node on the batches produced by
+        input_generator, and do not store outputs in the nodes. Stage activity is recorded
+        in stage_stats.
+
+        When any layer has a preferred_batch_size, rows are buffered between nodes so that
+        each node transforms batches of its preferred size, whatever the size of the batches
+        produced by input_generator. Outputs are still produced for each input batch, with
+        rows in order; every layer must then output one row per input row.
+
+        As in fit_generator, Predicates that filter every output are pushed down to a copy of
+        sources supporting with_predicates.
+
         Parameters
         ----------
         input_generator : dict of Numpy array
             generator producing input data to be passed to Input nodes.
         steps : int
             number of batches to pull from input_generator before terminating.
+        index : str (default: None)
+            name of key from each batch to be used as index for storage and lookup.
+        n_stages : int (default: 1)
+            number of stages to run concurrently.
+        queue_size : int (default: 2)
+            maximum number of batches waiting between two stages.
         """
+        input_generator = self._push_predicates(input_generator)
+        if n_stages > 1:
+            batches = self._transform_pipelined(input_generator, steps, index, n_stages,
+                                                queue_size)
+        elif any(node.layer.preferred_batch_size for node in self.path
+                 if isinstance(node, TransformationNode)):
+            batches = self._transform_rebatched(input_generator, steps, index)
+        else:
+            batches = self._transform_batches(input_generator, steps, index)
+
+        # time each batch, including reading it from input_generator
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    output_data = next(batches)
+                except StopIteration:
+                    break
+                if self.telemetry is not None:
+                    rows = utils.telemetry.n_rows(output_data[0]) if output_data else 0
+                    self.telemetry.record_method('transform_generator',
+                                                 time.perf_counter() - start, rows)
+                yield output_data
+        finally:
+            batches.close()
+
+    def _transform_batches(self, input_generator, steps, index):
+        # transform each batch produced by the generator in turn
         for i, batch in enumerate(input_generator):
-            if i == steps: StopIteration()
+            if i == steps: break
             yield self.transform(batch, index, prune=False)
         self._reset_run()
 
-    def evaluate(self, input_data, prune=True):
-        """Execute the metric Nodes in the Pipeline and get their results.
+    def _terminals(self, selected, nodes):
+        # the metric or explorer nodes requested by run: all, none, or those given or named
+        if selected is True:
+            return list(nodes)
+        if not selected:
+            return []
+        by_name = {node.name: node for node in nodes}
+        terminals = []
+        for node in utils.generic.listify(selected):
+            if isinstance(node, str):
+                if node not in by_name:
+                    raise ValueError("No node named '{}' in the Pipeline".format(node))
+                node = by_name[node]
+            elif node not in nodes:
+                raise ValueError("Node '{}' is not in the Pipeline".format(node.name))
+            terminals.append(node)
+        return terminals
+
+    def run(self, input_data, outputs=True, metrics=True, explorers=False, index_field=None,
+            prune=True):
+        """Execute the outputs, metrics and explorers of the graph together, in a single pass.
+
+        The union of the paths to everything requested is run once, so that nodes shared by the
+        outputs, metrics and explorers, such as a model, are transformed once; metric and
+        explore nodes then read the outputs already computed.
 
         Parameters
         ----------
         input_data : dict of Numpy array
             the input data to be passed to InputNodes to begin execution.
+        outputs : bool (default: True)
+            whether to get the output nodes' data, which is written to storage if any.
+        metrics : bool or list of megatron.Node or str (default: True)
+            the metric Nodes to evaluate, or their names; all if True.
+        explorers : bool or list of megatron.Node or str (default: False)
+            the explorer Nodes to run, or their names; all if True.
+        index_field : str (default: None)
+            name of key from input_data to be used as index for storage.
+        prune : bool (default: True)
+            whether to erase data from intermediate nodes after they are fully used.
+
+        Returns
+        -------
+        dict
+            'outputs', the list of the output nodes' data; 'metrics' and 'explorers', dicts of
+            node name to result; each only if requested.
         """
-        self._load_inputs(input_data)
-        for node in self.metric_path:
+        start = time.perf_counter()
+        node_seconds = self._node_seconds()
+        metric_nodes = self._terminals(metrics, [node for node in self.metric_path
+                                                 if isinstance(node, MetricNode)])
+        explore_nodes = self._terminals(explorers, [node for node in self.explore_path
+                                                    if isinstance(node, ExploreNode)])
+        terminals = (self.outputs if outputs else []) + metric_nodes + explore_nodes
+        path = utils.pipeline.topsort(terminals)
+
+        if index_field:
+            index = input_data.pop(index_field)
+            if len(index.shape) > 1:
+                raise ValueError("Index field cannot be multi-dimensional array; must be 1D")
+        else:
+            index = pd.RangeIndex(stop=len(input_data[list(input_data)[0]]))
+        self._load_inputs(input_data, [node for node in path if isinstance(node, InputNode)])
+
+        # run every node once, in an order where metrics and explorers follow their inputs
+        buffers = {}
+        for node in path:
             if isinstance(node, TransformationNode):
-                node.transform(prune=prune)
+                self._run_node(node, node_seconds, prune=prune,
+                               out=self._preallocated(node, buffers))
             elif isinstance(node, MetricNode):
                 node.evaluate()
+            elif isinstance(node, ExploreNode):
+                node.explore()
         self._reset_run()
-        return {node.name: node.output
-                for node in self.metric_path if isinstance(node, MetricNode)}
+
+        results = {}
+        if outputs:
+            results['outputs'] = [node.output for node in self.outputs]
+            if self.storage:
+                self.storage.write(results['outputs'], self._output_index(index))
+        if metrics:
+            results['metrics'] = {node.name: node.output for node in metric_nodes}
+        if explorers:
+            results['explorers'] = {node.name: node.output for node in explore_nodes}
+        if self.telemetry is not None:
+            self.telemetry.record_method('run', time.perf_counter() - start, len(index),
+                                         input_data, node_seconds)
+        return results
+
+    def run_generator(self, input_generator, steps, **kwargs):
+        """Execute run for each batch in a generator, without pruning between batches.
+
+        Parameters
+        ----------
+        input_generator : generator of dict of Numpy array
+            generator producing input data to be passed to Input nodes.
+        steps : int
+            number of batches to pull from input_generator before terminating.
+        **kwargs
+            the outputs, metrics, explorers and index_field to be passed to run.
+        """
+        for i, batch in enumerate(input_generator):
+            if i == steps: break
+            yield self.run(batch, prune=False, **kwargs)
+
+    def evaluate(self, input_data, prune=True):
+        """Execute the metric Nodes in the Pipeline and get their results.
+
+        Parameters
+        ----------
+        input_data : dict of Numpy array
+            the input data to be passed to InputNodes to begin execution.
+        """
+        return self.run(input_data, outputs=False, metrics=True, prune=prune)['metrics']
 
     def evaluate_generator(self, input_generator, steps):
         """Execute the metric Nodes in the Pipeline for each batch in a generator."""
@@ -268,15 +1249,8 @@ class Pipeline:
             yield self.evaluate(batch, prune=False)
 
     def explore(self, input_data, prune=True):
-        self._load_inputs(input_data)
-        for node in self.explore_path:
-            if isinstance(node, TransformationNode):
-                node.transform(prune=prune)
-            elif isinstance(node, ExploreNode):
-                node.explore()
-        self._reset_run()
-        return {node.name: node.output
-                for node in self.explore_path if isinstance(node, ExploreNode)}
+        return self.run(input_data, outputs=False, metrics=False, explorers=True,
+                        prune=prune)['explorers']
 
     def explore_generator(self, input_generator, steps):
         """Execute the explorer Nodes in the Pipeline for each batch in a generator."""
@@ -284,6 +1258,59 @@ class Pipeline:
             if i == steps: StopIteration()
             yield self.explore(batch, prune=False)
 
+    def explain(self, n_rows):
+        """Print the execution plan, with the estimated memory usage of each node.
+
+        Estimates come from the shapes and data types inferred at construction and after each
+        fit. Nodes whose size cannot be inferred are shown with '?', and are left out of the
+        memory held.
+
+        Parameters
+        ----------
+        n_rows : int
+            number of observations to estimate memory usage for.
+
+        Returns
+        -------
+        int
+            estimated peak number of bytes held during execution.
+        """
+        steps = utils.shapes.plan(self.path, self.specs, n_rows)
+        row_format = '{:<30} {:<20} {:<10} {:>12} {:>12}'
+        lines = [row_format.format('Node', 'Shape', 'Dtype', 'Bytes', 'Held')]
+        for node, spec, node_bytes, held in steps:
+            shape = str((n_rows,) + tuple(spec.shape)) if spec else '?'
+            dtype = str(spec.dtype) if spec and spec.dtype is not None else '?'
+            lines.append(row_format.format(node.name, shape, dtype,
+                                           utils.memory.format_bytes(node_bytes),
+                                           utils.memory.format_bytes(held)))
+        peak = max([held for node, spec, node_bytes, held in steps] + [0])
+        lines.append('Peak memory: {}'.format(utils.memory.format_bytes(peak)))
+        print('\n'.join(lines))
+        return peak
+
+    def find_upcasts(self, input_data):
+        """Execute the graph with some input data and report where data types are widened.
+
+        A sample of the data is enough to find the upcasts.
+
+        Parameters
+        ----------
+        input_data : dict of Numpy array
+            the input data to be passed to InputNodes to begin execution.
+
+        Returns
+        -------
+        list of 3-tuple of str, list of np.dtype, np.dtype
+            the name of each upcasting node, the data types of its inputs, and of its output.
+        """
+        self._load_inputs(input_data)
+        for node in self.path:
+            if not isinstance(node, TransformationNode): continue
+            node.transform(prune=False)
+        self._reset_run()
+        return utils.dtypes.find_upcasts(self.path)
+
     def save(self, save_dir):
         """Store the Pipeline and its learned metadata without the outputs on disk.
 
@@ -308,11 +1335,12 @@ class Pipeline:
                              'path': self.path, 'metric_path': self.metric_path,
                              'explore_path': self.explore_path,
                              'metrics': self.metrics, 'explorers': self.explorers,
-                             'name': self.name, 'version': self.version}
+                             'name': self.name, 'version': self.version,
+                             'dtype_policy': self.dtype_policy, 'watermark': self.watermark}
             if self.storage:
-                storage_info = {'output_names': self.storage.output_names,
-                                'dtypes': self.storage.dtypes,
-                                'original_shapes': self.storage.original_shapes}
+                # storage members that are calculated during writing, if any has happened
+                storage_info = {attr: getattr(self.storage, attr, None)
+                                for attr in _STORAGE_MEMBERS}
                 pipeline_info.update(storage_info)
             pickle.dump(pipeline_info, f)
         # reinsert data into Pipeline
@@ -333,10 +1361,12 @@ def load_pipeline(filepath, storage_db=None):
     with open(filepath, 'rb') as f:
         stored = pickle.load(f)
     P = Pipeline(stored['inputs'], stored['outputs'], stored['metrics'], stored['explorers'],
-                 stored['name'], stored['version'], storage_db)
+                 stored['name'], stored['version'], storage_db,
+                 dtype_policy=stored.get('dtype_policy'))
+    P.watermark = stored.get('watermark')
     if storage_db:
         # storage members that were calculated during writing
-        P.storage.output_names = stored['output_names']
-        P.storage.dtypes = stored['dtypes']
-        P.storage.original_shapes = stored['original_shapes']
+        for attr in _STORAGE_MEMBERS:
+            if stored.get(attr) is not None:
+                setattr(P.storage, attr, stored[attr])
     return P
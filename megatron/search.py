@@ -0,0 +1,224 @@
+import inspect
+import itertools
+import numpy as np
+import dill as pickle
+from concurrent.futures import ProcessPoolExecutor
+from . import utils
+from .nodes.core import InputNode, TransformationNode
+from .nodes.auxiliary import MetricNode
+
+
+def _expand_grid(param_grid):
+    # every combination of values, as a dict of layer name to the keyword arguments to set
+    options = [(layer_name, param, values) for layer_name, params in param_grid.items()
+               for param, values in params.items()]
+    candidates = []
+    for combination in itertools.product(*[values for _, _, values in options]):
+        candidate = {}
+        for (layer_name, param, _), value in zip(options, combination):
+            candidate.setdefault(layer_name, {})[param] = value
+        candidates.append(candidate)
+    return candidates
+
+
+def _rebuild(layer, params):
+    # the layer made again through __init__ with some hyperparameters changed, so that they are
+    # validated as when it was first made; arguments not kept in kwargs are taken from attributes
+    kwargs = dict(layer.kwargs, **params)
+    args, keywords = [], {}
+    for name, param in inspect.signature(type(layer).__init__).parameters.items():
+        if name == 'self':
+            continue
+        if param.kind == param.VAR_POSITIONAL:
+            args += list(kwargs.pop(name, ()))
+        elif param.kind == param.VAR_KEYWORD:
+            keywords.update(kwargs)
+            kwargs = {}
+        elif name in kwargs:
+            keywords[name] = kwargs.pop(name)
+        elif hasattr(layer, name):
+            keywords[name] = getattr(layer, name)
+    # anything left is not a hyperparameter of the layer, for __init__ to reject
+    keywords.update(kwargs)
+    rebuilt = type(layer)(*args, **keywords)
+    # keep what was set on the instance since, such as its name, unless __init__ sets it anew
+    rebuilt.__dict__ = dict(vars(layer), **vars(rebuilt))
+    rebuilt.name = layer.name
+    return rebuilt
+
+
+def _set_params(nodes, params):
+    # replace the hyperparameters of the named layers
+    layers = {node.layer.name: node.layer for node in nodes if isinstance(node, TransformationNode)}
+    for layer_name, layer_params in params.items():
+        layer = layers[layer_name]
+        if utils.isinstance_str(layer, 'Sklearn'):
+            layer.transformation.set_params(**layer_params)
+            continue
+        rebuilt = _rebuild(layer, layer_params)
+        for node in nodes:
+            if isinstance(node, TransformationNode) and node.layer is layer:
+                node.layer = rebuilt
+
+
+def _split_folds(n_rows, n_folds, seed):
+    # pairs of train and test row indices for k-fold cross-validation
+    folds = np.array_split(np.random.RandomState(seed).permutation(n_rows), n_folds)
+    return [(np.sort(np.concatenate(folds[:i] + folds[i + 1:])), np.sort(fold))
+            for i, fold in enumerate(folds)]
+
+
+def _score_candidate(pickled_path, params, frontier_index, suffix_index,
+                     train_outputs, test_outputs):
+    # fit the varied suffix of the graph to the training outputs of the shared prefix,
+    # then evaluate its metrics on the test outputs
+    path = pickle.loads(pickled_path)
+    _set_params(path, params)
+    frontier = [path[i] for i in frontier_index]
+    suffix = [path[i] for i in suffix_index]
+
+    for node, output in zip(frontier, train_outputs):
+        node.output = output
+    for node in suffix:
+        if isinstance(node, TransformationNode):
+            node.fit()
+            node.transform(prune=False)
+
+    for node, output in zip(frontier, test_outputs):
+        node.output = output
+    for node in suffix:
+        if isinstance(node, TransformationNode):
+            node.transform(prune=False)
+        elif isinstance(node, MetricNode):
+            node.evaluate()
+    return {node.name: node.output for node in suffix if isinstance(node, MetricNode)}
+
+
+def grid_search(pipeline, input_data, param_grid, n_folds=3, n_jobs=1, seed=None):
+    """Score every combination of layer hyperparameters by k-fold cross-validation.
+
+    Only the part of the graph that depends on the varied layers is refit for each candidate.
+    In each fold, the prefix of the graph upstream of every varied layer is fit and transformed
+    once, and its outputs are shared by the candidates, which are fit and scored in parallel.
+    Every fit is done on a copy of the pipeline's graph, so the pipeline itself is left as it is.
+
+    Parameters
+    ----------
+    pipeline : megatron.Pipeline
+        the pipeline to be searched, which must have metrics.
+    input_data : dict of Numpy array
+        the input data to be passed to InputNodes, including any labels used by the metrics.
+    param_grid : dict of str to dict of str to list
+        for each layer name, the values to try for each of its keyword arguments.
+        Parameters of Sklearn layers are set on the wrapped estimator; other layers are made
+        again with the values, so that their __init__ validates them.
+    n_folds : int (default: 3)
+        number of cross-validation folds.
+    n_jobs : int (default: 1)
+        number of processes to fit candidates with.
+    seed : int (default: None)
+        seed for the random assignment of rows to folds.
+
+    Returns
+    -------
+    list of dict
+        for each candidate, its 'params', the 'scores' of each metric in every fold,
+        and the 'mean' score of each metric over the folds.
+
+    Raises
+    ------
+    ValueError
+        error indicating that the pipeline has no metrics, or that a layer name in the grid
+        does not identify exactly one layer.
+    """
+    if not pipeline.metrics:
+        raise ValueError("Pipeline must have metrics to be scored")
+    # fit a copy of the graph, without the data it holds
+    outputs = [node.lazy_output for node in pipeline.nodes]
+    for node in pipeline.nodes:
+        node.output = None
+    try:
+        path = pickle.loads(pickle.dumps(pipeline.metric_path))
+    finally:
+        for node, output in zip(pipeline.nodes, outputs):
+            node.output = output
+    for layer_name in param_grid:
+        layers = set(node.layer for node in path
+                     if isinstance(node, TransformationNode) and node.layer.name == layer_name)
+        if len(layers) != 1:
+            raise ValueError("'{}' must name exactly one layer in the pipeline".format(layer_name))
+
+    # split the graph into a prefix independent of the grid and a suffix depending on it
+    varied = set(node for node in path
+                 if isinstance(node, TransformationNode) and node.layer.name in param_grid)
+    dependent = set()
+    for node in path:
+        if node in varied or any(in_node in dependent for in_node in node.inbound_nodes):
+            dependent.add(node)
+    if not varied:
+        dependent = set(node for node in path if isinstance(node, MetricNode))
+    prefix = [node for node in path if node not in dependent]
+    frontier = [node for node in prefix
+                if any(out_node in dependent for out_node in node.outbound_nodes)]
+    frontier_index = [path.index(node) for node in frontier]
+    suffix_index = [i for i, node in enumerate(path) if node in dependent]
+
+    candidates = _expand_grid(param_grid)
+    n_rows = len(input_data[pipeline.required_inputs[0]])
+    pool = ProcessPoolExecutor(n_jobs) if n_jobs > 1 else None
+    scores = [[] for candidate in candidates]
+    try:
+        for train, test in _split_folds(n_rows, n_folds, seed):
+            outputs = []
+            for rows in [train, test]:
+                for node in prefix:
+                    if isinstance(node, InputNode):
+                        node.load(input_data[node.name][rows])
+                    elif isinstance(node, TransformationNode):
+                        if rows is train:
+                            node.fit()
+                        node.transform(prune=False)
+                outputs.append([node.output for node in frontier])
+
+            for node in path:
+                node.output = None
+                node.outbounds_run = 0
+            pickled_path = pickle.dumps(path)
+            args = [[pickled_path] * len(candidates), candidates,
+                    [frontier_index] * len(candidates), [suffix_index] * len(candidates),
+                    [outputs[0]] * len(candidates), [outputs[1]] * len(candidates)]
+            results = pool.map(_score_candidate, *args) if pool else map(_score_candidate, *args)
+            for candidate_scores, result in zip(scores, results):
+                candidate_scores.append(result)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    return [{'params': candidate,
+             'scores': {name: [fold[name] for fold in folds] for name in folds[0]},
+             'mean': {name: np.mean([fold[name] for fold in folds]) for name in folds[0]}}
+            for candidate, folds in zip(candidates, scores)]
+
+
+def cross_validate(pipeline, input_data, n_folds=3, n_jobs=1, seed=None):
+    """Score a pipeline's metrics by k-fold cross-validation.
+
+    Parameters
+    ----------
+    pipeline : megatron.Pipeline
+        the pipeline to be scored, which must have metrics.
+    input_data : dict of Numpy array
+        the input data to be passed to InputNodes, including any labels used by the metrics.
+    n_folds : int (default: 3)
+        number of cross-validation folds.
+    n_jobs : int (default: 1)
+        number of processes to use.
+    seed : int (default: None)
+        seed for the random assignment of rows to folds.
+
+    Returns
+    -------
+    dict of str to list
+        the score of each metric in every fold.
+    """
+    return grid_search(pipeline, input_data, {}, n_folds, n_jobs, seed)[0]['scores']
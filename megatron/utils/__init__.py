@@ -1,4 +1,14 @@
 from . import pipeline
 from . import hash
 from . import errors
+from . import memory
+from . import dtypes
+from . import shapes
+from . import sampling
+from . import cache
+from . import batching
+from . import sparse
+from . import ragged
+from . import selection
+from . import telemetry
 from .generic import *
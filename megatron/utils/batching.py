@@ -0,0 +1,53 @@
+import collections
+import numpy as np
+from . import sparse
+from . import ragged
+
+
+class RowBuffer:
+    """A first-in first-out queue of rows, put in and taken out in batches of any size.
+
+    Attributes
+    ----------
+    n_rows : int
+        number of rows waiting in the buffer.
+    empty : array
+        no rows of the last batch put, taken when no rows are asked for.
+    """
+    def __init__(self):
+        self.chunks = collections.deque()
+        self.n_rows = 0
+        self.empty = np.empty(0)
+
+    def put(self, data):
+        """Append a batch of rows to the end of the buffer."""
+        self.empty = data[:0]
+        if sparse.n_rows(data) > 0:
+            self.chunks.append(data)
+            self.n_rows += sparse.n_rows(data)
+
+    def take(self, n_rows):
+        """Remove and return the first n_rows rows, as a single array.
+
+        Batches are only copied when the rows taken span more than one of them.
+        """
+        n_rows = min(n_rows, self.n_rows)
+        if n_rows <= 0:
+            return self.empty
+        taken = []
+        remaining = n_rows
+        while remaining > 0:
+            chunk = self.chunks.popleft()
+            if sparse.n_rows(chunk) > remaining:
+                self.chunks.appendleft(chunk[remaining:])
+                chunk = chunk[:remaining]
+            taken.append(chunk)
+            remaining -= sparse.n_rows(chunk)
+        self.n_rows -= n_rows
+        if len(taken) == 1:
+            return taken[0]
+        if sparse.any_sparse(taken):
+            return sparse.concatenate(taken, axis=0)
+        if ragged.is_ragged(taken[0]):
+            return ragged.concatenate(taken)
+        return np.concatenate(taken)
@@ -0,0 +1,74 @@
+import collections
+
+
+class LRUCache:
+    """A mapping that evicts its least recently used entries to stay under a size in bytes.
+
+    Parameters
+    ----------
+    max_bytes : int
+        maximum total size of the values held. Values larger than this are not cached.
+
+    Attributes
+    ----------
+    n_bytes : int
+        total size of the values currently held.
+    hits : int
+        number of lookups that found their key.
+    misses : int
+        number of lookups that did not find their key.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries = collections.OrderedDict()
+
+    def get(self, key, default=None):
+        """Look up the value stored under key, marking it as recently used."""
+        if key not in self.entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key][0]
+
+    def put(self, key, value, n_bytes):
+        """Store a value of the given size under key, evicting old entries to make room.
+
+        Parameters
+        ----------
+        key : hashable
+            key to store the value under.
+        value : any
+            the value to be stored.
+        n_bytes : int
+            size of the value, counted towards max_bytes.
+        """
+        self.pop(key)
+        if n_bytes > self.max_bytes:
+            return
+        while self.n_bytes + n_bytes > self.max_bytes:
+            self.pop(next(iter(self.entries)))
+        self.entries[key] = (value, n_bytes)
+        self.n_bytes += n_bytes
+
+    def pop(self, key):
+        """Remove the value stored under key, if any, and return it."""
+        if key not in self.entries:
+            return None
+        value, n_bytes = self.entries.pop(key)
+        self.n_bytes -= n_bytes
+        return value
+
+    def clear(self):
+        """Remove every entry."""
+        self.entries.clear()
+        self.n_bytes = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,89 @@
+import numpy as np
+from .generic import isinstance_str
+
+
+class DTypePolicy:
+    """Data types that layers use when allocating their outputs.
+
+    Parameters
+    ----------
+    float_dtype : type or str (default: np.float64)
+        data type of floating point results, such as those of division.
+    indicator_dtype : type or str (default: np.int64)
+        data type of indicator results, such as one-hot encodings and binary masks.
+    """
+    def __init__(self, float_dtype=np.float64, indicator_dtype=np.int64):
+        self.float_dtype = np.dtype(float_dtype)
+        self.indicator_dtype = np.dtype(indicator_dtype)
+
+    def __repr__(self):
+        return 'DTypePolicy(float_dtype={}, indicator_dtype={})'.format(
+            self.float_dtype, self.indicator_dtype)
+
+
+def make_policy(dtype_policy):
+    """Build a DTypePolicy from a policy, a dict of its arguments, or None for the default.
+
+    Parameters
+    ----------
+    dtype_policy : DTypePolicy, dict, or None
+        the desired policy.
+    """
+    if dtype_policy is None:
+        return DTypePolicy()
+    elif isinstance(dtype_policy, DTypePolicy):
+        return dtype_policy
+    elif isinstance(dtype_policy, dict):
+        return DTypePolicy(**dtype_policy)
+    else:
+        raise TypeError("dtype_policy must be a DTypePolicy or a dict of its arguments")
+
+
+def columns_from_rows(rows):
+    """Convert rows of a query result to one array per column.
+
+    Each column gets its own data type, instead of every column being coerced to the
+    common type of all columns (often str or object) by converting all rows at once.
+    An empty result produces no columns.
+
+    Parameters
+    ----------
+    rows : list of tuple
+        the rows of the query result.
+    """
+    return [np.array(col) for col in zip(*rows)]
+
+
+def _is_upcast(in_dtypes, out_dtype):
+    if out_dtype.kind == 'O':
+        return all(dtype.kind != 'O' for dtype in in_dtypes)
+    if out_dtype.kind not in 'biufc' or any(dtype.kind not in 'biufc' for dtype in in_dtypes):
+        return False
+    return out_dtype.itemsize > max(dtype.itemsize for dtype in in_dtypes)
+
+
+def find_upcasts(nodes):
+    """Find the nodes whose output data type is wider than the data types of their inputs.
+
+    Nodes must hold their outputs, so this is run after a transform that did not prune.
+
+    Parameters
+    ----------
+    nodes : list of megatron.Node
+        the nodes to be checked, usually a Pipeline path.
+
+    Returns
+    -------
+    list of 3-tuple of str, list of np.dtype, np.dtype
+        the name of each upcasting node, the data types of its inputs, and of its output.
+    """
+    upcasts = []
+    for node in nodes:
+        if not isinstance_str(node, 'TransformationNode') or node.output is None:
+            continue
+        in_dtypes = [np.asarray(in_node.output).dtype for in_node in node.inbound_nodes
+                     if in_node.output is not None]
+        out_dtype = np.asarray(node.output).dtype
+        if in_dtypes and _is_upcast(in_dtypes, out_dtype):
+            upcasts.append((node.name, in_dtypes, out_dtype))
+    return upcasts
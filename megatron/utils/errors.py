@@ -8,6 +8,12 @@ class ShapeError(Exception):
         super().__init__(msg)
 
 
+class WiringError(Exception):
+    def __init__(self, name, reason):
+        msg = "Inputs wired into '{}' are incompatible: {}".format(name, reason)
+        super().__init__(msg)
+
+
 class DisconnectedError(Exception):
     def __init__(self, missing_inputs):
         base_msg = "The following inputs are not connected to your provided outputs: {}"
@@ -19,3 +25,10 @@ def ExtraInputsWarning(extra_inputs):
     msg = "Some input nodes provided that aren't used in the graph: {}"
     msg.format(', '.join([node.node_name for node in extra_inputs]))
     warnings.warn(msg)
+
+
+def UnseekableSourceWarning():
+    msg = ("Resuming from a checkpoint without a position in the data source, since the source "
+           "does not support tell() and seek(); batches are read from wherever it now is, "
+           "which may repeat data already fit")
+    warnings.warn(msg)
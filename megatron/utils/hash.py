@@ -1,32 +1,146 @@
 import hashlib
 import inspect
 import numpy as np
+import dill as pickle
 from .generic import isinstance_str
+from . import sparse
+from . import ragged
+
+
+def _update(h, value):
+    # feed a value into a hash: arrays by their contents, anything else by its string
+    if sparse.is_sparse(value):
+        value = value.tocsr()
+        h.update(str(('csr', value.dtype, value.shape)).encode())
+        for part in [value.data, value.indices, value.indptr]:
+            h.update(np.ascontiguousarray(part).data)
+    elif ragged.is_ragged(value):
+        h.update(b'ragged')
+        _update(h, value.values)
+        _update(h, value.offsets)
+    elif isinstance_str(value, 'ndarray'):
+        h.update(str((value.dtype, value.shape)).encode())
+        if value.dtype.kind == 'O':
+            h.update(pickle.dumps(value))
+        else:
+            h.update(np.ascontiguousarray(value).data)
+    else:
+        h.update(str(value).encode())
+
+
+def _as_data(data):
+    # data as an array, keeping sparse and ragged data in their own formats
+    if sparse.is_sparse(data) or ragged.is_ragged(data):
+        return data
+    return np.asarray(data)
+
+
+def layer_config(layer):
+    """Values identifying a layer's class, code and hyperparameters, but not its learned state.
+
+    Parameters
+    ----------
+    layer : megatron.Layer
+        the layer to be identified.
+
+    Returns
+    -------
+    list
+        the class name, the source code of the class and of any wrapped function or estimator
+        parameters when available, the number of outputs and the keyword arguments.
+    """
+    config = [type(layer).__module__, type(layer).__qualname__]
+    try:
+        config.append(inspect.getsource(type(layer)))
+        if isinstance_str(layer, 'Lambda'):
+            config.append(inspect.getsource(layer.transform_fn))
+    except (OSError, TypeError):
+        pass
+    if isinstance_str(layer, 'Sklearn'):
+        config.append(type(layer.transformation).__qualname__)
+        config += sorted(layer.transformation.get_params().items(), key=lambda item: item[0])
+    config.append(getattr(layer, 'n_outputs', None))
+    for key, value in sorted(getattr(layer, 'kwargs', {}).items()):
+        config += [key, value]
+    return config
 
 
 def hash_path(nodes):
+    """Fingerprint a path of nodes by its input data, layer configurations and learned metadata.
+
+    Parameters
+    ----------
+    nodes : list of megatron.Node
+        the path to be fingerprinted, such as a topological sort of a Pipeline.
+
+    Returns
+    -------
+    str
+        the fingerprint.
+    """
     h = hashlib.md5()
     for node in nodes:
         to_str = []
         if isinstance_str(node, 'InputNode'):
             to_str.append(node.output)
         else:
-            if isinstance_str(node.layer, 'Lambda'):
-                to_str.append(inspect.getsource(node.layer.transform_fn))
-            elif isinstance_str(node.layer, 'StatefulLayer'):
-                to_str.append(inspect.getsource(node.layer.partial_fit))
-                to_str.append(inspect.getsource(node.layer.fit))
-                to_str.append(inspect.getsource(node.layer.transform))
-                to_str += list(node.kwargs.values())
+            to_str += layer_config(node.layer)
+            if isinstance_str(node.layer, 'StatefulLayer'):
                 for metadata in node.layer.metadata.values():
                     to_str.append(metadata)
-            elif isinstance_str(node.layer, 'StatelessLayer'):
-                to_str.append(inspect.getsource(node.layer.transform))
-                to_str += list(node.layer.kwargs.values())
 
         for s in to_str:
-            if isinstance_str(s, 'ndarray'):
-                h.update(str(bytes(s)).encode())
-            else:
-                h.update(str(s).encode())
+            _update(h, s)
+    return h.hexdigest()
+
+
+def hash_fit(layer, inputs):
+    """Fingerprint fitting a layer to the given data, to identify fits that can be reused.
+
+    Parameters
+    ----------
+    layer : megatron.Layer
+        the layer to be fit, identified by its configuration rather than its learned state.
+    inputs : list of np.ndarray
+        the data the layer is to be fit to.
+
+    Returns
+    -------
+    str
+        the fingerprint.
+    """
+    h = hashlib.md5()
+    for value in layer_config(layer):
+        _update(h, value)
+    for data in inputs:
+        _update(h, _as_data(data))
+    return h.hexdigest()
+
+
+def hash_call(layer, nodes):
+    """Fingerprint calling a layer eagerly on the data held by the given nodes.
+
+    Two calls share a fingerprint when the layers pickle identically (same class, hyperparameters,
+    functions and learned state) and their input data is equal.
+
+    Parameters
+    ----------
+    layer : megatron.Layer
+        the layer being called, before it is fit.
+    nodes : list of megatron.Node
+        the nodes whose data the layer is called on.
+
+    Returns
+    -------
+    str or None
+        the fingerprint; None if the layer or data cannot be pickled.
+    """
+    h = hashlib.md5()
+    try:
+        h.update(pickle.dumps(layer))
+        for node in nodes:
+            data = node.output
+            _update(h, _as_data(data))
+    except Exception:
+        return None
     return h.hexdigest()
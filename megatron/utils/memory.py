@@ -0,0 +1,200 @@
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+from .generic import isinstance_str
+from . import sparse
+
+
+# default number of bytes that a single chunk of intermediate data may occupy
+DEFAULT_MEMORY_BUDGET = 2 ** 30
+# number of rows in the first chunk, used to measure the per-row footprint of the graph
+PROBE_ROWS = 1024
+
+
+def is_out_of_core(data):
+    """Whether the given input data should be read from disk rather than held in memory.
+
+    Parameters
+    ----------
+    data : np.ndarray or str
+        the data for an InputNode; either an array, a memory-mapped array, or a .npy filepath.
+    """
+    return isinstance(data, np.memmap) or (isinstance(data, str) and data.endswith('.npy'))
+
+
+def as_memmap(data):
+    """Open a .npy filepath as a read-only memory-mapped array; pass arrays through.
+
+    Parameters
+    ----------
+    data : np.ndarray or str
+        the data for an InputNode; either an array, a memory-mapped array, or a .npy filepath.
+    """
+    if isinstance(data, str):
+        return np.load(data, mmap_mode='r')
+    return data
+
+
+def nbytes(data):
+    """Number of bytes held by an array, sparse or dense, or zero if there is no array."""
+    if sparse.is_sparse(data):
+        return sparse.nbytes(data)
+    return data.nbytes if hasattr(data, 'nbytes') else 0
+
+
+def live_bytes(nodes):
+    """Total number of bytes currently held in the outputs of the given nodes."""
+    return sum(nbytes(node.output) for node in nodes)
+
+
+def chunk_rows(bytes_per_row, memory_budget):
+    """Number of rows that can be processed at once without exceeding the memory budget.
+
+    Parameters
+    ----------
+    bytes_per_row : float
+        peak number of bytes held by the graph for each row of input.
+    memory_budget : int
+        maximum number of bytes that may be held at once.
+    """
+    if bytes_per_row <= 0:
+        return PROBE_ROWS
+    return max(1, int(memory_budget // bytes_per_row))
+
+
+def format_bytes(n_bytes):
+    """Human-readable representation of a number of bytes; '?' if unknown."""
+    if n_bytes is None:
+        return '?'
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(n_bytes) < 1024:
+            return '{:.1f}{}'.format(n_bytes, unit)
+        n_bytes /= 1024
+    return '{:.1f}TB'.format(n_bytes)
+
+
+def open_output_memmap(out_dir, filename, nrows, shape, dtype):
+    """Preallocate a memory-mapped .npy file able to hold the full output of a node.
+
+    Parameters
+    ----------
+    out_dir : str
+        directory in which to create the file.
+    filename : str
+        name of the file, without extension.
+    nrows : int
+        total number of rows that the output will hold.
+    shape : tuple of int
+        shape of the output, not including the observation dimension (1st).
+    dtype : np.dtype
+        data type of the output.
+    """
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    filepath = os.path.join(out_dir, '{}.npy'.format(filename))
+    shape = (nrows,) + tuple(shape)
+    return np.lib.format.open_memmap(filepath, mode='w+', dtype=dtype, shape=shape)
+
+
+def in_memory_bytes(data):
+    """Number of bytes of an array held in memory; zero for memory-mapped or missing arrays."""
+    if isinstance(data, np.memmap):
+        return 0
+    return nbytes(data)
+
+
+class Spiller:
+    """Keeps intermediate node outputs under a memory budget by spilling them to memory maps.
+
+    When the outputs held in memory exceed the budget, the outputs whose next use is furthest
+    away in the path are written to .npy files and replaced by copy-on-write memory maps of
+    those files, which their consumers read without copying them back into memory. Once the
+    run is over, close reads the outputs still held back into memory and deletes the files.
+
+    Parameters
+    ----------
+    memory_budget : int
+        maximum number of bytes of node outputs to hold in memory.
+    spill_dir : str (default: None)
+        directory for the spill files. If None, a new temporary directory is created, and
+        deleted on close.
+
+    Attributes
+    ----------
+    spilled : list of str
+        names of the nodes whose outputs have been spilled, in order.
+    bytes_spilled : int
+        total number of bytes written to spill files.
+    spill_seconds : float
+        total time spent writing spill files.
+    """
+    def __init__(self, memory_budget, spill_dir=None):
+        self.memory_budget = memory_budget
+        self.owns_dir = not spill_dir
+        self.spill_dir = spill_dir if spill_dir else tempfile.mkdtemp(prefix='megatron_spill_')
+        if not os.path.exists(self.spill_dir):
+            os.makedirs(self.spill_dir)
+        self.spilled = []
+        self.bytes_spilled = 0
+        self.spill_seconds = 0.
+        self.files = {}
+
+    def _next_use(self, node, positions, position):
+        # position in path of the next node to read this output; beyond the path if none
+        uses = [positions[out_node] for out_node in node.outbound_nodes
+                if positions.get(out_node, -1) > position]
+        return min(uses) if uses else len(positions)
+
+    def _spill(self, node):
+        start = time.perf_counter()
+        filepath = os.path.join(self.spill_dir, 'spill{}.npy'.format(len(self.spilled)))
+        np.save(filepath, node.output)
+        self.bytes_spilled += node.output.nbytes
+        node.output = np.load(filepath, mmap_mode='c')
+        self.spill_seconds += time.perf_counter() - start
+        self.spilled.append(node.name)
+        self.files[node] = filepath
+
+    def enforce(self, path, position):
+        """Spill outputs until those held in memory fit the budget.
+
+        Parameters
+        ----------
+        path : list of megatron.Node
+            nodes in topological order.
+        position : int
+            index in path of the node that was just run.
+        """
+        # input data is owned by the caller, so only intermediate outputs count; rows
+        # selected by a Filter are only held as positions until gathered
+        live = [node for node in path[:position + 1] if not isinstance_str(node, 'InputNode')
+                and in_memory_bytes(node.lazy_output) > 0]
+        held = sum(in_memory_bytes(node.lazy_output) for node in live)
+        live = [node for node in live if isinstance(node.lazy_output, np.ndarray)
+                and node.lazy_output.dtype.kind != 'O']
+        if held <= self.memory_budget:
+            return
+        positions = {node: i for i, node in enumerate(path)}
+        live.sort(key=lambda node: self._next_use(node, positions, position), reverse=True)
+        for node in live:
+            if held <= self.memory_budget:
+                break
+            held -= node.output.nbytes
+            self._spill(node)
+
+    def close(self):
+        """Read outputs still spilled back into plain arrays, and delete the spill files."""
+        for node, filepath in self.files.items():
+            if isinstance(node.lazy_output, np.memmap):
+                node.output = np.array(node.output)
+            os.remove(filepath)
+        self.files = {}
+        if self.owns_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def report(self):
+        """Summary of the spilling done: nodes spilled, bytes written, and seconds taken."""
+        return {'nodes': list(self.spilled), 'bytes': self.bytes_spilled,
+                'seconds': self.spill_seconds}
@@ -0,0 +1,199 @@
+import numpy as np
+from .generic import isinstance_str
+
+
+def is_ragged(data):
+    """Whether the given data is a RaggedArray."""
+    return isinstance_str(data, 'RaggedArray')
+
+
+class RaggedArray:
+    """Rows of varying length, held as one flat array of values and the offsets of the rows.
+
+    Row i holds values[offsets[i]:offsets[i + 1]]. Operations over every row are done on the
+    flat values at once, rather than on one Python object per row.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        1D array of the values of every row, one row after another.
+    offsets : np.ndarray
+        1D array of n_rows + 1 positions in values: where each row starts, then len(values).
+
+    Attributes
+    ----------
+    values : np.ndarray
+        1D array of the values of every row, one row after another.
+    offsets : np.ndarray
+        1D int64 array of where each row starts in values, then len(values).
+    """
+    def __init__(self, values, offsets):
+        self.values = np.asarray(values)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if self.values.ndim != 1 or self.offsets.ndim != 1 or len(self.offsets) == 0:
+            raise ValueError("Values and offsets must be 1-dimensional, with at least one offset")
+        if self.offsets[0] != 0 or self.offsets[-1] != len(self.values):
+            raise ValueError("Offsets must start at 0 and end at the number of values")
+        if (np.diff(self.offsets) < 0).any():
+            raise ValueError("Offsets must be non-decreasing")
+
+    @classmethod
+    def from_lengths(cls, values, lengths):
+        """Build from the flat values and the number of values in each row."""
+        return cls(values, np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]))
+
+    @classmethod
+    def from_rows(cls, rows, dtype=None):
+        """Build from a sequence of rows, such as an object array of lists.
+
+        Parameters
+        ----------
+        rows : iterable of sequence
+            the values of each row.
+        dtype : np.dtype (default: None)
+            data type of the values. If None, it is inferred from the values.
+        """
+        rows = [np.asarray(row, dtype=dtype).ravel() for row in rows]
+        lengths = [len(row) for row in rows]
+        # empty rows would impose their default data type on the values
+        nonempty = [row for row in rows if len(row) > 0]
+        values = np.concatenate(nonempty) if nonempty else np.empty(0, dtype=dtype)
+        return cls.from_lengths(values.astype(dtype) if dtype else values, lengths)
+
+    @property
+    def shape(self):
+        return (len(self), None)
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.offsets.nbytes
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def __repr__(self):
+        return 'RaggedArray({})'.format([row.tolist() for row in self])
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            key = key + len(self) if key < 0 else key
+            return self.values[self.offsets[key]:self.offsets[key + 1]]
+        if isinstance(key, slice) and key.step in (None, 1):
+            # contiguous rows share the values without copying them
+            start, stop, _ = key.indices(len(self))
+            stop = max(start, stop)
+            return RaggedArray(self.values[self.offsets[start]:self.offsets[stop]],
+                               self.offsets[start:stop + 1] - self.offsets[start])
+        rows = np.arange(len(self))[key]
+        lengths = self.lengths()[rows]
+        new_offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+        positions = (np.arange(new_offsets[-1]) - np.repeat(new_offsets[:-1], lengths)
+                     + np.repeat(self.offsets[:-1][rows], lengths))
+        return RaggedArray(self.values[positions], new_offsets)
+
+    def lengths(self):
+        """Number of values in each row."""
+        return np.diff(self.offsets)
+
+    def row_ids(self):
+        """Row of each value."""
+        return np.repeat(np.arange(len(self)), self.lengths())
+
+    def positions(self):
+        """Position of each value within its row."""
+        return np.arange(len(self.values)) - np.repeat(self.offsets[:-1], self.lengths())
+
+    def astype(self, dtype):
+        """Copy with the values converted to the given data type."""
+        return RaggedArray(self.values.astype(dtype), self.offsets)
+
+    def map_values(self, func):
+        """Apply a vectorized function to the flat values, keeping the rows as they are."""
+        values = np.asarray(func(self.values))
+        if values.shape != self.values.shape:
+            raise ValueError("Function must return one value for each value")
+        return RaggedArray(values, self.offsets)
+
+    def mask_values(self, keep):
+        """Keep only the values for which the boolean array keep is True, in their rows."""
+        keep = np.asarray(keep, dtype=bool)
+        lengths = np.bincount(self.row_ids()[keep], minlength=len(self))
+        return RaggedArray.from_lengths(self.values[keep], lengths)
+
+    def truncate(self, max_len, from_end=False):
+        """Keep at most max_len values of each row: the first ones, or the last ones."""
+        if from_end:
+            keep = self.positions() >= np.repeat(self.lengths() - max_len, self.lengths())
+        else:
+            keep = self.positions() < max_len
+        return self.mask_values(keep)
+
+    def to_dense(self, max_len=None, pad_value=0, truncating='post', padding='post'):
+        """Truncate and pad the rows to a dense 2D array of shape (n_rows, max_len).
+
+        Parameters
+        ----------
+        max_len : int (default: None)
+            number of columns; if None, the length of the longest row.
+        pad_value : any (default: 0)
+            value of the entries beyond the end of a row.
+        truncating : str (default: 'post')
+            'post' to keep the first max_len values of longer rows, 'pre' to keep the last.
+        padding : str (default: 'post')
+            'post' to pad after the values of shorter rows, 'pre' to pad before them.
+        """
+        if max_len is None:
+            max_len = int(self.lengths().max()) if len(self) > 0 else 0
+        data = self.truncate(max_len, from_end=(truncating == 'pre'))
+        dtype = data.values.dtype
+        if dtype.kind in 'biufc':
+            dtype = np.result_type(dtype, np.min_scalar_type(pad_value))
+        out = np.full((len(data), max_len), pad_value, dtype=dtype)
+        cols = data.positions()
+        if padding == 'pre':
+            cols = cols + np.repeat(max_len - data.lengths(), data.lengths())
+        out[data.row_ids(), cols] = data.values
+        return out
+
+    def reduce(self, ufunc, empty_value=0):
+        """Reduce each row to a single value with a Numpy ufunc, such as np.add or np.maximum.
+
+        Parameters
+        ----------
+        ufunc : np.ufunc
+            binary function by which to reduce the values of each row.
+        empty_value : any (default: 0)
+            result for rows without values.
+        """
+        nonempty = self.lengths() > 0
+        dtype = ufunc.reduce(self.values[:1]).dtype if len(self.values) else self.values.dtype
+        out = np.full(len(self), empty_value, dtype=np.result_type(dtype, type(empty_value)))
+        if nonempty.any():
+            out[nonempty] = ufunc.reduceat(self.values, self.offsets[:-1][nonempty])
+        return out
+
+    def to_rows(self):
+        """Object array with one array of values per row."""
+        out = np.empty(len(self), dtype=object)
+        for i, row in enumerate(self):
+            out[i] = row
+        return out
+
+
+def concatenate(arrays):
+    """Join RaggedArrays one after another into a single RaggedArray."""
+    values = np.concatenate([a.values for a in arrays])
+    lengths = np.concatenate([a.lengths() for a in arrays])
+    return RaggedArray.from_lengths(values, lengths)
@@ -0,0 +1,113 @@
+import numpy as np
+from . import sparse
+
+
+def sample_rows(nrows, n, strata=None, seed=None):
+    """Choose a random sample of row indices, optionally stratified.
+
+    Parameters
+    ----------
+    nrows : int
+        total number of rows to sample from.
+    n : int
+        number of rows in the sample. If at least nrows, every row is chosen.
+    strata : np.ndarray (default: None)
+        1D array of the stratum of each row. When given, each stratum is represented in the
+        sample in proportion to its size, with at least one row.
+    seed : int (default: None)
+        seed for the random number generator.
+
+    Returns
+    -------
+    np.ndarray
+        sorted indices of the sampled rows.
+    """
+    if n >= nrows:
+        return np.arange(nrows)
+    rng = np.random.RandomState(seed)
+    if strata is None:
+        return np.sort(rng.choice(nrows, n, replace=False))
+
+    values, inverse, counts = np.unique(strata, return_inverse=True, return_counts=True)
+    allocation = np.maximum(1, np.round(counts * n / nrows).astype(int))
+    indices = []
+    for i, count in enumerate(allocation):
+        stratum_rows = np.flatnonzero(inverse == i)
+        indices.append(rng.choice(stratum_rows, min(count, len(stratum_rows)), replace=False))
+    return np.sort(np.concatenate(indices))
+
+
+class Reservoir:
+    """A uniform random sample of fixed size over a stream of batches of rows.
+
+    Dense arrays are kept in preallocated arrays; scipy.sparse matrices are kept as the column
+    indices and values of each of their rows, and rebuilt as CSR matrices by sample().
+
+    Parameters
+    ----------
+    n : int
+        number of rows to keep.
+    seed : int (default: None)
+        seed for the random number generator.
+
+    Attributes
+    ----------
+    n_seen : int
+        number of rows that have been added.
+    """
+    def __init__(self, n, seed=None):
+        self.n = n
+        self.rng = np.random.RandomState(seed)
+        self.n_seen = 0
+        self.arrays = None
+        self.n_cols = None
+
+    def _allocate(self, arrays):
+        # one list of rows per sparse matrix, with its number of columns; else an empty array
+        self.arrays = [[None] * self.n if sparse.is_sparse(a)
+                       else np.empty((self.n,) + a.shape[1:], dtype=a.dtype) for a in arrays]
+        self.n_cols = [a.shape[1] if sparse.is_sparse(a) else None for a in arrays]
+
+    def add(self, arrays):
+        """Offer a batch of rows to the sample; each row is kept with equal probability.
+
+        Parameters
+        ----------
+        arrays : list of np.ndarray or scipy.sparse matrix
+            row-aligned arrays making up the batch.
+        """
+        batch_size = sparse.n_rows(arrays[0])
+        if self.arrays is None:
+            self._allocate(arrays)
+        if [sparse.is_sparse(a) for a in arrays] != [isinstance(r, list) for r in self.arrays]:
+            raise ValueError("Each array must be sparse in every batch or in none")
+        # widen the kept rows to hold every batch, such as longer fixed-width strings
+        self.arrays = [reservoir if isinstance(reservoir, list)
+                       or reservoir.dtype == np.result_type(reservoir, a)
+                       else reservoir.astype(np.result_type(reservoir, a))
+                       for reservoir, a in zip(self.arrays, arrays)]
+        positions = self.n_seen + np.arange(batch_size)
+
+        # fill the reservoir until it is full, then replace rows at random
+        fill = positions < self.n
+        slots = np.where(fill, positions, self.rng.randint(0, positions + 1))
+        keep = slots < self.n
+        for i, (reservoir, a) in enumerate(zip(self.arrays, arrays)):
+            if isinstance(reservoir, list):
+                if a.shape[1] != self.n_cols[i]:
+                    raise ValueError("Sparse arrays must have the same number of columns in "
+                                     "every batch")
+                # later rows given the same slot replace earlier ones, as for dense arrays
+                for slot, row in zip(slots[keep], sparse.split_rows(a.tocsr()[keep])):
+                    reservoir[slot] = row
+            else:
+                reservoir[slots[keep]] = a[keep]
+        self.n_seen += batch_size
+
+    def sample(self):
+        """The rows currently kept, as one array per input array; sparse ones as CSR matrices."""
+        if self.arrays is None:
+            return []
+        size = min(self.n, self.n_seen)
+        return [sparse.join_rows(a[:size], n_cols) if isinstance(a, list) else a[:size]
+                for a, n_cols in zip(self.arrays, self.n_cols)]
@@ -0,0 +1,128 @@
+import numpy as np
+from . import sparse
+
+
+def is_selected(data):
+    """Whether the given data is a SelectedArray."""
+    # defined below, so it can be checked directly rather than by the names of base classes
+    return isinstance(data, SelectedArray)
+
+
+def materialize(data):
+    """The rows of a SelectedArray gathered into an array; other data is passed through."""
+    return data.materialize() if is_selected(data) else data
+
+
+def compose(outer, inner):
+    """Selection of the rows selected by inner out of those selected by outer.
+
+    Parameters
+    ----------
+    outer : Selection or None
+        the first selection; None if every row was kept.
+    inner : Selection
+        selection out of the rows selected by outer.
+    """
+    if outer is None:
+        return inner
+    return Selection(outer.rows[inner.rows], outer.n_rows)
+
+
+class Selection:
+    """Positions of the rows kept out of a number of rows, shared by every array they select.
+
+    Parameters
+    ----------
+    rows : np.ndarray
+        1D array of the positions of the kept rows, in order.
+    n_rows : int
+        number of rows selected from.
+
+    Attributes
+    ----------
+    rows : np.ndarray
+        1D int64 array of the positions of the kept rows, in order.
+    n_rows : int
+        number of rows selected from.
+    """
+    def __init__(self, rows, n_rows):
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_mask(cls, mask):
+        """Selection of the rows where a 1D mask is true, or nonzero."""
+        mask = np.asarray(mask)
+        if mask.dtype.kind in 'USV':
+            raise TypeError("Mask must not be of type {}".format(mask.dtype))
+        if mask.ndim != 1:
+            raise ValueError("Mask must be 1-dimensional")
+        return cls(np.flatnonzero(mask.astype(bool)), len(mask))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def take(self, data):
+        """The selected rows of an array, sparse, ragged or dense."""
+        if sparse.is_sparse(data):
+            return data.tocsr()[self.rows]
+        if isinstance(data, np.ndarray):
+            return np.take(data, self.rows, axis=0)
+        return data[self.rows]
+
+
+class SelectedArray:
+    """Rows of an array picked out by a Selection, gathered only once they are needed.
+
+    Filter produces these, so that filtering is free until a layer needs the rows of its
+    input laid out contiguously. Layers with accepts_selections read them as they are,
+    and the others are given their materialized rows.
+
+    Parameters
+    ----------
+    base : np.ndarray or scipy.sparse matrix or RaggedArray
+        the array selected from.
+    selection : Selection
+        the rows of base that are selected.
+    """
+    def __init__(self, base, selection):
+        self.base = base
+        self.selection = selection
+        self._data = None
+
+    @property
+    def shape(self):
+        return (len(self.selection),) + tuple(self.base.shape[1:])
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def dtype(self):
+        return self.base.dtype
+
+    @property
+    def nbytes(self):
+        # only the positions are held, until the rows are gathered
+        if self._data is not None:
+            return sparse.nbytes(self._data) if sparse.is_sparse(self._data) else self._data.nbytes
+        return self.selection.rows.nbytes
+
+    def __len__(self):
+        return len(self.selection)
+
+    def __repr__(self):
+        return 'SelectedArray({} of {} rows)'.format(len(self.selection), self.selection.n_rows)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.materialize(), dtype=dtype)
+
+    def __getitem__(self, key):
+        return self.materialize()[key]
+
+    def materialize(self):
+        """The selected rows, gathered once and then kept."""
+        if self._data is None:
+            self._data = self.selection.take(self.base)
+        return self._data
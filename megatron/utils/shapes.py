@@ -0,0 +1,194 @@
+import collections
+import numpy as np
+from .generic import isinstance_str
+from . import errors
+
+
+Spec = collections.namedtuple('Spec', ['shape', 'dtype'])
+Spec.__doc__ = """Shape, not including the observation dimension (1st), and data type of node data.
+
+A dimension of None, or a dtype of None, means that it is not known before data is seen.
+"""
+
+
+def row_bytes(spec):
+    """Number of bytes taken by one observation of data with the given spec, None if unknown."""
+    if spec is None or spec.dtype is None or spec.dtype.kind == 'O':
+        return None
+    if any(dim is None for dim in spec.shape):
+        return None
+    return int(np.prod(spec.shape, dtype=np.int64)) * spec.dtype.itemsize
+
+
+def matches(spec, data):
+    """Whether data has the shape and data type of the given spec, where they are known."""
+    if spec is None or not hasattr(data, 'shape') or not hasattr(data, 'dtype'):
+        return False
+    shape = tuple(data.shape[1:])
+    if len(shape) != len(spec.shape):
+        return False
+    if any(dim is not None and dim != data_dim for dim, data_dim in zip(spec.shape, shape)):
+        return False
+    return spec.dtype is None or data.dtype == spec.dtype
+
+
+def result_dtype(*specs):
+    """Data type resulting from arithmetic between data of the given specs, None if unknown."""
+    if any(spec.dtype is None for spec in specs):
+        return None
+    return np.result_type(*[spec.dtype for spec in specs])
+
+
+def same_shape(name, *specs):
+    """Shape shared by data of the given specs, which must not differ.
+
+    Raises
+    ------
+    megatron.utils.errors.WiringError
+        error indicating that the shapes can never be equal.
+    """
+    if len(set(len(spec.shape) for spec in specs)) > 1:
+        raise errors.WiringError(name, "shapes {} must be equal".format(
+            [spec.shape for spec in specs]))
+    out = []
+    for dims in zip(*[spec.shape for spec in specs]):
+        known = set(dim for dim in dims if dim is not None)
+        if len(known) > 1:
+            raise errors.WiringError(name, "shapes {} must be equal".format(
+                [spec.shape for spec in specs]))
+        out.append(known.pop() if known else None)
+    return tuple(out)
+
+
+def broadcast_shape(name, *specs):
+    """Shape resulting from broadcasting data of the given specs together.
+
+    Raises
+    ------
+    megatron.utils.errors.WiringError
+        error indicating that the shapes can never be broadcast together.
+    """
+    ndim = max(len(spec.shape) for spec in specs)
+    shapes = [(1,) * (ndim - len(spec.shape)) + tuple(spec.shape) for spec in specs]
+    out = []
+    for dims in zip(*shapes):
+        known = set(dim for dim in dims if dim is not None and dim != 1)
+        if len(known) > 1:
+            raise errors.WiringError(name, "shapes {} cannot be broadcast together".format(
+                [spec.shape for spec in specs]))
+        if known:
+            out.append(known.pop())
+        elif any(dim is None for dim in dims):
+            out.append(None)
+        else:
+            out.append(1)
+    return tuple(out)
+
+
+def infer_specs(nodes):
+    """Infer the spec of every node from the specs of InputNodes and the layers' declarations.
+
+    Parameters
+    ----------
+    nodes : list of megatron.Node
+        nodes in topological order, such as a Pipeline path.
+
+    Returns
+    -------
+    dict of megatron.Node to Spec
+        spec of each node; None when it cannot be inferred.
+
+    Raises
+    ------
+    megatron.utils.errors.WiringError
+        error indicating that a layer can never accept the data from its inbound nodes.
+    """
+    specs = {}
+    for node in nodes:
+        if isinstance_str(node, 'InputNode'):
+            dtype = getattr(node, 'dtype', None)
+            dtype = np.dtype(dtype) if dtype is not None else None
+            specs[node] = Spec(tuple(node.shape), dtype)
+        elif isinstance_str(node, 'TransformationNode'):
+            in_specs = [specs.get(in_node) for in_node in node.inbound_nodes]
+            if any(spec is None for spec in in_specs):
+                specs[node] = None
+                continue
+            specs[node] = node.output_spec(*in_specs)
+    return specs
+
+
+def plan(nodes, specs, n_rows):
+    """Estimate the memory used by each node, and the memory held, when executing a path.
+
+    Data is assumed to be pruned as soon as every outbound node has been run.
+
+    Parameters
+    ----------
+    nodes : list of megatron.Node
+        nodes in topological order, such as a Pipeline path.
+    specs : dict of megatron.Node to Spec
+        spec of each node, from infer_specs.
+    n_rows : int
+        number of observations to be processed.
+
+    Returns
+    -------
+    list of 4-tuple of Node, Spec, int or None, int
+        each node, its spec, the bytes of its output, and the bytes held while it runs.
+        outputs of unknown size are not counted, making the bytes held a lower bound.
+    """
+    remaining = {node: len([out_node for out_node in node.outbound_nodes if out_node in nodes])
+                 for node in nodes}
+    live = {}
+    steps = []
+    for node in nodes:
+        per_row = row_bytes(specs.get(node))
+        node_bytes = per_row * n_rows if per_row is not None else None
+        live[node] = node_bytes or 0
+        steps.append((node, specs.get(node), node_bytes, sum(live.values())))
+        for in_node in node.inbound_nodes:
+            if in_node in remaining:
+                remaining[in_node] -= 1
+                if remaining[in_node] == 0 and not in_node.is_output:
+                    live.pop(in_node, None)
+    return steps
+
+
+def plan_slots(nodes, specs):
+    """Find the nodes that can be run straight into their slice of an outbound node's output.
+
+    The outbound node's layer must lay out its inputs side by side, as Concatenate does,
+    and its output spec must be fully known, so that its output can be allocated before
+    its inputs are run. Each inbound node must feed only that node, not be an output of
+    the Pipeline, and have a layer with a single output that keeps the rows of its inputs.
+
+    Parameters
+    ----------
+    nodes : list of megatron.Node
+        nodes in topological order, such as a Pipeline path.
+    specs : dict of megatron.Node to Spec
+        spec of each node, from infer_specs.
+
+    Returns
+    -------
+    dict of megatron.Node to 2-tuple of Node and tuple
+        for each such node, the node into whose output it is written, and the index of its
+        slice there, not including the observation dimension.
+    """
+    slots = {}
+    for node in nodes:
+        if not isinstance_str(node, 'TransformationNode') or row_bytes(specs.get(node)) is None:
+            continue
+        in_specs = [specs.get(in_node) for in_node in node.inbound_nodes]
+        if any(spec is None for spec in in_specs):
+            continue
+        indices = node.layer.input_slots(*in_specs)
+        if indices is None:
+            continue
+        for in_node, index in zip(node.inbound_nodes, indices):
+            if (isinstance_str(in_node, 'TransformationNode') and in_node.outbound_nodes == [node]
+                    and node.inbound_nodes.count(in_node) == 1 and not in_node.is_output
+                    and in_node.layer.n_outputs == 1 and not in_node.layer.accepts_selections):
+                slots[in_node] = (node, index)
+    return slots
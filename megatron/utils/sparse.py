@@ -0,0 +1,113 @@
+import numpy as np
+from .generic import isinstance_str
+
+try:
+    import scipy.sparse
+except ImportError:
+    pass
+
+
+def is_sparse(data):
+    """Whether the given data is a scipy.sparse matrix; does not require scipy to be installed."""
+    return isinstance_str(data, '_spbase') or isinstance_str(data, 'spmatrix')
+
+
+def any_sparse(arrays):
+    """Whether any of the given arrays is a scipy.sparse matrix."""
+    return any(is_sparse(a) for a in arrays)
+
+
+def n_rows(data):
+    """Number of observations (1st dimension) in an array, sparse or dense."""
+    return data.shape[0] if is_sparse(data) else len(data)
+
+
+def nbytes(data):
+    """Number of bytes held by a sparse matrix's stored values and indices."""
+    data = data.tocsr()
+    return data.data.nbytes + data.indices.nbytes + data.indptr.nbytes
+
+
+def to_csr(data, dtype=None):
+    """Convert a 2D array, sparse or dense, to a CSR matrix.
+
+    Parameters
+    ----------
+    data : np.ndarray or scipy.sparse matrix
+        the data to be converted. 1D arrays are treated as a single column.
+    dtype : np.dtype (default: None)
+        data type of the result. If None, keeps the data type of data.
+    """
+    if not is_sparse(data):
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data[:, None]
+        if data.ndim != 2:
+            raise ValueError("Sparse data must be 2-dimensional")
+    return scipy.sparse.csr_matrix(data, dtype=dtype)
+
+
+def split_rows(data):
+    """The column indices and values of the non-zero entries of each row of a sparse matrix."""
+    data = data.tocsr()
+    return list(zip(np.split(data.indices, data.indptr[1:-1]),
+                    np.split(data.data, data.indptr[1:-1])))
+
+
+def join_rows(rows, n_cols):
+    """Rebuild a CSR matrix from the column indices and values of each row, as by split_rows.
+
+    Parameters
+    ----------
+    rows : list of 2-tuple of np.ndarray
+        column indices and values of the non-zero entries of each row.
+    n_cols : int
+        number of columns of the matrix.
+    """
+    indptr = np.cumsum([0] + [len(indices) for indices, values in rows])
+    if rows:
+        indices = np.concatenate([indices for indices, values in rows])
+        values = np.concatenate([values for indices, values in rows])
+    else:
+        indices, values = np.empty(0, dtype=np.int64), np.empty(0)
+    return scipy.sparse.csr_matrix((values, indices, indptr), shape=(len(rows), n_cols))
+
+
+def concatenate(arrays, axis=-1):
+    """Concatenate 2D arrays, any of which may be sparse, into a single CSR matrix.
+
+    Parameters
+    ----------
+    arrays : list of np.ndarray or scipy.sparse matrix
+        the arrays to be joined; 1D arrays are treated as a single column.
+    axis : int (default: -1)
+        0 to stack observations, 1 or -1 to stack features.
+    """
+    arrays = [to_csr(a) for a in arrays]
+    if axis in (0, -2):
+        return scipy.sparse.vstack(arrays, format='csr')
+    elif axis in (1, -1):
+        return scipy.sparse.hstack(arrays, format='csr')
+    raise ValueError("Sparse data can only be concatenated along axis 0 or 1")
+
+
+def one_hot(indices, n_values, dtype):
+    """Sparse one-hot encoding of a 1D array of category indices.
+
+    Parameters
+    ----------
+    indices : np.ndarray
+        index of each observation's category; any outside [0, n_values) encode as all zeros.
+    n_values : int
+        number of categories.
+    dtype : np.dtype
+        data type of the indicators.
+    """
+    indices = np.asarray(indices)
+    if indices.ndim != 1:
+        raise ValueError("Sparse one-hot encoding requires 1-dimensional data")
+    valid = (indices >= 0) & (indices < n_values)
+    rows = np.flatnonzero(valid)
+    data = np.ones(len(rows), dtype=dtype)
+    return scipy.sparse.csr_matrix((data, (rows, indices[valid].astype(np.int64))),
+                                   shape=(len(indices), n_values), dtype=dtype)
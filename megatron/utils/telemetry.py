@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import bisect
+import random
+import tempfile
+import threading
+import collections
+import numpy as np
+from . import memory
+
+
+# upper bounds, in seconds, of the buckets of latency histograms; the last holds the rest
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1., 5., float('inf'))
+
+
+def n_rows(data):
+    """Number of observations in data; zero if it has no observation dimension."""
+    shape = getattr(data, 'shape', None)
+    return int(shape[0]) if shape else 0
+
+
+class Histogram:
+    """Counts of observed latencies falling into each of LATENCY_BUCKETS, with their sum."""
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def observe_many(self, seconds):
+        """Observe each of an array of latencies, as observe does one."""
+        buckets = np.searchsorted(LATENCY_BUCKETS, seconds, side='left')
+        for i, count in enumerate(np.bincount(buckets, minlength=len(LATENCY_BUCKETS))):
+            self.counts[i] += int(count)
+        self.count += len(seconds)
+        self.sum += float(np.sum(seconds))
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile; None before any observation."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return LATENCY_BUCKETS[-1]
+
+    def to_dict(self):
+        return {'buckets': dict(zip([str(b) for b in LATENCY_BUCKETS], self.counts)),
+                'count': self.count, 'sum': self.sum}
+
+
+class Telemetry:
+    """Counters and latency histograms of a Pipeline's nodes and methods, kept as it runs.
+
+    Recording a call only appends it to a queue, without taking a lock; calls are added to
+    the counters and histograms when they are read, or once enough of them are queued, so
+    that telemetry can stay on in production. Nodes are timed on one call out of every
+    node_interval, as timing each node costs more than recording the call itself. Calls
+    slower than slow_seconds are captured, with a probability of slow_sample_rate, along
+    with the shapes of their inputs and, if its nodes were timed, the slowest node of the call.
+
+    Parameters
+    ----------
+    slow_seconds : float (default: 1.0)
+        duration above which a call is considered slow.
+    slow_sample_rate : float (default: 1.0)
+        fraction of slow calls to capture.
+    max_slow_calls : int (default: 100)
+        number of the most recent slow calls to keep.
+    labels : dict of str (default: None)
+        labels added to every exported metric, such as the name of the Pipeline.
+    node_interval : int or None (default: 64)
+        number of calls out of which one has its nodes timed, starting with the first.
+        1 times the nodes of every call, and None never times them.
+
+    Attributes
+    ----------
+    nodes : dict of str to dict
+        for each node name, its calls, rows, seconds, bytes output and latency histogram,
+        counting the calls whose nodes were timed.
+    methods : dict of str to dict
+        for each method name, its calls, rows, seconds and latency histogram.
+    slow_calls : collections.deque of dict
+        the captured slow calls, most recent last.
+    """
+    # number of queued calls at which they are added to the counters by the recording thread
+    MAX_PENDING = 10000
+
+    def __init__(self, slow_seconds=1.0, slow_sample_rate=1.0, max_slow_calls=100, labels=None,
+                 node_interval=64):
+        self.slow_seconds = slow_seconds
+        self.slow_sample_rate = slow_sample_rate
+        self.labels = dict(labels) if labels else {}
+        self.node_interval = node_interval
+        self.nodes = {}
+        self.methods = {}
+        self.slow_calls = collections.deque(maxlen=max_slow_calls)
+        self.pending = collections.deque()
+        self.n_calls = 0
+        self.lock = threading.Lock()
+        self.rng = random.Random()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def _stats(self, table, name, with_bytes):
+        # counters of one node or method, created on first use
+        stats = table.get(name)
+        if stats is None:
+            stats = {'calls': 0, 'rows': 0, 'seconds': 0., 'histogram': Histogram()}
+            if with_bytes:
+                stats['bytes_out'] = 0
+            table[name] = stats
+        return stats
+
+    def _flush(self):
+        # add the queued calls to the counters and histograms, those of each node or method
+        # at once; deque.popleft is atomic, so calls queued meanwhile are never lost
+        with self.lock:
+            groups = collections.defaultdict(list)
+            while True:
+                try:
+                    record = self.pending.popleft()
+                except IndexError:
+                    break
+                groups[record[0]].append(record[1:])
+            for (kind, name), records in groups.items():
+                seconds, rows, n_bytes = zip(*records)
+                stats = self._stats(self.nodes if kind == 'node' else self.methods, name,
+                                    kind == 'node')
+                stats['calls'] += len(records)
+                stats['rows'] += sum(rows)
+                stats['seconds'] += sum(seconds)
+                stats['histogram'].observe_many(np.array(seconds))
+                if kind == 'node':
+                    stats['bytes_out'] += sum(n_bytes)
+
+    def sample_nodes(self):
+        """Whether the nodes of the call about to be made are to be timed.
+
+        The count of calls is not locked, since a race only changes which call is timed.
+        """
+        if not self.node_interval:
+            return False
+        self.n_calls += 1
+        return (self.n_calls - 1) % self.node_interval == 0
+
+    def record_node(self, name, seconds, output):
+        """Record a node having produced the given output in the given number of seconds."""
+        if type(output) is np.ndarray:
+            # the common case, without the type checks of sparse and ragged data
+            rows, n_bytes = (output.shape[0] if output.ndim else 0), output.nbytes
+        else:
+            rows, n_bytes = n_rows(output), memory.nbytes(output)
+        self.pending.append((('node', name), seconds, rows, n_bytes))
+        if len(self.pending) > self.MAX_PENDING:
+            self._flush()
+
+    def record_method(self, name, seconds, rows, inputs=None, node_seconds=None):
+        """Record a call of a Pipeline or DataStore method, capturing it if it was slow.
+
+        Parameters
+        ----------
+        name : str
+            name of the method.
+        seconds : float
+            duration of the call.
+        rows : int
+            number of observations processed.
+        inputs : dict of str to array (default: None)
+            the input data of the call, whose shapes are captured if it was slow.
+        node_seconds : dict of str to float (default: None)
+            duration of each node run by the call, to find the slowest node if it was slow.
+        """
+        self.pending.append((('method', name), seconds, rows, 0))
+        if len(self.pending) > self.MAX_PENDING:
+            self._flush()
+        if (self.slow_seconds is not None and seconds > self.slow_seconds
+                and self.rng.random() < self.slow_sample_rate):
+            call = {'method': name, 'time': time.time(), 'seconds': seconds, 'rows': rows,
+                    'input_shapes': {key: list(getattr(data, 'shape', ()))
+                                     for key, data in (inputs or {}).items()},
+                    'slowest_node': None, 'slowest_node_seconds': None}
+            if node_seconds:
+                slowest = max(node_seconds, key=node_seconds.get)
+                call['slowest_node'] = slowest
+                call['slowest_node_seconds'] = node_seconds[slowest]
+            with self.lock:
+                self.slow_calls.append(call)
+
+    def reset(self):
+        """Clear every counter, histogram and captured call."""
+        with self.lock:
+            self.pending.clear()
+            self.nodes = {}
+            self.methods = {}
+            self.slow_calls.clear()
+
+    def snapshot(self):
+        """A copy of the current telemetry, as plain Python data.
+
+        Returns
+        -------
+        dict
+            'nodes' and 'methods', each a dict of name to counters, a 'histogram' dict and the
+            estimated 'p50' and 'p99' latencies; 'slow_calls', a list of captured calls;
+            'labels' and the 'time' of the snapshot.
+        """
+        def copy(table):
+            out = {}
+            for name, stats in table.items():
+                out[name] = {key: value for key, value in stats.items() if key != 'histogram'}
+                out[name]['histogram'] = stats['histogram'].to_dict()
+                out[name]['p50'] = stats['histogram'].quantile(0.5)
+                out[name]['p99'] = stats['histogram'].quantile(0.99)
+            return out
+
+        self._flush()
+        with self.lock:
+            return {'time': time.time(), 'labels': dict(self.labels),
+                    'nodes': copy(self.nodes), 'methods': copy(self.methods),
+                    'slow_calls': list(self.slow_calls)}
+
+    def to_prometheus(self, prefix='megatron'):
+        """The current telemetry in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def labels(**extra):
+            items = list(snapshot['labels'].items()) + list(extra.items())
+            return '{' + ','.join('{}="{}"'.format(key, str(value).replace('"', '\\"'))
+                                  for key, value in items) + '}'
+
+        def histogram(metric, hist, **extra):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, hist['buckets'].values()):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('{}_bucket{} {}'.format(metric, labels(le=le, **extra), cumulative))
+            lines.append('{}_sum{} {}'.format(metric, labels(**extra), hist['sum']))
+            lines.append('{}_count{} {}'.format(metric, labels(**extra), hist['count']))
+
+        for kind, counters in [('node', ['calls', 'rows', 'seconds', 'bytes_out']),
+                               ('method', ['calls', 'rows', 'seconds'])]:
+            table = snapshot[kind + 's']
+            for counter in counters:
+                metric = '{}_{}_{}_total'.format(prefix, kind, counter)
+                lines.append('# TYPE {} counter'.format(metric))
+                for name, stats in table.items():
+                    lines.append('{}{} {}'.format(metric, labels(**{kind: name}), stats[counter]))
+            metric = '{}_{}_latency_seconds'.format(prefix, kind)
+            lines.append('# TYPE {} histogram'.format(metric))
+            for name, stats in table.items():
+                histogram(metric, stats['histogram'], **{kind: name})
+        return '\n'.join(lines) + '\n'
+
+    def export(self, filepath, format='prometheus'):
+        """Write the current telemetry to a local file.
+
+        The Prometheus format replaces the file atomically, to be read by a textfile collector.
+        The JSON format appends the snapshot to the file as one line.
+
+        Parameters
+        ----------
+        filepath : str
+            the file to be written.
+        format : str (default: 'prometheus')
+            either 'prometheus' or 'json'.
+        """
+        if format == 'prometheus':
+            directory = os.path.dirname(os.path.abspath(filepath))
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(self.to_prometheus())
+                os.replace(temp_path, filepath)
+            except Exception:
+                os.remove(temp_path)
+                raise
+        elif format == 'json':
+            with open(filepath, 'a') as f:
+                f.write(json.dumps(self.snapshot()) + '\n')
+        else:
+            raise ValueError("Format must be either 'prometheus' or 'json'")
@@ -28,6 +28,9 @@ setup(name='Megatron',
         'pandas',
         'dill',
       ],
+      entry_points={
+        'console_scripts': ['megatron=megatron.cli:main'],
+      },
       classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',
@@ -1,7 +1,9 @@
+from . import cli
 from . import io
 from . import layers
 from . import layertools
 from . import nodes
 from . import pipeline
+from . import search
 from . import utils
 from . import visuals
@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import megatron
+from megatron import cli
+from megatron.layers import ScalarMultiply, Predicate, Filter
+
+
+class test_score(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        x = megatron.nodes.InputNode('x')
+        mask = Predicate('>', 1)(x)
+        doubled = Filter()([ScalarMultiply(2)(x), mask])
+        doubled.name = 'doubled'
+        megatron.Pipeline(x, doubled, name='cli', version=1).save(self.directory.name)
+        self.model = os.path.join(self.directory.name, 'cli1.pkl')
+        self.frame = pd.DataFrame({'id': np.arange(10) + 100, 'x': np.arange(10.)})
+        self.input = os.path.join(self.directory.name, 'input.csv')
+        self.frame.to_csv(self.input, index=False)
+        self.output = os.path.join(self.directory.name, 'output.csv')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_csv(self):
+        stats = cli.score(self.model, self.input, self.output, batch_size=3)
+        assert (stats['rows'], stats['batches']) == (8, 4)
+        output = pd.read_csv(self.output)
+        assert list(output.columns) == ['doubled']
+        assert np.array_equal(output['doubled'], np.arange(2., 10.) * 2)
+
+    def test_index(self):
+        # the index column follows the rows kept by the Filter
+        cli.score(self.model, self.input, self.output, batch_size=4, index='id')
+        output = pd.read_csv(self.output)
+        assert list(output.columns) == ['id', 'doubled']
+        assert np.array_equal(output['id'], np.arange(102, 110))
+        assert np.array_equal(output['doubled'], np.arange(2., 10.) * 2)
+
+    def test_sqlite(self):
+        database = os.path.join(self.directory.name, 'input.db')
+        conn = sqlite3.connect(database)
+        self.frame.to_sql('events', conn, index=False)
+        conn.close()
+        cli.score(self.model, cli.SQLITE_PREFIX + database, self.output, batch_size=3,
+                  query='SELECT * FROM events', index='id')
+        output = pd.read_csv(self.output)
+        assert np.array_equal(output['id'], np.arange(102, 110))
+        self.assertRaises(ValueError, list, cli.read_batches(cli.SQLITE_PREFIX + database, 3))
+
+    def test_workers(self):
+        stats = cli.score(self.model, self.input, self.output, batch_size=3, workers=2,
+                          index='id')
+        assert stats['rows'] == 8
+        output = pd.read_csv(self.output)
+        # outputs are written in the order of the input
+        assert np.array_equal(output['id'], np.arange(102, 110))
+        assert np.array_equal(output['doubled'], np.arange(2., 10.) * 2)
+        self.assertRaises(ValueError, cli.score, self.model, self.input, self.output, workers=0)
+
+    def test_main(self):
+        argv = ['score', self.model, '--input', self.input, '--output', self.output,
+                '--batch-size', '5', '--index', 'id']
+        assert cli.main(argv) == 0
+        assert len(pd.read_csv(self.output)) == 8
+        self.assertRaises(ValueError, cli.main, argv[:4] + ['--output', 'output.json'])
+
+    def test_names(self):
+        # outputs of layers of the same type are named apart rather than overwritten
+        x = megatron.nodes.InputNode('x')
+        megatron.Pipeline(x, [ScalarMultiply(2)(x), ScalarMultiply(3)(x)], name='names',
+                          version=1).save(self.directory.name)
+        model = os.path.join(self.directory.name, 'names1.pkl')
+        cli.score(model, self.input, self.output, batch_size=4)
+        output = pd.read_csv(self.output)
+        assert list(output.columns) == ['ScalarMultiply.0', 'ScalarMultiply.1']
+        assert np.array_equal(output['ScalarMultiply.1'], np.arange(10.) * 3)
+        # any other clash is an error
+        self.assertRaises(ValueError, cli.score, self.model, self.input, self.output,
+                          index='doubled')
+
+    def test_missing_pyarrow(self):
+        parquet = os.path.join(self.directory.name, 'input.parquet')
+        with mock.patch.object(cli, 'pyarrow', None):
+            self.assertRaises(ImportError, cli.OutputWriter, parquet)
+            self.assertRaises(ImportError, list, cli.read_batches(parquet, 3))
@@ -1,2 +1,4 @@
+from . import test_checkpoint
 from . import test_dataset
+from . import test_fitcache
 from . import test_generator
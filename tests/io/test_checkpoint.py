@@ -0,0 +1,35 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from megatron.io.checkpoint import save_checkpoint, load_checkpoint, CHECKPOINT_FILENAME
+
+
+class test_checkpoint(unittest.TestCase):
+    def setUp(self):
+        self.checkpoint_dir = os.path.join(tempfile.mkdtemp(), 'checkpoints')
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.checkpoint_dir))
+
+    def test_missing(self):
+        assert load_checkpoint(self.checkpoint_dir) is None
+
+    def test_roundtrip(self):
+        save_checkpoint(self.checkpoint_dir, {'batch': 5, 'metadata': np.arange(3)})
+        save_checkpoint(self.checkpoint_dir, {'batch': 10, 'metadata': np.arange(4)})
+        state = load_checkpoint(self.checkpoint_dir)
+
+        # latest checkpoint replaces the previous one, with no temporary files left behind
+        assert state['batch'] == 10
+        assert np.array_equal(state['metadata'], np.arange(4))
+        assert os.listdir(self.checkpoint_dir) == [CHECKPOINT_FILENAME]
+
+    def test_failed_write(self):
+        save_checkpoint(self.checkpoint_dir, {'batch': 5})
+        # unpicklable state leaves the previous checkpoint intact
+        self.assertRaises(Exception, save_checkpoint, self.checkpoint_dir,
+                          {'batch': 10, 'generator': (i for i in range(3))})
+        assert load_checkpoint(self.checkpoint_dir)['batch'] == 5
+        assert os.listdir(self.checkpoint_dir) == [CHECKPOINT_FILENAME]
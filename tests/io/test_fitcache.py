@@ -0,0 +1,49 @@
+import unittest
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+from megatron.io.fitcache import FitCache
+
+
+class test_FitCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_missing(self):
+        assert FitCache(self.cache_dir).get('abc') is None
+
+    def test_roundtrip(self):
+        cache = FitCache(self.cache_dir)
+        state = {'categories': np.array(['a', 'b'], dtype=object), 'min_val': np.int64(3),
+                 'shape': [5, 2], 'mean': np.arange(4.)}
+        assert cache.put('abc', state)
+        out = cache.get('abc')
+        assert out['categories'].dtype == object
+        assert np.array_equal(out['categories'], state['categories'])
+        assert out['min_val'] == 3 and out['min_val'].dtype == np.int64
+        assert out['shape'] == [5, 2]
+        assert np.array_equal(out['mean'], state['mean'])
+
+    def test_unstorable(self):
+        cache = FitCache(self.cache_dir)
+        assert not cache.put('abc', {'model': object()})
+        assert not cache.put('abc', {'items': np.array([1, 'a'], dtype=object)})
+        assert len(cache) == 0
+
+    def test_eviction(self):
+        cache = FitCache(self.cache_dir, max_entries=2)
+        cache.put('a', {'x': 1})
+        cache.put('b', {'x': 2})
+        # reading an entry makes it the most recently used
+        time.sleep(0.05)
+        cache.get('a')
+        time.sleep(0.05)
+        cache.put('c', {'x': 3})
+        assert len(cache) == 2
+        assert cache.get('b') is None
+        assert cache.get('a') == {'x': 1}
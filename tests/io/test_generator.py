@@ -1,5 +1,6 @@
 import unittest
 import os
+import tempfile
 import sqlite3
 import numpy as np
 import pandas as pd
@@ -62,6 +63,27 @@ class test_PandasGenerator(unittest.TestCase):
         assert all(np.array_equal(output, correct)
                    for output, correct in zip(output_values, correct_values))
 
+    def test_seek(self):
+        df = pd.DataFrame({'a': np.arange(1000)})
+        data_gen = PandasGenerator(df, batch_size=100)
+        for i in range(3):
+            next(data_gen)
+        assert data_gen.tell() == 300
+
+        data_gen = PandasGenerator(df, batch_size=100)
+        data_gen.seek(300)
+        assert np.array_equal(next(data_gen)['a'], np.arange(300, 400))
+
+    def test_include_cols(self):
+        df = pd.DataFrame({'a': np.arange(10), 'b': np.zeros(10), 'c': np.ones(10)})
+        output = next(PandasGenerator(df, batch_size=5, include_cols=['c', 'a']))
+
+        # only the included columns are loaded, each keeping its own type
+        assert set(output) == set(['a', 'c'])
+        assert output['a'].dtype.kind == 'i'
+        assert np.array_equal(output['a'], np.arange(5))
+        self.assertRaises(ValueError, PandasGenerator, dataframe=df, include_cols=['d'])
+
 
 class test_CSVGenerator(unittest.TestCase):
     def setUp(self):
@@ -122,6 +144,26 @@ class test_CSVGenerator(unittest.TestCase):
         assert all(np.array_equal(output, correct)
                    for output, correct in zip(output_values, correct_values))
 
+    def test_seek(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, 'seek.csv')
+            pd.DataFrame({'a': np.arange(1000)}).to_csv(filepath, index=False)
+            data_gen = CSVGenerator(filepath, batch_size=100)
+            for i in range(3):
+                next(data_gen)
+            assert data_gen.tell() == 300
+
+            data_gen = CSVGenerator(filepath, batch_size=100)
+            data_gen.seek(300)
+            assert np.array_equal(next(data_gen)['a'], np.arange(300, 400))
+
+    def test_include_cols(self):
+        data_gen = CSVGenerator('test.csv', batch_size=100, include_cols=['b'])
+        output = next(data_gen)
+        assert set(output) == set(['b'])
+        assert np.array_equal(output['b'], np.zeros(100))
+        self.assertRaises(ValueError, CSVGenerator, filepath='test.csv', include_cols=['d'])
+
 
 class test_SQLGenerator(unittest.TestCase):
     def setUp(self):
@@ -180,3 +222,63 @@ class test_SQLGenerator(unittest.TestCase):
         output_values = list(output.values())
         assert all(np.array_equal(output, correct)
                    for output, correct in zip(output_values, correct_values))
+
+    def test_include_cols(self):
+        data_gen = SQLGenerator(self.conn, "SELECT * FROM test", batch_size=2,
+                                include_cols=['b'])
+        assert set(next(data_gen)) == set(['b'])
+
+    def test_push_predicates(self):
+        self.conn.execute("CREATE TABLE events (k INTEGER, v INTEGER)")
+        self.conn.executemany("INSERT INTO events VALUES (?, ?)", [(i, i % 4) for i in range(12)])
+        data_gen = SQLGenerator(self.conn, "SELECT * FROM events", batch_size=2, key_col='k')
+        next(data_gen)
+
+        # the query restarts, reading only rows that satisfy every predicate
+        data_gen.push_predicates([('v', '>=', 2), ('v', '!=', 3)])
+        assert np.array_equal(next(data_gen)['k'], np.array([2, 6]))
+        data_gen.seek(6)
+        assert np.array_equal(next(data_gen)['k'], np.array([10]))
+
+    def test_with_predicates(self):
+        self.conn.execute("CREATE TABLE events (k INTEGER, v INTEGER)")
+        self.conn.executemany("INSERT INTO events VALUES (?, ?)", [(i, i % 4) for i in range(12)])
+        data_gen = SQLGenerator(self.conn, "SELECT * FROM events", batch_size=2, key_col='k')
+        next(data_gen)
+
+        # the copy reads only rows that satisfy the predicates, and the original is untouched
+        filtered = data_gen.with_predicates([('v', '>=', 2)])
+        assert np.array_equal(next(filtered)['k'], np.array([2, 3]))
+        assert np.array_equal(next(data_gen)['k'], np.array([2, 3]))
+        assert np.array_equal(next(data_gen)['k'], np.array([4, 5]))
+        assert data_gen.predicates == []
+
+    def test_column_types(self):
+        self.conn.execute("CREATE TABLE mixed (a INTEGER, b REAL, c TEXT)")
+        self.conn.execute("INSERT INTO mixed VALUES (1, 0.5, 'x'), (2, 1.5, 'y')")
+        output = next(SQLGenerator(self.conn, "SELECT * FROM mixed", batch_size=2))
+
+        # each column keeps its own type rather than being coerced to str
+        assert output['a'].dtype.kind == 'i'
+        assert output['b'].dtype.kind == 'f'
+        assert output['c'].dtype.kind == 'U'
+
+    def test_seek(self):
+        self.conn.execute("CREATE TABLE keyed (k INTEGER, v INTEGER)")
+        self.conn.executemany("INSERT INTO keyed VALUES (?, ?)", [(i * 2, i) for i in range(10)])
+
+        # row offset
+        data_gen = SQLGenerator(self.conn, "SELECT * FROM keyed", batch_size=3)
+        next(data_gen)
+        assert data_gen.tell() == 3
+        data_gen = SQLGenerator(self.conn, "SELECT * FROM keyed", batch_size=3)
+        data_gen.seek(3)
+        assert np.array_equal(next(data_gen)['v'], np.array([3, 4, 5]))
+
+        # keyset position
+        data_gen = SQLGenerator(self.conn, "SELECT * FROM keyed", batch_size=3, key_col='k')
+        next(data_gen)
+        assert data_gen.tell() == 4
+        data_gen = SQLGenerator(self.conn, "SELECT * FROM keyed", batch_size=3, key_col='k')
+        data_gen.seek(4)
+        assert np.array_equal(next(data_gen)['v'], np.array([3, 4, 5]))
@@ -4,5 +4,6 @@ from . import test_image
 from . import test_metrics
 from . import test_missing
 from . import test_numeric
+from . import test_sequence
 from . import test_shaping
 from . import test_text
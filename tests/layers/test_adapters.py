@@ -1,12 +1,17 @@
 import unittest
 import os
+import sqlite3
 import numpy as np
+import megatron
 from sklearn.preprocessing import StandardScaler
+from sklearn.decomposition import PCA
+from sklearn.linear_model import Ridge, LogisticRegression
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.exceptions import NotFittedError
 from tensorflow.keras.models import Model
 from tensorflow.keras.layers import Input, Dense
-from megatron.layers.adapters import Sklearn, Keras
+from megatron.layers.adapters import Sklearn, Keras, PipelineLayer
+from megatron.layers import OneHotRange, Lambda
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
@@ -40,6 +45,64 @@ class test_Sklearn(unittest.TestCase):
         correct_output = self.Y
         assert np.array_equal(output.argmax(axis=1), correct_output.argmax(axis=1))
 
+    def test_compile(self):
+        X = np.random.rand(100, 5)
+        transformer = Sklearn(StandardScaler(), compile=True)
+        transformer.fit(X)
+        correct_output = transformer.transformation.transform(X)
+        # checked against sklearn on the first batch, then used instead
+        assert np.allclose(transformer.transform(X), correct_output)
+        assert transformer.compiled is not None
+        assert np.allclose(transformer.transform(X), correct_output)
+        # refitting discards it until checked again
+        transformer.fit(X + 1)
+        assert transformer.compiled is None
+
+        # unsupported estimators fall back to sklearn
+        self.model = Sklearn(DecisionTreeClassifier(), compile=True)
+        self.model.fit(self.X, self.Y)
+        self.model.transform(self.X)
+        assert self.model.compiled is None
+
+    def check_compiled(self, estimator, X, *fit_inputs):
+        layer = Sklearn(estimator, compile=True)
+        layer.fit(X, *fit_inputs)
+        correct_output = layer.transform(X)
+        assert layer.compiled is not None
+        output = layer.transform(X)
+        assert output.dtype == correct_output.dtype
+        if output.dtype.kind == 'f':
+            assert np.allclose(output, correct_output)
+        else:
+            assert np.array_equal(output, correct_output)
+
+    def test_compile_estimators(self):
+        rng = np.random.RandomState(0)
+        X = rng.rand(200, 5)
+        self.check_compiled(PCA(3, whiten=True), X)
+        self.check_compiled(Ridge(), X, X @ np.arange(5.) + 1)
+        self.check_compiled(LogisticRegression(), X, (X[:, 0] > 0.5).astype(int))
+        self.check_compiled(LogisticRegression(), X, np.array(['a', 'b', 'c'])[X.argmax(axis=1) % 3])
+
+    def test_compile_fallback(self):
+        X = np.random.rand(100, 5)
+        # a compiled function that disagrees with the estimator is not used
+        shifted = type('StandardScaler', (StandardScaler,),
+                       {'transform': lambda self, X: StandardScaler.transform(self, X) + 1})
+        layer = Sklearn(shifted(), compile=True)
+        layer.fit(X)
+        assert np.allclose(layer.transform(X), layer.transformation.transform(X))
+        assert layer.compiled is None and layer.compile_checked
+
+    def test_compile_legacy(self):
+        # layers pickled before compiling existed have no compile hyperparameter
+        X = np.random.rand(100, 5)
+        layer = Sklearn(StandardScaler())
+        layer.kwargs = {}
+        del layer.compiled, layer.compile_checked
+        layer.transformation.fit(X)
+        assert np.allclose(layer.transform(X), layer.transformation.transform(X))
+
 
 class test_Keras(unittest.TestCase):
     def setUp(self):
@@ -62,3 +125,53 @@ class test_Keras(unittest.TestCase):
         output = self.model.transform(self.X)
         correct_output = self.Y
         assert np.array_equal(output.argmax(axis=1), correct_output.argmax(axis=1))
+
+
+class test_PipelineLayer(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        def double(X):
+            self.calls.append(len(X))
+            return X * 2
+        a = megatron.nodes.InputNode('a')
+        b = megatron.nodes.InputNode('b')
+        self.pipeline = megatron.Pipeline([a, b], [OneHotRange()(a), Lambda(double)(b)],
+                                          name='inner', storage=sqlite3.connect(':memory:'))
+        self.A = np.array([0, 1, 2, 1])
+        self.B = np.arange(4.)
+        self.index = np.arange(4)
+        self.pipeline.fit({'a': self.A, 'b': self.B})
+        self.calls.clear()
+
+    def test_fit(self):
+        layer = PipelineLayer(self.pipeline)
+        layer.fit(np.array([5, 6, 7]), self.B)
+        assert self.pipeline.path[1].layer.metadata['max_val'] == 2
+
+    def test_transform(self):
+        onehot, doubled = PipelineLayer(self.pipeline).transform(self.A, self.B)
+        assert np.array_equal(onehot, np.eye(3)[self.A])
+        assert np.array_equal(doubled, self.B * 2)
+
+    def test_refilled_inputs(self):
+        a, b = megatron.nodes.InputNode('a'), megatron.nodes.InputNode('b')
+        onehot, doubled = PipelineLayer(self.pipeline)([a, b])
+        outer = megatron.Pipeline([a, b], [onehot, doubled])
+        A, B = self.A.copy(), self.B.copy()
+        outer.transform({'a': A, 'b': B})
+        # the inner pipeline runs once for both outputs
+        assert self.calls == [4]
+        # a buffer refilled in place is new data
+        B += 1
+        output = outer.transform({'a': A, 'b': B})
+        assert self.calls == [4, 4]
+        assert np.array_equal(output[1], (self.B + 1) * 2)
+
+    def test_read_through(self):
+        layer = PipelineLayer(self.pipeline, read_through=True)
+        layer.transform(self.A[:2], self.B[:2], self.index[:2])
+        onehot, doubled = layer.transform(self.A, self.B, self.index)
+        # only the observations not yet stored are transformed
+        assert self.calls == [2, 2]
+        assert np.array_equal(onehot, np.eye(3)[self.A])
+        assert np.array_equal(doubled, self.B * 2)
@@ -1,5 +1,9 @@
 import unittest
 import numpy as np
+import scipy.sparse
+from megatron.utils.dtypes import DTypePolicy
+from megatron.utils.shapes import Spec
+from megatron.utils.errors import WiringError
 from megatron.layers.numeric import Add, Subtract, ScalarMultiply
 from megatron.layers.numeric import ElementWiseMultiply, Divide, StaticDot, Dot, Normalize
 
@@ -23,6 +27,18 @@ class test_Add(unittest.TestCase):
         Y = np.ones((5, 5))
         assert np.array_equal(Add().transform(X, Y), (np.ones((5, 5)) * 2))
 
+    def test_output_spec(self):
+        specs = [Spec((5,), np.dtype('int32')), Spec((None,), np.dtype('float32'))]
+        assert Add().output_spec(*specs) == Spec((5,), np.dtype('float64'))
+        self.assertRaises(WiringError, Add().output_spec, Spec((5,), None), Spec((6,), None))
+
+    def test_sparse(self):
+        X = scipy.sparse.csr_matrix(np.eye(4))
+        output = Add().transform(X, X, X)
+        assert scipy.sparse.issparse(output)
+        assert np.array_equal(output.toarray(), np.eye(4) * 3)
+        assert np.array_equal(Add().transform(X, np.ones((4, 4))), np.eye(4) + 1)
+
 
 class test_Subtract(unittest.TestCase):
     def test_transform(self):
@@ -53,6 +69,14 @@ class test_ScalarMultiply(unittest.TestCase):
         X = np.ones((5, 5))
         assert np.isclose(ScalarMultiply(1.5).transform(X), np.ones((5, 5)) * 1.5).all()
 
+    def test_transform_into(self):
+        # written into a column of a larger array, without a copy of its own
+        out = np.zeros((10, 3))
+        output = ScalarMultiply(2).transform_into(out[:, 1], np.arange(10))
+        assert np.shares_memory(output, out)
+        assert np.array_equal(out[:, 1], np.arange(10) * 2)
+        assert not out[:, [0, 2]].any()
+
 
 class test_ElementWiseMultiply(unittest.TestCase):
     def test_transform(self):
@@ -92,6 +116,13 @@ class test_Divide(unittest.TestCase):
         X = np.ones((5, 5)) * 4
         Y = np.ones((5, 5)) * 2
         assert np.array_equal(Divide().transform(X, Y), np.ones((5, 5)) * 2)
+        # divide by zero is imputed
+        assert np.array_equal(Divide(impute=-1).transform(np.ones(3), np.zeros(3)), -np.ones(3))
+        # computation follows the dtype policy, without losing precision by default
+        assert Divide().transform(np.ones(3), np.ones(3) * 3).dtype == np.float64
+        layer = Divide()
+        layer.dtype_policy = DTypePolicy(float_dtype=np.float32)
+        assert layer.transform(np.ones(3), np.ones(3) * 3).dtype == np.float32
 
 
 class test_StaticDot(unittest.TestCase):
@@ -106,6 +137,21 @@ class test_StaticDot(unittest.TestCase):
         X = np.ones((2, 2))
         assert np.array_equal(StaticDot(np.ones((2, 3))).transform(X), (np.ones((2, 3)) * 2))
 
+    def test_output_spec(self):
+        spec = Spec((10,), np.dtype('float32'))
+        assert StaticDot(np.ones((10, 3))).output_spec(spec) == Spec((3,), np.dtype('float64'))
+        assert StaticDot(np.ones(10)).output_spec(spec).shape == ()
+        self.assertRaises(WiringError, StaticDot(np.ones((12, 3))).output_spec, spec)
+
+    def test_sparse(self):
+        X = scipy.sparse.csr_matrix(np.eye(4))
+        assert np.array_equal(StaticDot(np.ones((4, 2))).transform(X), np.ones((4, 2)))
+        output = StaticDot(scipy.sparse.csr_matrix(np.eye(4) * 2)).transform(X)
+        assert scipy.sparse.issparse(output)
+        assert np.array_equal(output.toarray(), np.eye(4) * 2)
+        spec = Spec((4,), np.dtype('float64'))
+        assert StaticDot(scipy.sparse.csr_matrix(np.ones((4, 3)))).output_spec(spec).shape == (3,)
+
 
 class test_Dot(unittest.TestCase):
     def test_transform(self):
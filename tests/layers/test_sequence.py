@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+from megatron.utils.ragged import RaggedArray
+from megatron.layers.sequence import Tokenize, ToRagged, Lengths, Truncate, PadSequences
+from megatron.layers.sequence import SequenceReduce, TokenLookup
+
+
+class test_Tokenize(unittest.TestCase):
+    def test_transform(self):
+        X = np.array(['the cat sat', 'a', 'x  y'])
+        output = Tokenize().transform(X)
+        assert isinstance(output, RaggedArray)
+        assert [row.tolist() for row in output] == [s.split(' ') for s in X]
+        output = Tokenize(sep=',').transform(np.array(['a,b', 'c']))
+        assert np.array_equal(output.lengths(), np.array([2, 1]))
+
+
+class test_ToRagged(unittest.TestCase):
+    def test_transform(self):
+        X = np.empty(3, dtype=object)
+        X[:] = [[1, 2], [], [3]]
+        output = ToRagged().transform(X)
+        assert np.array_equal(output.values, np.array([1, 2, 3]))
+        assert np.array_equal(output.offsets, np.array([0, 2, 2, 3]))
+        assert ToRagged(dtype='float32').transform(X).dtype == np.dtype('float32')
+
+
+class test_Lengths(unittest.TestCase):
+    def test_transform(self):
+        X = RaggedArray.from_rows([[1, 2, 3], [], [4]])
+        assert np.array_equal(Lengths().transform(X), np.array([3, 0, 1]))
+
+
+class test_Truncate(unittest.TestCase):
+    def test_transform(self):
+        X = RaggedArray.from_rows([[1, 2, 3], [], [4]])
+        output = Truncate(2).transform(X)
+        assert [row.tolist() for row in output] == [[1, 2], [], [4]]
+        output = Truncate(2, from_end=True).transform(X)
+        assert [row.tolist() for row in output] == [[2, 3], [], [4]]
+
+
+class test_PadSequences(unittest.TestCase):
+    def test_init(self):
+        self.assertRaises(ValueError, PadSequences, 3, truncating='middle')
+
+    def test_transform(self):
+        X = RaggedArray.from_rows([[1, 2, 3], [], [4]])
+        output = PadSequences(2).transform(X)
+        assert np.array_equal(output, np.array([[1, 2], [0, 0], [4, 0]]))
+        output = PadSequences(2, pad_value=-1, truncating='pre', padding='pre').transform(X)
+        assert np.array_equal(output, np.array([[2, 3], [-1, -1], [-1, 4]]))
+
+
+class test_SequenceReduce(unittest.TestCase):
+    def test_init(self):
+        self.assertRaises(ValueError, SequenceReduce, 'median')
+
+    def test_transform(self):
+        X = RaggedArray.from_rows([[1, 2, 3], [], [4]])
+        assert np.array_equal(SequenceReduce('sum').transform(X), np.array([6, 0, 4]))
+        output = SequenceReduce('max').transform(X)
+        assert output[0] == 3 and np.isnan(output[1]) and output[2] == 4
+        output = SequenceReduce('mean').transform(X)
+        assert output[0] == 2 and np.isnan(output[1]) and output[2] == 4
+
+
+class test_TokenLookup(unittest.TestCase):
+    def test_fit(self):
+        layer = TokenLookup()
+        layer.fit(RaggedArray.from_rows([['b', 'a'], ['c']]))
+        assert np.array_equal(layer.metadata['vocabulary'], np.array(['a', 'b', 'c']))
+        layer.partial_fit(np.array(['d']))
+        assert len(layer.metadata['vocabulary']) == 4
+
+    def test_transform(self):
+        layer = TokenLookup()
+        layer.fit(RaggedArray.from_rows([['b', 'a'], ['c']]))
+        output = layer.transform(RaggedArray.from_rows([['c', 'z'], [], ['a']]))
+        assert [row.tolist() for row in output] == [[3, 0], [], [1]]
+        assert np.array_equal(layer.transform(np.array(['b', 'q'])), np.array([2, 0]))
+
+        layer = TokenLookup(strict=True)
+        layer.fit(np.array(['a']))
+        self.assertRaises(ValueError, layer.transform, np.array(['b']))
+
+    def test_merge(self):
+        layer = TokenLookup()
+        assert layer.is_mergeable()
+        layer.fit(np.array(['a', 'c']))
+        other = TokenLookup()
+        other.fit(np.array(['b']))
+        layer.merge(other.metadata)
+        assert np.array_equal(layer.metadata['vocabulary'], np.array(['a', 'b', 'c']))
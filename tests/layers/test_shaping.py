@@ -1,7 +1,14 @@
 import unittest
 import numpy as np
+import scipy.sparse
+from megatron.utils.dtypes import DTypePolicy
+from megatron.utils.shapes import Spec
+from megatron.utils.errors import WiringError
+from megatron.nodes import InputNode
+from megatron.pipeline import Pipeline
+from megatron.layers.numeric import ScalarMultiply
 from megatron.layers.shaping import Cast, AddDim, OneHotRange, OneHotLabels, Reshape, Flatten
-from megatron.layers.shaping import SplitDict, TimeSeries, Concatenate, Slice, Filter
+from megatron.layers.shaping import SplitDict, TimeSeries, Concatenate, Slice, Predicate, Filter
 
 
 class test_Cast(unittest.TestCase):
@@ -84,6 +91,35 @@ class test_OneHotRange(unittest.TestCase):
         self.transformer.fit(np.random.randint(-2, 3, (50, 50)))
         assert self.transformer.transform(np.random.randint(-2, 3, (40, 40))).shape == (40, 40, 5)
 
+    def test_sparse(self):
+        transformer = OneHotRange(strict=True, sparse=True)
+        transformer.fit(np.array([2, 3, 4]))
+        output = transformer.transform(np.array([4, 2, 3]))
+        assert scipy.sparse.issparse(output)
+        assert np.array_equal(output.toarray(), np.eye(3)[[2, 0, 1]])
+        self.assertRaises(ValueError, transformer.transform, np.array([5]))
+
+    def test_merge(self):
+        assert self.transformer.is_mergeable()
+        other = OneHotRange()
+        other.fit(np.array([-3, 1]))
+        self.transformer.merge(other.metadata)
+        assert self.transformer.metadata == other.metadata
+        self.transformer.fit(np.array([0, 4]))
+        self.transformer.merge(other.metadata)
+        assert self.transformer.metadata['min_val'] == -3 and self.transformer.metadata['max_val'] == 4
+
+    def test_output_spec(self):
+        spec = Spec((2,), np.dtype('int64'))
+        assert self.transformer.output_spec(spec).shape == (2, None)
+        self.transformer.fit(np.array([-2, 4]))
+        assert self.transformer.output_spec(spec).shape == (2, 7)
+
+    def test_dtype_policy(self):
+        self.transformer.fit(np.array([1, 2, 3]))
+        self.transformer.dtype_policy = DTypePolicy(indicator_dtype=np.uint8)
+        assert self.transformer.transform(np.array([3, 1])).dtype == np.uint8
+
 
 class test_OneHotLabels(unittest.TestCase):
     def setUp(self):
@@ -127,6 +163,30 @@ class test_OneHotLabels(unittest.TestCase):
         output = self.transformer.transform(np.array([['a', 'b'], ['c', 'd']]))
         assert output.shape == (2, 2, 4)
 
+    def test_sparse(self):
+        transformer = OneHotLabels(strict=True, sparse=True)
+        transformer.fit(np.array(['a', 'c', 'e']))
+        output = transformer.transform(np.array(['e', 'a', 'c', 'a']))
+        assert scipy.sparse.issparse(output)
+        assert np.array_equal(output.toarray(), np.eye(3)[[2, 0, 1, 0]])
+        self.assertRaises(ValueError, transformer.transform, np.array(['b']))
+        output = OneHotLabels(sparse=True)
+        output.fit(np.array(['a', 'c']))
+        assert np.array_equal(output.transform(np.array(['b', 'z'])).toarray(), np.zeros((2, 2)))
+
+    def test_merge(self):
+        assert self.transformer.is_mergeable()
+        other = OneHotLabels()
+        other.fit(np.array(['c', 'd']))
+        self.transformer.fit(np.array(['a', 'c']))
+        self.transformer.merge(other.metadata)
+        assert np.array_equal(self.transformer.metadata['categories'], np.array(['a', 'c', 'd']))
+
+    def test_dtype_policy(self):
+        self.transformer.fit(np.array(['a', 'b', 'c']))
+        self.transformer.dtype_policy = DTypePolicy(indicator_dtype=bool)
+        assert self.transformer.transform(np.array(['c', 'a'])).dtype == bool
+
 
 class test_Reshape(unittest.TestCase):
     def test_transform(self):
@@ -170,6 +230,10 @@ class test_TimeSeries(unittest.TestCase):
         ])
         assert np.array_equal(output, correct_output)
 
+    def test_merge(self):
+        assert not TimeSeries(2).is_mergeable()
+        self.assertRaises(NotImplementedError, TimeSeries(2).merge, {})
+
 
 class test_Concatenate(unittest.TestCase):
     def test_transform(self):
@@ -180,6 +244,43 @@ class test_Concatenate(unittest.TestCase):
         assert Concatenate(axis=1).transform(*X).shape == (100, 10)
         self.assertRaises(ValueError, Concatenate(axis=0).transform, X[0], X[1], X[2])
 
+    def test_sparse(self):
+        X = scipy.sparse.csr_matrix(np.eye(3))
+        output = Concatenate().transform(X, np.arange(3))
+        assert scipy.sparse.issparse(output)
+        assert np.array_equal(output.toarray(), np.hstack([np.eye(3), np.arange(3)[:, None]]))
+        output = Concatenate(axis=0).transform(X, np.ones((1, 3)))
+        assert np.array_equal(output.toarray(), np.vstack([np.eye(3), np.ones((1, 3))]))
+
+    def test_transform_into(self):
+        f8 = np.dtype('float64')
+        specs = [Spec((), f8), Spec((2,), f8), Spec((), f8)]
+        slots = Concatenate().input_slots(*specs)
+        assert slots == [(0,), (slice(1, 3),), (3,)]
+        assert Concatenate().input_slots(Spec((None,), f8), Spec((), f8)) is None
+
+        # an input already written into its slice is left there; others are copied in
+        out = np.zeros((4, 4))
+        X, Y = np.ones((4, 2)), np.arange(4.)
+        first = out[(slice(None),) + slots[0]]
+        first[...] = 7
+        output = Concatenate().transform_into(out, first, X, Y)
+        assert output is out
+        assert np.array_equal(out, np.column_stack([np.full(4, 7.), X, Y]))
+
+    def test_output_spec(self):
+        f8 = np.dtype('float64')
+        specs = [Spec((), f8), Spec((), np.dtype('float32'))]
+        assert Concatenate().output_spec(*specs) == Spec((2,), f8)
+        specs = [Spec((4, 5), f8), Spec((4, None), f8)]
+        assert Concatenate().output_spec(*specs) == Spec((4, None), f8)
+        assert Concatenate(axis=1).output_spec(*specs) == Spec((8, 5), f8)
+        # concatenating along the observation axis cannot be inferred
+        assert Concatenate(axis=0).output_spec(*specs) is None
+        # other dimensions must match
+        specs = [Spec((4, 5), f8), Spec((3, 5), f8)]
+        self.assertRaises(WiringError, Concatenate().output_spec, *specs)
+
 
 class test_Slice(unittest.TestCase):
     def test_transform(self):
@@ -193,6 +294,29 @@ class test_Slice(unittest.TestCase):
         correct_output = np.array([[48, 50], [52, 54]])
         assert np.array_equal(output, correct_output)
 
+    def test_sparse(self):
+        X = scipy.sparse.csr_matrix(np.arange(12).reshape((3, 4)))
+        output = Slice(None, (1, 3)).transform(X)
+        assert scipy.sparse.issparse(output)
+        assert np.array_equal(output.toarray(), np.arange(12).reshape((3, 4))[:, 1:3])
+        assert np.array_equal(Slice(None, 2).transform(X), np.array([2, 6, 10]))
+
+
+class test_Predicate(unittest.TestCase):
+    def test_init(self):
+        self.assertRaises(ValueError, Predicate, 'like', 1)
+
+    def test_transform(self):
+        output = Predicate('>=', 2).transform(np.arange(5))
+        assert np.array_equal(output, np.array([False, False, True, True, True]))
+
+        output = Predicate('==', 'b').transform(np.array(['a', 'b', 'c']))
+        assert np.array_equal(output, np.array([False, True, False]))
+
+    def test_sql_predicate(self):
+        assert Predicate('==', 3).sql_predicate('a') == ('a', '=', 3)
+        assert Predicate('<', 0.5).sql_predicate('b') == ('b', '<', 0.5)
+
 
 class test_Filter(unittest.TestCase):
     def test_transform(self):
@@ -205,3 +329,37 @@ class test_Filter(unittest.TestCase):
         output = Filter().transform(np.arange(16).reshape((4, 4)), np.array([1, 0, 0, 1]))
         correct_output = np.array([[0, 1, 2, 3], [12, 13, 14, 15]])
         assert np.array_equal(output, correct_output)
+
+        output = Filter().transform(np.arange(3), np.array([True, False, True], dtype=object))
+        assert np.array_equal(output, [0, 2])
+
+    def test_selection(self):
+        mask = np.array([True, False, True, True, False])
+        X, Y = np.arange(5), np.arange(10).reshape((5, 2))
+        # siblings filtered by the same mask node share one selection, gathered only when needed
+        x, y, m = InputNode('x'), InputNode('y', (2,)), InputNode('m')
+        filtered_x, filtered_y = Filter()([x, m]), Filter()([y, m])
+        pipeline = Pipeline([x, y, m], [filtered_x, filtered_y])
+        pipeline.transform({'x': X, 'y': Y, 'm': mask}, prune=False)
+        assert filtered_x.selection is filtered_y.selection
+        # a mask changed in place is selected from anew
+        mask_buffer = np.array([1, 1, 0, 0, 0])
+        pipeline.transform({'x': X, 'y': Y, 'm': mask_buffer})
+        mask_buffer[:] = [0, 0, 0, 1, 1]
+        output_x, _ = pipeline.transform({'x': X, 'y': Y, 'm': mask_buffer})
+        assert np.array_equal(output_x, [3, 4])
+
+        output_x, output_y = Filter().transform(X, mask), Filter().transform(Y, mask)
+        assert output_y.shape == (3, 2)
+        # filtering a filtered array combines the selections
+        output = Filter().transform(output_x, np.array([False, True, True]))
+        assert output.base is X
+        assert np.array_equal(output, [2, 3])
+        # concatenating filtered arrays gathers the rows straight into the output
+        output = Concatenate().transform(output_x, output_y)
+        assert np.array_equal(output, np.column_stack([X[mask], Y[mask]]))
+
+        # selections are only followed downstream of a Filter
+        doubled, unfiltered = ScalarMultiply(2)(filtered_x), ScalarMultiply(2)(x)
+        Pipeline([x, m], [doubled, unfiltered])
+        assert doubled.tracks_selection and not unfiltered.tracks_selection
@@ -9,3 +9,14 @@ class test_RemoveStopwords(unittest.TestCase):
         assert RemoveStopwords().transform(X) == ''
         X = 'the it is a the a is it garbage'
         assert RemoveStopwords().transform(X) == 'garbage'
+
+    def test_dedupe(self):
+        X = np.array(['the garbage', 'it is', 'the garbage', 'a trash'] * 3)
+        expected = RemoveStopwords().transform(X)
+        layer = RemoveStopwords(dedupe=True, cache_size=10)
+        assert np.array_equal(layer.transform(X), expected)
+        assert np.array_equal(layer.transform(X), expected)
+        assert layer.transform.cache.hits == 3
+        # every element of multi-dimensional text is processed, keeping its shape
+        assert np.array_equal(layer.transform(X.reshape((4, 3))), expected.reshape((4, 3)))
+        assert layer.transform('the garbage') == 'garbage'
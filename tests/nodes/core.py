@@ -0,0 +1,30 @@
+import unittest
+import numpy as np
+import megatron
+from megatron.layers import core, ScalarMultiply
+
+
+class test_eager(unittest.TestCase):
+    def setUp(self):
+        core.eager_cache.clear()
+        self.X = np.random.RandomState(0).rand(2 ** 17)
+
+    def test_cached(self):
+        x = megatron.nodes.InputNode('x')(self.X)
+        first = ScalarMultiply(2)(x)
+        hits = core.eager_cache.hits
+        second = ScalarMultiply(2)(x)
+        # an identical call on the same data reuses the earlier results
+        assert core.eager_cache.hits == hits + 1
+        assert np.array_equal(second.output, first.output)
+        assert second.is_eager
+        ScalarMultiply(3)(x)
+        assert core.eager_cache.hits == hits + 1
+
+    def test_small(self):
+        x = megatron.nodes.InputNode('x')(self.X[:10])
+        ScalarMultiply(2)(x)
+        output = ScalarMultiply(2)(x).output
+        # calls on little data are re-run rather than hashed
+        assert len(core.eager_cache) == 0
+        assert np.array_equal(output, self.X[:10] * 2)
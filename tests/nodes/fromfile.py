@@ -0,0 +1,51 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from megatron.nodes import fromfile
+
+
+class test_sample(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({'a': np.arange(100),
+                                'b': ['x'] * 50 + ['a much longer text'] * 50})
+
+    def check(self, nodes, n):
+        a, b = nodes['a'].output, nodes['b'].output
+        assert len(a) == n and len(np.unique(a)) == n
+        # rows stay aligned across columns, and strings are not truncated
+        assert np.array_equal(b, np.where(a < 50, 'x', 'a much longer text'))
+
+    def test_from_dataframe(self):
+        nodes = fromfile.from_dataframe(self.df, eager=True, nrows=10, sample=True, seed=0)
+        self.check(nodes, 10)
+        again = fromfile.from_dataframe(self.df, eager=True, nrows=10, sample=True, seed=0)
+        assert np.array_equal(again['a'].output, nodes['a'].output)
+        nodes = fromfile.from_dataframe(self.df, eager=True, nrows=10)
+        assert np.array_equal(nodes['a'].output, np.arange(10))
+
+    def test_from_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, 'data.csv')
+            self.df.to_csv(filepath, index=False)
+            chunk_rows = fromfile.SAMPLE_CHUNK_ROWS
+            fromfile.SAMPLE_CHUNK_ROWS = 30
+            try:
+                nodes = fromfile.from_csv(filepath, eager=True, nrows=10, sample=True, seed=0)
+            finally:
+                fromfile.SAMPLE_CHUNK_ROWS = chunk_rows
+        self.check(nodes, 10)
+
+    def test_from_sql(self):
+        connection = sqlite3.connect(':memory:')
+        self.df.to_sql('data', connection, index=False)
+        chunk_rows = fromfile.SAMPLE_CHUNK_ROWS
+        fromfile.SAMPLE_CHUNK_ROWS = 30
+        try:
+            nodes = fromfile.from_sql(connection, 'SELECT * FROM data', eager=True, nrows=60,
+                                      sample=True, seed=0)
+        finally:
+            fromfile.SAMPLE_CHUNK_ROWS = chunk_rows
+        self.check(nodes, 60)
@@ -0,0 +1,478 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import warnings
+import itertools
+import numpy as np
+import megatron
+from unittest import mock
+from sklearn.metrics import f1_score
+from sklearn.preprocessing import StandardScaler
+from megatron.layers import ScalarMultiply, Divide, Concatenate, Lambda, Sklearn, TimeSeries
+from megatron.layers import Predicate, Filter, OneHotRange, OneHotLabels, AddDim
+from megatron.layers.core import Layer
+from megatron.layers.metrics import Metric
+from megatron.layers.explore import Describe
+from megatron.io.generator import SQLGenerator
+
+
+class Batches:
+    # a source of batches, in a cycle, that can report and return to its position
+    def __init__(self, batches):
+        self.batches = batches
+        self.position = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        batch = self.batches[self.position % len(self.batches)]
+        self.position += 1
+        return batch
+
+    def tell(self):
+        return self.position
+
+    def seek(self, position):
+        self.position = position
+
+
+class test_transform(unittest.TestCase):
+    def build(self, dtype):
+        x = megatron.nodes.InputNode('x', dtype=dtype)
+        y = megatron.nodes.InputNode('y', dtype=dtype)
+        out = Concatenate()([ScalarMultiply(2)(x), ScalarMultiply(3)(y)])
+        return megatron.Pipeline([x, y], out)
+
+    def test_preallocated(self):
+        X, Y = np.arange(4.), np.arange(4.) + 0.5
+        correct_output = np.column_stack([X * 2, Y * 3])
+        pipeline = self.build('float64')
+        assert len(pipeline.slots) == 2
+        output = pipeline.transform({'x': X, 'y': Y})[0]
+        assert output.dtype == np.float64
+        assert np.array_equal(output, correct_output)
+
+        # data not of the declared type is transformed as if nothing had been declared
+        output = self.build('int64').transform({'x': X, 'y': Y})[0]
+        assert np.array_equal(output, correct_output)
+        output = self.build('float32').transform({'x': X, 'y': Y})[0]
+        assert output.dtype == np.float64
+        assert np.array_equal(output, correct_output)
+
+    def test_out_of_core(self):
+        X, Y = np.arange(1000.), np.arange(1000.) + 0.5
+        correct_output = self.build(None).transform({'x': X, 'y': Y})[0]
+        with tempfile.TemporaryDirectory() as directory:
+            np.save(os.path.join(directory, 'x.npy'), X)
+            np.save(os.path.join(directory, 'ind.npy'), np.arange(1000))
+            for dtype in ['float64', None]:
+                x = megatron.nodes.InputNode('x', dtype=dtype)
+                y = megatron.nodes.InputNode('y', dtype=dtype)
+                out = Concatenate()([ScalarMultiply(2)(x), ScalarMultiply(3)(y)])
+                pipeline = megatron.Pipeline([x, y], out, name='ooc' + str(dtype),
+                                             storage=sqlite3.connect(':memory:'))
+                out_dir = os.path.join(directory, str(dtype))
+                # a small budget streams the rows through in many chunks
+                output = pipeline.transform({'x': os.path.join(directory, 'x.npy'), 'y': Y,
+                                             'ind': os.path.join(directory, 'ind.npy')},
+                                            index_field='ind', out_dir=out_dir,
+                                            memory_budget=4096)[0]
+                assert isinstance(output, np.memmap)
+                assert os.path.exists(os.path.join(out_dir, 'output0.npy'))
+                assert np.array_equal(output, correct_output)
+                assert np.array_equal(pipeline.storage.read()[0], correct_output)
+                del output
+
+                # no rows at all
+                np.save(os.path.join(directory, 'empty.npy'), X[:0])
+                output = pipeline.transform({'x': os.path.join(directory, 'empty.npy'),
+                                             'y': Y[:0]}, out_dir=out_dir)[0]
+                assert output.shape == (0, 2)
+                del output
+
+    def test_spill(self):
+        X, Y = np.arange(1000.), np.arange(1000.) + 0.5
+        pipeline = self.build(None)
+        correct_output = pipeline.transform({'x': X, 'y': Y})[0]
+        with tempfile.TemporaryDirectory() as directory:
+            output = pipeline.transform({'x': X, 'y': Y}, spill_budget=4096,
+                                        spill_dir=directory)[0]
+            assert np.array_equal(output, correct_output)
+            report = pipeline.spill_report
+            assert len(report['nodes']) > 0 and report['bytes'] > 0
+            # outputs are returned in memory, and the spill files are deleted
+            assert not isinstance(output, np.memmap)
+            assert os.listdir(directory) == []
+
+    def test_specs_after_fit(self):
+        x = megatron.nodes.InputNode('x', dtype='int64')
+        onehot = OneHotRange()(x)
+        out = Concatenate()([onehot, AddDim()(x)])
+        pipeline = megatron.Pipeline(x, out)
+        assert pipeline.specs[onehot].shape == (None,)
+        assert pipeline.slots == {}
+        peak = pipeline.explain(10)
+        # the width of the one-hot encoding is only known once fit
+        pipeline.fit({'x': np.array([0, 1, 2, 1])})
+        assert pipeline.specs[onehot].shape == (3,)
+        assert pipeline.specs[out].shape == (4,)
+        assert onehot in pipeline.slots
+        assert pipeline.explain(10) > peak
+        output = pipeline.transform({'x': np.array([0, 2])})[0]
+        assert np.array_equal(output, np.array([[1, 0, 0, 0], [0, 0, 1, 2]]))
+
+
+class test_transform_generator(unittest.TestCase):
+    def setUp(self):
+        self.sizes = []
+        def double(X):
+            self.sizes.append(len(X))
+            return X * 2
+        self.x = megatron.nodes.InputNode('x')
+        self.layer = Lambda(double)
+        self.pipeline = megatron.Pipeline(self.x, self.layer(self.x))
+
+    def test_rebatched(self):
+        self.layer.preferred_batch_size = 4
+        batches = [{'x': np.arange(3.)}, {'x': np.arange(0.)}, {'x': np.arange(3., 10.)}]
+        outputs = list(self.pipeline.transform_generator(iter(batches), steps=3))
+        # each node runs at its preferred batch size, but outputs follow the input batches
+        assert self.sizes == [4, 4, 2]
+        assert [len(output[0]) for output in outputs] == [3, 0, 7]
+        assert np.array_equal(np.concatenate([output[0] for output in outputs]),
+                              np.arange(10.) * 2)
+
+    def test_push_predicates(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE events (k INTEGER, x REAL)")
+        conn.executemany("INSERT INTO events VALUES (?, ?)", [(i, i % 4) for i in range(12)])
+        source = SQLGenerator(conn, "SELECT * FROM events", batch_size=3, key_col='k')
+        next(source)
+        out = Filter()([self.layer(self.x), Predicate('>=', 2)(self.x)])
+        pipeline = megatron.Pipeline(self.x, out)
+        outputs = list(pipeline.transform_generator(source, steps=2))
+        # the database only returns the rows kept by the Predicate
+        assert self.sizes == [3, 3]
+        assert np.array_equal(np.concatenate([output[0] for output in outputs]),
+                              np.array([2, 3, 2, 3, 2, 3]) * 2.)
+        # the caller's source keeps its own query and position
+        assert source.predicates == []
+        assert np.array_equal(next(source)['k'], np.array([3, 4, 5]))
+
+    def test_pipelined(self):
+        out = ScalarMultiply(3)(Lambda(lambda X: X + 1)(self.layer(self.x)))
+        pipeline = megatron.Pipeline(self.x, out)
+        batches = [{'x': np.arange(5.) + i} for i in range(6)]
+        expected = list(pipeline.transform_generator(iter(batches), steps=6))
+        for n_stages in [2, 3, 5]:
+            outputs = list(pipeline.transform_generator(iter(batches), steps=6,
+                                                        n_stages=n_stages, queue_size=1))
+            assert len(outputs) == 6
+            assert all(np.array_equal(output[0], correct[0])
+                       for output, correct in zip(outputs, expected))
+            stats = pipeline.stage_stats
+            assert len(stats) == min(n_stages, 3)
+            assert sum(len(stage['nodes']) for stage in stats) == 3
+            assert all(stage['batches'] == 6 for stage in stats)
+            assert all(0 <= stage['utilization'] <= 1 for stage in stats)
+
+    def test_pipelined_error(self):
+        def fail(X):
+            if X[0] > 0:
+                raise ValueError("bad batch")
+            return X
+        pipeline = megatron.Pipeline(self.x, Lambda(fail)(self.layer(self.x)))
+        batches = [{'x': np.arange(3.) - i} for i in range(3)] + [{'x': np.arange(1., 4.)}]
+        outputs = pipeline.transform_generator(iter(batches), steps=4, n_stages=2)
+        self.assertRaises(ValueError, list, outputs)
+
+    def test_pipelined_storage(self):
+        out = Filter()([ScalarMultiply(3)(self.layer(self.x)), Predicate('>', 2)(self.x)])
+        pipeline = megatron.Pipeline(self.x, out, name='staged',
+                                     storage=sqlite3.connect(':memory:'))
+        batches = [{'x': np.arange(5.) + 5 * i, 'ind': np.arange(5) + 5 * i} for i in range(2)]
+        outputs = list(pipeline.transform_generator(iter(batches), steps=2, index='ind',
+                                                    n_stages=2))
+        assert [len(output[0]) for output in outputs] == [2, 5]
+        # storage is written with the index of the rows kept by the Filter
+        found, stored = pipeline.storage.lookup(np.arange(10))
+        assert np.array_equal(found, np.arange(10) > 2)
+        assert np.array_equal(stored[0], np.arange(3., 10.) * 6)
+
+        # re-batching needs one output row per input row, so the index is never misaligned
+        self.layer.preferred_batch_size = 4
+        batches = [{'x': np.arange(5.) + 5 * i, 'ind': np.arange(5) + 5 * i} for i in range(2)]
+        self.assertRaises(ValueError, list,
+                          pipeline.transform_generator(iter(batches), steps=2, index='ind'))
+
+    def test_split_stages(self):
+        nodes = ['a', 'b', 'c', 'd']
+        assert megatron.pipeline._split_stages(nodes, [1, 1, 1, 1], 2) == [['a', 'b'], ['c', 'd']]
+        # stages are balanced by cost rather than by number of nodes
+        assert megatron.pipeline._split_stages(nodes, [1, 1, 10, 1], 2) == [['a', 'b'], ['c', 'd']]
+        assert megatron.pipeline._split_stages(nodes, [10, 1, 1, 1], 2) == [['a'], ['b', 'c', 'd']]
+        assert megatron.pipeline._split_stages(nodes, [0, 0, 0, 9], 3) == [['a'], ['b'], ['c', 'd']]
+
+
+class test_fit(unittest.TestCase):
+    def setUp(self):
+        self.sizes = []
+        def double(X):
+            self.sizes.append(len(X))
+            return X * 2
+        self.x = megatron.nodes.InputNode('x', (2,))
+        self.doubled = Lambda(double)(self.x)
+        self.scaled = Sklearn(StandardScaler())(self.doubled)
+        self.X = np.random.RandomState(0).rand(1000, 2)
+
+    def test_sample(self):
+        pipeline = megatron.Pipeline(self.x, self.scaled)
+        pipeline.fit({'x': self.X}, sample=50, seed=0)
+        assert self.scaled.layer.transformation.n_samples_seen_ == 50
+        # nodes feeding only sampled layers are transformed on the sample alone
+        assert self.sizes == [50]
+        pipeline.fit({'x': self.X}, sample=50, seed=0, transform_full=True)
+        assert self.sizes[1:] == [1000]
+
+    def test_stratify(self):
+        pipeline = megatron.Pipeline(self.x, self.scaled)
+        strata = np.repeat([0, 1], [990, 10])
+        pipeline.fit({'x': self.X, 's': strata}, sample=10, stratify='s', seed=0)
+        assert self.scaled.layer.transformation.n_samples_seen_ == 11
+
+    def test_sample_stateful(self):
+        # a layer transformed on the sample keeps no state from it
+        series = TimeSeries(3)(self.x)
+        pipeline = megatron.Pipeline(self.x, series)
+        pipeline.fit({'x': self.X}, sample=50, seed=0)
+        assert np.array_equal(series.layer.metadata['previous'], np.zeros((2, 2)))
+
+    def test_fit_generator_sample(self):
+        pipeline = megatron.Pipeline(self.x, self.scaled)
+        batches = itertools.cycle([{'x': self.X[i:i + 100]} for i in range(0, 1000, 100)])
+        pipeline.fit_generator(batches, steps_per_epoch=10, sample=50, seed=0)
+        assert self.scaled.layer.transformation.n_samples_seen_ == 50
+
+    def test_fit_generator_sparse(self):
+        # sparse outputs, such as one-hot encodings, are sampled too
+        a = megatron.nodes.InputNode('a')
+        scaled = Sklearn(StandardScaler(with_mean=False))(OneHotRange()(a))
+        pipeline = megatron.Pipeline(a, scaled)
+        batches = itertools.cycle([{'a': np.arange(i, i + 100) % 7} for i in range(0, 1000, 100)])
+        pipeline.fit_generator(batches, steps_per_epoch=10, sample=50, seed=0)
+        assert scaled.layer.transformation.n_samples_seen_ == 50
+
+    def test_parallel(self):
+        def build():
+            a, b = megatron.nodes.InputNode('a'), megatron.nodes.InputNode('b')
+            nodes = [OneHotRange()(a), OneHotLabels()(b), TimeSeries(2)(a)]
+            return megatron.Pipeline([a, b], nodes), nodes
+        data = {'a': np.random.RandomState(0).randint(-5, 5, 101),
+                'b': np.array(list('abcdefghij'))[np.arange(101) % 7]}
+        serial, serial_nodes = build()
+        serial.fit(dict(data))
+        parallel, parallel_nodes = build()
+        parallel.fit(dict(data), n_jobs=2)
+        # mergeable layers are fit to shards and merged; the others are fit as usual
+        assert [node.layer.is_mergeable() for node in parallel_nodes] == [True, True, False]
+        for serial_node, parallel_node in zip(serial_nodes, parallel_nodes):
+            serial_metadata = serial_node.layer.metadata
+            parallel_metadata = parallel_node.layer.metadata
+            assert set(serial_metadata) == set(parallel_metadata)
+            for key in serial_metadata:
+                assert np.array_equal(serial_metadata[key], parallel_metadata[key])
+        assert all(np.array_equal(serial_output, parallel_output) for serial_output, parallel_output
+                   in zip(serial.transform(dict(data)), parallel.transform(dict(data))))
+        self.assertRaises(NotImplementedError, parallel_nodes[2].layer.merge,
+                          serial_nodes[2].layer.metadata)
+
+    def test_fit_cache(self):
+        calls = []
+        class CountingRange(OneHotRange):
+            def partial_fit(self, X):
+                calls.append(len(X))
+                super().partial_fit(X)
+
+        def build():
+            x = megatron.nodes.InputNode('x')
+            counted = CountingRange()(x)
+            return megatron.Pipeline(x, [counted, Sklearn(StandardScaler())(counted)]), counted
+        X = np.array([0, 1, 2, 1])
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline, counted = build()
+            pipeline.fit({'x': X}, fit_cache=directory)
+            assert calls == [4]
+            # an identical fit restores the fitted states instead of fitting again
+            pipeline, counted = build()
+            pipeline.fit({'x': X}, fit_cache=megatron.io.fitcache.FitCache(directory))
+            assert calls == [4]
+            assert counted.layer.metadata == {'min_val': 0, 'max_val': 2}
+            assert np.array_equal(pipeline.outputs[1].layer.transformation.mean_,
+                                  np.eye(3)[X].mean(axis=0))
+            assert np.array_equal(pipeline.transform({'x': X})[0], np.eye(3)[X])
+            # other data is fit as usual
+            pipeline.fit({'x': X + 1}, fit_cache=directory)
+            assert calls == [4, 4]
+            assert counted.layer.metadata == {'min_val': 1, 'max_val': 3}
+
+    def test_resume(self):
+        pipeline = megatron.Pipeline(self.x, Sklearn(StandardScaler())(self.x))
+        batches = [{'x': self.X[i:i + 100]} for i in range(0, 1000, 100)]
+        with tempfile.TemporaryDirectory() as directory:
+            source = Batches(batches)
+            pipeline.fit_generator(source, steps_per_epoch=10, checkpoint_dir=directory,
+                                   checkpoint_every=5)
+            position = source.tell()
+            # a source with tell() and seek() is put back where the fit stopped
+            source = Batches(batches)
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                pipeline.fit_generator(source, steps_per_epoch=10, resume_from=directory)
+            assert source.tell() == position > 0
+            # a plain generator cannot be, which is warned about
+            with self.assertWarns(UserWarning):
+                pipeline.fit_generator(itertools.cycle(batches), steps_per_epoch=10,
+                                       resume_from=directory)
+
+
+class RowCounter(Layer):
+    # learns the number of rows fit, and has no partial_fit of its own
+    def fit(self, X):
+        self.rows = len(X)
+
+    def transform(self, X):
+        return X
+
+
+class test_refit_incremental(unittest.TestCase):
+    def setUp(self):
+        self.x = megatron.nodes.InputNode('x')
+        self.counter = RowCounter()(self.x)
+        self.scaled = Sklearn(StandardScaler())(Lambda(lambda X: X.reshape(-1, 1))(self.counter))
+        self.pipeline = megatron.Pipeline(self.x, self.scaled, name='refit', version=1)
+        self.X = np.arange(20.)
+
+    def test_dict(self):
+        assert not self.counter.layer.supports_partial_fit()
+        assert self.scaled.layer.supports_partial_fit()
+        data = {'x': self.X[:10], 't': np.arange(10)}
+        assert self.pipeline.refit_incremental(data, 't') == 10
+        assert self.pipeline.watermark == 9
+        assert self.pipeline.refit_incremental(data, 't') == 0
+        data = {'x': self.X, 't': np.arange(20)}
+        assert self.pipeline.refit_incremental(data, 't') == 10
+        # the scaler is updated with the new rows, and the counter refit to all of them
+        assert self.scaled.layer.transformation.n_samples_seen_ == 20
+        assert self.counter.layer.rows == 20
+        assert self.pipeline.watermark == 19
+        self.assertRaises(ValueError, self.pipeline.refit_incremental, data)
+
+    def test_sql(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE events (k INTEGER, x REAL)")
+        conn.executemany("INSERT INTO events VALUES (?, ?)", [(i, i) for i in range(10)])
+        source = SQLGenerator(conn, "SELECT * FROM events", batch_size=4, key_col='k')
+        assert set(self.pipeline._read_from(source, 6)['k']) == {7, 8, 9}
+        assert self.pipeline.refit_incremental(source) == 10
+
+        # the watermark is saved with the pipeline, so a loaded one reads only newer rows
+        with tempfile.TemporaryDirectory() as directory:
+            self.pipeline.save(directory)
+            pipeline = megatron.load_pipeline(os.path.join(directory, 'refit1.pkl'))
+        assert pipeline.watermark == 9
+        conn.executemany("INSERT INTO events VALUES (?, ?)", [(i, i) for i in range(10, 15)])
+        assert pipeline.refit_incremental(source) == 5
+        assert pipeline.outputs[0].layer.transformation.n_samples_seen_ == 15
+        assert pipeline.path[1].layer.rows == 15
+
+
+class test_run(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        def model(X):
+            self.calls.append(len(X))
+            return X
+        self.x = megatron.nodes.InputNode('x')
+        self.y = megatron.nodes.InputNode('y')
+        self.pred = Lambda(model)(self.x)
+        self.f1 = Metric(f1_score)([self.pred, self.y], 'f1_score')
+        self.summary = Describe()(self.pred, 'summary')
+        self.pipeline = megatron.Pipeline([self.x, self.y], self.pred, metrics=self.f1,
+                                          explorers=self.summary)
+        self.X = np.ones(100)
+        self.Y = np.ones(100)
+
+    def test_run(self):
+        results = self.pipeline.run({'x': self.X, 'y': self.Y})
+        # the model is run once for both the outputs and the metric
+        assert self.calls == [100]
+        assert np.array_equal(results['outputs'][0], self.X)
+        self.assertAlmostEqual(results['metrics']['f1_score'], 1.0)
+        assert 'explorers' not in results
+        assert list(self.pipeline.run({'x': self.X, 'y': self.Y}, outputs=False)) == ['metrics']
+        self.assertRaises(ValueError, self.pipeline.run, {'x': self.X, 'y': self.Y},
+                          metrics=['f2'])
+
+    def test_explorers(self):
+        results = self.pipeline.run({'x': self.X, 'y': self.Y}, outputs=False, metrics=False,
+                                    explorers=['summary'])
+        assert list(results) == ['explorers']
+        assert results['explorers']['summary']['mean'] == 1.
+        assert self.calls == [100]
+        results = self.pipeline.run({'x': self.X, 'y': self.Y}, explorers=[self.summary])
+        assert set(results) == {'outputs', 'metrics', 'explorers'}
+        assert self.calls == [100, 100]
+        other = Describe()(self.x, 'other')
+        self.assertRaises(ValueError, self.pipeline.run, {'x': self.X, 'y': self.Y},
+                          explorers=[other])
+
+    def test_run_generator(self):
+        batches = [{'x': self.X[:40], 'y': self.Y[:40]}, {'x': self.X[40:], 'y': self.Y[40:]}]
+        results = list(self.pipeline.run_generator(iter(batches), steps=2, outputs=False))
+        assert [list(result) for result in results] == [['metrics'], ['metrics']]
+        assert self.calls == [40, 60]
+
+    def test_storage(self):
+        pipeline = megatron.Pipeline([self.x, self.y], self.pred, metrics=self.f1, name='run',
+                                     storage=sqlite3.connect(':memory:'))
+        pipeline.run({'x': self.X * 2, 'y': self.Y, 'ind': np.arange(100)}, index_field='ind')
+        found, stored = pipeline.storage.lookup(np.arange(5))
+        assert found.all() and np.array_equal(stored[0], self.X[:5] * 2)
+        # nothing is written without outputs
+        pipeline.run({'x': self.X * 3, 'y': self.Y, 'ind': np.arange(100)}, index_field='ind',
+                     outputs=False)
+        assert np.array_equal(pipeline.storage.lookup(np.arange(5))[1][0], self.X[:5] * 2)
+
+    def test_evaluate_explore(self):
+        data = {'x': self.X, 'y': self.Y}
+        with mock.patch.object(self.pipeline, 'run', wraps=self.pipeline.run) as run:
+            metrics = self.pipeline.evaluate(dict(data))
+            self.assertAlmostEqual(metrics['f1_score'], 1.0)
+            run.assert_called_once_with(data, outputs=False, metrics=True, prune=True)
+            explored = self.pipeline.explore(dict(data))
+            assert explored['summary']['max'] == 1.
+            assert run.call_count == 2
+        assert self.calls == [100, 100]
+
+
+class test_dtype_policy(unittest.TestCase):
+    def test_shared_layer(self):
+        x, y = megatron.nodes.InputNode('x'), megatron.nodes.InputNode('y')
+        layer = Divide()
+        single = megatron.Pipeline([x, y], layer([x, y]), dtype_policy={'float_dtype': 'float32'})
+        x2, y2 = megatron.nodes.InputNode('x'), megatron.nodes.InputNode('y')
+        double = megatron.Pipeline([x2, y2], layer([x2, y2]))
+        data = {'x': np.ones(3), 'y': np.ones(3) * 3}
+        # each Pipeline runs the shared layer with its own policy, leaving the layer's own
+        assert single.transform(dict(data))[0].dtype == np.float32
+        assert double.transform(dict(data))[0].dtype == np.float64
+        assert single.specs[single.outputs[0]].dtype == np.float32
+        assert layer.dtype_policy.float_dtype == np.float64
+
+    def test_legacy_layer(self):
+        # layers pickled before policies existed fall back to the default one
+        layer = Divide()
+        del layer.dtype_policy
+        assert layer.transform(np.ones(3), np.ones(3) * 3).dtype == np.float64
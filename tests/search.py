@@ -0,0 +1,74 @@
+import unittest
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+import megatron
+from megatron.layers import ScalarMultiply, Sklearn, Predicate, Filter
+from megatron.layers.metrics import Metric
+
+
+def mean_error(pred, Y):
+    return np.abs(pred - Y).mean()
+
+
+class test_grid_search(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.X = rng.rand(90, 2)
+        self.data = {'x': self.X, 'y': (self.X[:, 0] > 0.5).astype(int), 'z': self.X[:, 0] * 2}
+
+    def build_classifier(self):
+        x, y = megatron.nodes.InputNode('x', (2,)), megatron.nodes.InputNode('y')
+        pred = Sklearn(LogisticRegression())([x, y])
+        accuracy = Metric(accuracy_score)([y, pred], 'accuracy')
+        return megatron.Pipeline([x, y], pred, metrics=accuracy)
+
+    def test_cross_validate(self):
+        pipeline = self.build_classifier()
+        scores = megatron.cross_validate(pipeline, self.data, n_folds=3, seed=0)
+        assert len(scores['accuracy']) == 3
+        assert all(0.8 < score <= 1 for score in scores['accuracy'])
+
+    def test_sklearn_params(self):
+        pipeline = self.build_classifier()
+        results = megatron.grid_search(pipeline, self.data,
+                                       {'LogisticRegression': {'C': [1e-6, 10.]}}, seed=0)
+        assert [result['params'] for result in results] == [
+            {'LogisticRegression': {'C': 1e-6}}, {'LogisticRegression': {'C': 10.}}]
+        assert results[1]['mean']['accuracy'] > results[0]['mean']['accuracy']
+        assert all(len(result['scores']['accuracy']) == 3 for result in results)
+        # the pipeline itself is neither refit nor given other hyperparameters
+        estimator = pipeline.outputs[0].layer.transformation
+        assert estimator.C == 1. and not hasattr(estimator, 'coef_')
+
+    def test_layer_params(self):
+        x, z = megatron.nodes.InputNode('x'), megatron.nodes.InputNode('z')
+        pred = ScalarMultiply(1)(x)
+        error = Metric(mean_error)([pred, z], 'error')
+        pipeline = megatron.Pipeline([x, z], pred, metrics=error)
+        data = {'x': self.X[:, 0], 'z': self.data['z']}
+        output = pipeline.transform(dict(data))[0]
+        results = megatron.grid_search(pipeline, data, {'ScalarMultiply': {'factor': [1, 2]}},
+                                       seed=0)
+        assert results[0]['mean']['error'] > 0
+        assert results[1]['mean']['error'] == 0
+        assert pred.layer.kwargs['factor'] == 1
+        assert pipeline.outputs[0].output is output
+
+    def test_validation(self):
+        x, z = megatron.nodes.InputNode('x'), megatron.nodes.InputNode('z')
+        mask = Predicate('>', 0.5)(x)
+        pred = Filter()([x, mask])
+        error = Metric(mean_error)([pred, Filter()([z, mask])], 'error')
+        pipeline = megatron.Pipeline([x, z], pred, metrics=error)
+        data = {'x': self.X[:, 0], 'z': self.data['z']}
+        results = megatron.grid_search(pipeline, data, {'Predicate': {'value': [0.5, 0.7]}},
+                                       seed=0)
+        assert len(results) == 2
+        # values are checked by the layer's __init__, as when it was made
+        self.assertRaises(ValueError, megatron.grid_search, pipeline, data,
+                          {'Predicate': {'op': ['like']}})
+        self.assertRaises(TypeError, megatron.grid_search, pipeline, data,
+                          {'Predicate': {'scale': [2]}})
+        self.assertRaises(ValueError, megatron.grid_search, pipeline, data,
+                          {'Missing': {'value': [1]}})
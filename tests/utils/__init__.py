@@ -1,4 +1,9 @@
+from . import batching
+from . import cache
 from . import errors
 from . import generic
 from . import hash
+from . import memory
 from . import pipeline
+from . import sampling
+from . import telemetry
@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+import scipy.sparse
+from megatron.utils.batching import RowBuffer
+from megatron.utils.ragged import RaggedArray
+
+
+class test_RowBuffer(unittest.TestCase):
+    def test_take(self):
+        buffer = RowBuffer()
+        buffer.put(np.arange(3))
+        buffer.put(np.arange(3, 8))
+        assert buffer.n_rows == 8
+        first = buffer.take(2)
+        assert np.array_equal(first, [0, 1])
+        assert np.array_equal(buffer.take(4), [2, 3, 4, 5])
+        assert np.array_equal(buffer.take(10), [6, 7])
+        assert buffer.n_rows == 0
+
+    def test_take_empty(self):
+        buffer = RowBuffer()
+        assert len(buffer.take(0)) == 0
+        buffer.put(np.ones((0, 3), dtype=np.float32))
+        empty = buffer.take(0)
+        assert empty.shape == (0, 3) and empty.dtype == np.float32
+        buffer.put(np.ones((2, 3), dtype=np.float32))
+        assert buffer.take(0).shape == (0, 3)
+        assert buffer.take(5).shape == (2, 3)
+
+    def test_sparse_ragged(self):
+        buffer = RowBuffer()
+        buffer.put(scipy.sparse.csr_matrix(np.eye(3)))
+        buffer.put(scipy.sparse.csr_matrix(np.eye(3)))
+        assert np.array_equal(buffer.take(4).toarray(), np.vstack([np.eye(3), np.eye(3)[:1]]))
+
+        buffer = RowBuffer()
+        buffer.put(RaggedArray.from_lengths(np.arange(3), [1, 2]))
+        buffer.put(RaggedArray.from_lengths(np.arange(3, 6), [3]))
+        taken = buffer.take(3)
+        assert [row.tolist() for row in taken] == [[0], [1, 2], [3, 4, 5]]
@@ -0,0 +1,25 @@
+import unittest
+from megatron.utils.cache import LRUCache
+
+
+class test_LRUCache(unittest.TestCase):
+    def test_put_get(self):
+        cache = LRUCache(10)
+        cache.put('a', 1, 4)
+        cache.put('b', 2, 4)
+        assert cache.get('a') == 1
+        assert cache.get('c', 'missing') == 'missing'
+        assert (cache.hits, cache.misses) == (1, 1)
+        # the least recently used entry is evicted to make room
+        cache.put('c', 3, 4)
+        assert 'b' not in cache and 'a' in cache and 'c' in cache
+        assert cache.n_bytes == 8
+        # values larger than the cache are not kept
+        cache.put('d', 4, 11)
+        assert 'd' not in cache
+        # replacing a key frees its old size
+        cache.put('a', 5, 2)
+        assert cache.n_bytes == 6 and cache.get('a') == 5
+        assert cache.pop('a') == 5 and cache.pop('a') is None
+        cache.clear()
+        assert len(cache) == 0 and cache.n_bytes == 0
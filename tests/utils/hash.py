@@ -0,0 +1,30 @@
+import unittest
+import numpy as np
+import megatron
+from megatron.layers import ScalarMultiply
+from megatron.utils.hash import hash_call, hash_path
+
+
+class test_hash_call(unittest.TestCase):
+    def test_hash_call(self):
+        X = np.arange(10.)
+        node = megatron.nodes.InputNode('x')(X)
+        other = megatron.nodes.InputNode('y')(X.copy())
+        key = hash_call(ScalarMultiply(2), [node])
+        # equal layers on equal data share a fingerprint
+        assert hash_call(ScalarMultiply(2), [other]) == key
+        assert hash_call(ScalarMultiply(3), [node]) != key
+        other = megatron.nodes.InputNode('y')(X + 1)
+        assert hash_call(ScalarMultiply(2), [other]) != key
+
+
+class test_hash_path(unittest.TestCase):
+    def test_hash_path(self):
+        X = np.arange(10.)
+        x = megatron.nodes.InputNode('x')(X)
+        key = hash_path([x, ScalarMultiply(2)(x)])
+        # paths of equal data and layers of equal configuration share a fingerprint
+        assert hash_path([x, ScalarMultiply(2)(x)]) == key
+        assert hash_path([x, ScalarMultiply(3)(x)]) != key
+        other = megatron.nodes.InputNode('x')(X + 1)
+        assert hash_path([other, ScalarMultiply(2)(other)]) != key
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import scipy.sparse
+import megatron
+from megatron.layers import ScalarMultiply, Add
+from megatron.utils import memory
+
+
+class test_memory(unittest.TestCase):
+    def test_out_of_core(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, 'x.npy')
+            np.save(filepath, np.arange(10.))
+            assert memory.is_out_of_core(filepath)
+            assert not memory.is_out_of_core(np.arange(10.))
+            data = memory.as_memmap(filepath)
+            assert isinstance(data, np.memmap) and memory.is_out_of_core(data)
+            assert memory.in_memory_bytes(data) == 0
+            del data
+
+    def test_nbytes(self):
+        assert memory.nbytes(np.ones(10)) == 80
+        assert memory.nbytes(None) == 0
+        matrix = scipy.sparse.csr_matrix(np.eye(4))
+        assert memory.nbytes(matrix) == (matrix.data.nbytes + matrix.indices.nbytes
+                                         + matrix.indptr.nbytes)
+
+    def test_chunk_rows(self):
+        assert memory.chunk_rows(100, 1000) == 10
+        assert memory.chunk_rows(2000, 1000) == 1
+        assert memory.chunk_rows(0, 1000) == memory.PROBE_ROWS
+        assert memory.format_bytes(None) == '?'
+        assert memory.format_bytes(2048) == '2.0KB'
+
+    def test_open_output_memmap(self):
+        with tempfile.TemporaryDirectory() as directory:
+            out_dir = os.path.join(directory, 'out')
+            out = memory.open_output_memmap(out_dir, 'output0', 5, (2,), np.float32)
+            assert out.shape == (5, 2) and out.dtype == np.float32
+            out[:] = 1
+            out.flush()
+            del out
+            assert np.array_equal(np.load(os.path.join(out_dir, 'output0.npy')), np.ones((5, 2)))
+
+
+class test_Spiller(unittest.TestCase):
+    def test_enforce(self):
+        x = megatron.nodes.InputNode('x')
+        first = ScalarMultiply(2)(x)
+        second = ScalarMultiply(3)(first)
+        out = Add()([first, second])
+        path = [x, first, second, out]
+        x.output = np.arange(100.)
+        spiller = memory.Spiller(1000)
+        first.output, second.output = np.ones(100), np.ones(100) * 2
+        spiller.enforce(path, 2)
+        # the output needed furthest away is spilled first, until the rest fits the budget
+        assert spiller.spilled == [first.name]
+        assert isinstance(first.lazy_output, np.memmap)
+        assert spiller.report()['bytes'] == 800
+        spill_dir = spiller.spill_dir
+        spiller.close()
+        assert not isinstance(first.lazy_output, np.memmap)
+        assert np.array_equal(first.output, np.ones(100))
+        assert not os.path.exists(spill_dir)
+
+        # a directory given is kept, but not the spill files in it
+        with tempfile.TemporaryDirectory() as directory:
+            spiller = memory.Spiller(0, directory)
+            spiller.enforce(path, 2)
+            spiller.close()
+            assert os.listdir(directory) == []
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+import scipy.sparse
+from megatron.utils.sampling import sample_rows, Reservoir
+
+
+class test_sample_rows(unittest.TestCase):
+    def test_sample_rows(self):
+        assert np.array_equal(sample_rows(5, 10), np.arange(5))
+        rows = sample_rows(100, 10, seed=0)
+        assert len(np.unique(rows)) == 10
+        assert np.array_equal(rows, np.sort(rows))
+        assert np.array_equal(rows, sample_rows(100, 10, seed=0))
+
+    def test_stratify(self):
+        strata = np.array(['a'] * 90 + ['b'] * 8 + ['c'] * 2)
+        rows = sample_rows(100, 10, strata, seed=0)
+        # each stratum in proportion to its size, with at least one row
+        values, counts = np.unique(strata[rows], return_counts=True)
+        assert values.tolist() == ['a', 'b', 'c']
+        assert counts.tolist() == [9, 1, 1]
+
+
+class test_Reservoir(unittest.TestCase):
+    def test_add(self):
+        reservoir = Reservoir(10, seed=0)
+        assert reservoir.sample() == []
+        reservoir.add([np.arange(4), np.arange(4) * 2])
+        X, Y = reservoir.sample()
+        assert np.array_equal(X, np.arange(4))
+        for start in range(4, 100, 8):
+            reservoir.add([np.arange(start, start + 8), np.arange(start, start + 8) * 2])
+        X, Y = reservoir.sample()
+        assert reservoir.n_seen == 100 and len(X) == 10
+        assert len(np.unique(X)) == 10
+        # rows stay aligned across arrays
+        assert np.array_equal(Y, X * 2)
+
+    def test_widen(self):
+        reservoir = Reservoir(4, seed=0)
+        reservoir.add([np.array(['a', 'b'])])
+        reservoir.add([np.array(['long text', 'longer text'])])
+        assert sorted(reservoir.sample()[0]) == ['a', 'b', 'long text', 'longer text']
+
+    def test_sparse(self):
+        # sparse rows are kept as such, and returned as a CSR matrix aligned with the rest
+        reservoir = Reservoir(10, seed=0)
+        for start in range(0, 96, 8):
+            rows = np.arange(start, start + 8)
+            reservoir.add([scipy.sparse.csr_matrix(np.eye(96)[rows]), rows])
+        X, Y = reservoir.sample()
+        assert scipy.sparse.isspmatrix_csr(X) and X.shape == (10, 96)
+        assert np.array_equal(X.toarray().argmax(axis=1), Y)
+        self.assertRaises(ValueError, reservoir.add, [np.eye(8, 96), np.arange(8)])
+        self.assertRaises(ValueError, reservoir.add,
+                          [scipy.sparse.csr_matrix(np.eye(8)), np.arange(8)])
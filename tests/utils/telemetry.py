@@ -0,0 +1,148 @@
+import os
+import json
+import sqlite3
+import tempfile
+import unittest
+import timeit
+from unittest import mock
+import numpy as np
+import megatron
+from megatron.layers import ScalarMultiply
+from megatron.utils.telemetry import Histogram, Telemetry, LATENCY_BUCKETS
+
+
+class test_Histogram(unittest.TestCase):
+    def test_quantile(self):
+        histogram = Histogram()
+        assert histogram.quantile(0.5) is None
+        for seconds in [0.00005] * 50 + [0.003] * 49 + [2.]:
+            histogram.observe(seconds)
+        assert histogram.count == 100
+        assert histogram.quantile(0.5) == 0.0001
+        assert histogram.quantile(0.99) == 0.005
+        assert histogram.quantile(1.) == 5.
+        histogram.observe(100.)
+        assert histogram.counts[-1] == 1
+        assert histogram.quantile(1.) == LATENCY_BUCKETS[-1]
+
+
+class test_Telemetry(unittest.TestCase):
+    def setUp(self):
+        self.telemetry = Telemetry(labels={'pipeline': 'p'})
+
+    def test_record(self):
+        self.telemetry.record_node('scale', 0.002, np.ones((10, 3)))
+        self.telemetry.record_node('scale', 0.002, np.ones((5, 3)))
+        stats = self.telemetry.snapshot()['nodes']['scale']
+        assert (stats['calls'], stats['rows'], stats['bytes_out']) == (2, 15, 15 * 3 * 8)
+        assert stats['p50'] == 0.005
+        self.telemetry.reset()
+        assert self.telemetry.snapshot()['nodes'] == {}
+
+    def test_pending(self):
+        # calls are queued, and added to the counters when read or once too many are queued
+        self.telemetry.MAX_PENDING = 3
+        for i in range(5):
+            self.telemetry.record_method('transform', 0.002 * i, 10)
+        assert len(self.telemetry.pending) == 1
+        stats = self.telemetry.snapshot()['methods']['transform']
+        assert (stats['calls'], stats['rows']) == (5, 50)
+        assert np.isclose(stats['seconds'], 0.02)
+        assert stats['histogram']['buckets']['0.005'] == 2
+        assert len(self.telemetry.pending) == 0
+
+    def test_slow_calls(self):
+        inputs = {'x': np.ones((10, 2))}
+        self.telemetry.record_method('transform', 0.5, 10, inputs)
+        assert len(self.telemetry.slow_calls) == 0
+        self.telemetry.record_method('transform', 2., 10, inputs, {'a': 0.5, 'b': 1.5})
+        call = self.telemetry.slow_calls[-1]
+        assert call['input_shapes'] == {'x': [10, 2]}
+        assert (call['slowest_node'], call['slowest_node_seconds']) == ('b', 1.5)
+        # only a fraction of slow calls are captured, and only the most recent are kept
+        telemetry = Telemetry(slow_seconds=0., slow_sample_rate=0.)
+        telemetry.record_method('transform', 1., 10)
+        assert len(telemetry.slow_calls) == 0
+        telemetry = Telemetry(slow_seconds=0., max_slow_calls=2)
+        for i in range(3):
+            telemetry.record_method('transform', 1., i)
+        assert [call['rows'] for call in telemetry.slow_calls] == [1, 2]
+
+    def test_to_prometheus(self):
+        self.telemetry.record_node('scale', 0.002, np.ones(10))
+        self.telemetry.record_method('transform', 0.02, 10)
+        text = self.telemetry.to_prometheus()
+        assert '# TYPE megatron_node_calls_total counter' in text
+        assert 'megatron_node_rows_total{pipeline="p",node="scale"} 10' in text
+        bucket = 'megatron_method_latency_seconds_bucket{{pipeline="p",le="{}",method="transform"}}'
+        assert bucket.format('0.01') + ' 0' in text
+        assert bucket.format('+Inf') + ' 1' in text
+        assert 'megatron_method_latency_seconds_count{pipeline="p",method="transform"} 1' in text
+
+    def test_export(self):
+        self.telemetry.record_method('transform', 0.02, 10)
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, 'megatron.prom')
+            self.telemetry.export(filepath)
+            self.telemetry.export(filepath)
+            with open(filepath) as f:
+                assert f.read() == self.telemetry.to_prometheus()
+            assert os.listdir(directory) == ['megatron.prom']
+
+            filepath = os.path.join(directory, 'megatron.jsonl')
+            self.telemetry.export(filepath, format='json')
+            self.telemetry.export(filepath, format='json')
+            with open(filepath) as f:
+                snapshots = [json.loads(line) for line in f]
+            assert len(snapshots) == 2
+            assert snapshots[0]['methods']['transform']['rows'] == 10
+            self.assertRaises(ValueError, self.telemetry.export, filepath, format='csv')
+
+    def test_pipeline(self):
+        x = megatron.nodes.InputNode('x')
+        y = ScalarMultiply(2)(x)
+        y.name = 'double'
+        pipeline = megatron.Pipeline(x, y, name='p', storage=sqlite3.connect(':memory:'))
+        pipeline.transform({'x': np.arange(10.), 'ind': np.arange(10)}, index_field='ind')
+        pipeline.storage.lookup(np.arange(5))
+        snapshot = pipeline.telemetry.snapshot()
+        assert snapshot['nodes']['double']['rows'] == 10
+        assert snapshot['nodes']['double']['bytes_out'] == 80
+        methods = snapshot['methods']
+        assert methods['transform']['calls'] == 1
+        assert methods['DataStore.write']['rows'] == 10
+        assert methods['DataStore.lookup']['rows'] == 5
+        assert 0 <= methods['DataStore.lookup']['seconds'] < 10
+        assert megatron.Pipeline(x, y, telemetry=False).telemetry is None
+
+    def test_node_interval(self):
+        x = megatron.nodes.InputNode('x')
+        y = ScalarMultiply(2)(x)
+        for node_interval, node_calls in [(3, 3), (1, 7), (None, 0)]:
+            telemetry = Telemetry(node_interval=node_interval)
+            pipeline = megatron.Pipeline(x, y, telemetry=telemetry)
+            for i in range(7):
+                pipeline.transform({'x': np.arange(10.)})
+            snapshot = telemetry.snapshot()
+            # every call is counted, but only some have their nodes timed
+            assert snapshot['methods']['transform']['calls'] == 7
+            assert snapshot['nodes'].get(y.name, {}).get('calls', 0) == node_calls
+
+    def test_overhead(self):
+        x = megatron.nodes.InputNode('x')
+        y = ScalarMultiply(2)(ScalarMultiply(3)(ScalarMultiply(4)(x)))
+        pipelines = [megatron.Pipeline(x, y, telemetry=False), megatron.Pipeline(x, y)]
+        data = {'x': np.arange(32.)}
+        # recording a call takes no lock
+        telemetry = pipelines[1].telemetry
+        with mock.patch.object(telemetry, 'lock') as lock:
+            for i in range(10):
+                pipelines[1].transform(data)
+            assert not lock.__enter__.called
+        assert telemetry.snapshot()['methods']['transform']['calls'] == 10
+        seconds = [[], []]
+        for i in range(40):
+            for pipeline, times in zip(pipelines, seconds):
+                times.append(timeit.timeit(lambda: pipeline.transform(data), number=100))
+        # about a microsecond per call, with a wide margin for noisy timings
+        assert min(seconds[1]) < 1.15 * min(seconds[0])